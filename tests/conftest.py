@@ -1,5 +1,7 @@
 import os
 
+import pytest
+
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 root_dir_content = os.listdir(BASE_DIR)
 PROJECT_DIR_NAME = 'yatube'
@@ -37,3 +39,18 @@ pytest_plugins = [
     'tests.fixtures.fixture_user',
     'tests.fixtures.fixture_data',
 ]
+
+
+@pytest.fixture(autouse=True, scope='session')
+def test_caches():
+    # Кэш в памяти вместо файла разработчика и Redis, как в manage.py test
+    from core.testing import override_test_caches
+    with override_test_caches():
+        yield
+
+
+@pytest.fixture(autouse=True)
+def inline_tasks(settings):
+    # Потоки пула не видят тестовую базу в памяти: задачи выполняются
+    # в том же потоке после коммита
+    settings.TASKS_WORKERS = 0
@@ -0,0 +1,48 @@
+"""
+Keyset-пагинация строк .values() по убыванию ключа: курсор хранит
+значения ключа последней строки, поэтому любая страница стоит
+как первая. Токен тот же, что у CursorPaginator сайта.
+"""
+from django.db.models import Q
+
+from posts.utils import CURSOR_NEXT, decode_cursor, encode_cursor
+
+API_PAGE_SIZE: int = 20
+API_MAX_PAGE_SIZE: int = 100
+
+
+def after(keyset, values):
+    """Строки строго после ключа при сортировке по убыванию."""
+    condition = Q(**{f'{keyset[-1]}__lt': values[-1]})
+    for field, value in zip(keyset[-2::-1], values[-2::-1]):
+        condition = Q(**{f'{field}__lt': value}) | (
+            Q(**{field: value}) & condition
+        )
+    return condition
+
+
+def get_limit(request):
+    try:
+        limit = int(request.GET.get('limit', API_PAGE_SIZE))
+    except ValueError:
+        raise ValueError('limit должен быть числом.')
+    return max(1, min(limit, API_MAX_PAGE_SIZE))
+
+
+def paginate(request, rows, keyset):
+    """Страница строк и курсор следующей (None на последней)."""
+    limit = get_limit(request)
+    token = request.GET.get('cursor')
+    if token:
+        decoded = decode_cursor(token, keyset)
+        if decoded is None or decoded[0] != CURSOR_NEXT:
+            raise ValueError('Неверный курсор.')
+        rows = rows.filter(after(keyset, decoded[1:]))
+    page = list(
+        rows.order_by(*(f'-{field}' for field in keyset))[:limit + 1]
+    )
+    next_cursor = None
+    if len(page) > limit:
+        page = page[:limit]
+        next_cursor = encode_cursor(page[-1], keyset=keyset)
+    return page, next_cursor
@@ -0,0 +1,98 @@
+"""
+Сериализация строк .values() в словари без экземпляров моделей:
+у каждого поля ответа свои колонки запроса и функция сборки,
+поэтому ?fields= сужает и SELECT, и ответ.
+"""
+from operator import itemgetter
+
+from django.core.files.storage import default_storage
+
+
+class Field:
+    """Поле ответа: колонки .values() и сборка значения из строки."""
+
+    def __init__(self, *columns, build=None):
+        self.columns = columns
+        self.build = build or itemgetter(columns[0])
+
+
+def image(column):
+    def build(row):
+        name = row[column]
+        return default_storage.url(name) if name else None
+
+    return Field(column, build=build)
+
+
+def embedded(key, prefix, names):
+    """
+    Связанный объект тем же JOIN, что и основная строка;
+    None, если ключ пуст.
+    """
+    columns = tuple(f'{prefix}__{name}' for name in names)
+
+    def build(row):
+        if row[key] is None:
+            return None
+        return {
+            'id': row[key],
+            **{name: row[column] for name, column in zip(names, columns)}
+        }
+
+    return Field(key, *columns, build=build)
+
+
+class Serializer:
+    def __init__(self, **fields):
+        self.fields = fields
+
+    def select(self, requested):
+        """Имена полей из ?fields=; без него — все. ValueError на чужих."""
+        if not requested:
+            return list(self.fields)
+        names = [name.strip() for name in requested.split(',')]
+        unknown = [name for name in names if name not in self.fields]
+        if unknown:
+            raise ValueError(f'Неизвестные поля: {", ".join(unknown)}')
+        return list(dict.fromkeys(names))
+
+    def columns(self, names, *extra):
+        return list(dict.fromkeys(
+            [column for name in names
+             for column in self.fields[name].columns] + list(extra)
+        ))
+
+    def dump(self, rows, names):
+        builders = [(name, self.fields[name].build) for name in names]
+        return [{name: build(row) for name, build in builders} for row in rows]
+
+
+AUTHOR = ('username', 'first_name', 'last_name')
+
+POST = Serializer(
+    id=Field('id'),
+    text=Field('text'),
+    pub_date=Field('pub_date'),
+    modified=Field('modified'),
+    comments_count=Field('comments_count'),
+    image=image('image'),
+    author=embedded('author_id', 'author', AUTHOR),
+    group=embedded('group_id', 'group', ('slug', 'title')),
+)
+GROUP = Serializer(
+    id=Field('id'),
+    slug=Field('slug'),
+    title=Field('title'),
+    description=Field('description'),
+)
+COMMENT = Serializer(
+    id=Field('id'),
+    post=Field('post_id'),
+    text=Field('text'),
+    created=Field('created'),
+    author=embedded('author_id', 'author', AUTHOR),
+)
+FOLLOW = Serializer(
+    id=Field('id'),
+    author=embedded('author_id', 'author', AUTHOR),
+)
@@ -0,0 +1,194 @@
+import base64
+import json
+from http import HTTPStatus
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from posts.models import Comment, Follow, Group, Post
+
+User = get_user_model()
+
+
+class ApiTestCase(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(
+            username='author', first_name='Лев', last_name='Толстой'
+        )
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(
+            title='Группа', slug='group', description='Описание'
+        )
+        cls.posts = [
+            Post.objects.create(
+                text=f'Пост {number}', author=cls.author,
+                group=cls.group if number % 2 else None
+            )
+            for number in range(5)
+        ][::-1]
+
+    def setUp(self):
+        self.guest_client = Client()
+        self.author_client = Client()
+        self.author_client.force_login(self.author)
+        self.reader_client = Client()
+        self.reader_client.force_login(self.reader)
+
+    def send(self, client, method, url, data):
+        return getattr(client, method)(
+            url, json.dumps(data), content_type='application/json'
+        )
+
+
+class ApiReadTests(ApiTestCase):
+    def test_posts_pages_follow_cursor(self):
+        """Курсор проходит все посты по порядку без повторов."""
+        url = reverse('api:posts')
+        seen = []
+        params = {'limit': 2}
+        while True:
+            data = self.guest_client.get(url, params).json()
+            seen += [post['id'] for post in data['results']]
+            if data['next_cursor'] is None:
+                break
+            params['cursor'] = data['next_cursor']
+        self.assertEqual(seen, [post.pk for post in self.posts])
+
+    def test_embedded_author_and_group_in_one_query(self):
+        """Автор и группа приходят вложенными, одним запросом к базе."""
+        with CaptureQueriesContext(connection) as context:
+            data = self.guest_client.get(reverse('api:posts')).json()
+        self.assertEqual(len(context.captured_queries), 1)
+        first = data['results'][0]
+        self.assertEqual(first['author'], {
+            'id': self.author.pk, 'username': 'author',
+            'first_name': 'Лев', 'last_name': 'Толстой',
+        })
+        self.assertIsNone(first['group'])
+        self.assertEqual(
+            data['results'][1]['group'],
+            {'id': self.group.pk, 'slug': 'group', 'title': 'Группа'}
+        )
+
+    def test_sparse_fields(self):
+        """?fields= сужает и ответ, и SELECT."""
+        with CaptureQueriesContext(connection) as context:
+            data = self.guest_client.get(
+                reverse('api:posts'), {'fields': 'id,text'}
+            ).json()
+        self.assertEqual(set(data['results'][0]), {'id', 'text'})
+        self.assertNotIn('JOIN', context.captured_queries[0]['sql'])
+        response = self.guest_client.get(
+            reverse('api:posts'), {'fields': 'id,password'}
+        )
+        self.assertEqual(response.status_code, HTTPStatus.BAD_REQUEST)
+
+    def test_filters_and_detail(self):
+        data = self.guest_client.get(
+            reverse('api:posts'), {'group': 'group'}
+        ).json()
+        self.assertEqual(len(data['results']), 2)
+        post = self.posts[0]
+        data = self.guest_client.get(
+            reverse('api:post', args=[post.pk])
+        ).json()
+        self.assertEqual(data['text'], post.text)
+        data = self.guest_client.get(
+            reverse('api:group', args=['group'])
+        ).json()
+        self.assertEqual(data['description'], 'Описание')
+        response = self.guest_client.get(reverse('api:post', args=[0]))
+        self.assertEqual(response.status_code, HTTPStatus.NOT_FOUND)
+
+    def test_etag(self):
+        """Совпавший ETag даёт 304, правка поста — новый ETag."""
+        url = reverse('api:posts')
+        etag = self.guest_client.get(url)['ETag']
+        response = self.guest_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, HTTPStatus.NOT_MODIFIED)
+        Post.objects.filter(pk=self.posts[0].pk).update(text='Правка')
+        response = self.guest_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+
+    def test_broken_cursor(self):
+        """Подделанный курсор — 400, а не ошибка сервера."""
+        forged = ('[{}]', '[[1]]', 'n|{}', 'n|x|1', 'p|1', f'n|{2 ** 70}')
+        tokens = ['broken', *(
+            base64.urlsafe_b64encode(raw.encode()).decode() for raw in forged
+        )]
+        for url in (reverse('api:posts'), reverse('api:groups')):
+            for token in tokens:
+                with self.subTest(url=url, token=token):
+                    response = self.guest_client.get(url, {'cursor': token})
+                    self.assertEqual(
+                        response.status_code, HTTPStatus.BAD_REQUEST
+                    )
+
+
+class ApiWriteTests(ApiTestCase):
+    def test_create_post(self):
+        response = self.send(
+            self.author_client, 'post', reverse('api:posts'),
+            {'text': 'Из API', 'group': self.group.pk}
+        )
+        self.assertEqual(response.status_code, HTTPStatus.CREATED)
+        post = Post.objects.get(pk=response.json()['id'])
+        self.assertEqual(
+            (post.text, post.author, post.group),
+            ('Из API', self.author, self.group)
+        )
+
+    def test_invalid_and_anonymous_writes(self):
+        url = reverse('api:posts')
+        response = self.send(self.author_client, 'post', url, {'text': ' '})
+        self.assertEqual(response.status_code, HTTPStatus.BAD_REQUEST)
+        self.assertIn('text', response.json()['errors'])
+        response = self.send(self.guest_client, 'post', url, {'text': 'Гость'})
+        self.assertEqual(response.status_code, HTTPStatus.UNAUTHORIZED)
+
+    def test_only_author_changes_post(self):
+        post = self.posts[0]
+        url = reverse('api:post', args=[post.pk])
+        response = self.send(self.reader_client, 'patch', url, {'text': 'X'})
+        self.assertEqual(response.status_code, HTTPStatus.FORBIDDEN)
+        response = self.send(
+            self.author_client, 'patch', url, {'text': 'Правка'}
+        )
+        self.assertEqual(response.json()['text'], 'Правка')
+        self.assertEqual(response.json()['group'], None)
+        response = self.author_client.delete(url)
+        self.assertEqual(response.status_code, HTTPStatus.NO_CONTENT)
+        self.assertFalse(Post.objects.filter(pk=post.pk).exists())
+
+    def test_comments(self):
+        post = self.posts[0]
+        url = reverse('api:comments', args=[post.pk])
+        response = self.send(
+            self.reader_client, 'post', url, {'text': 'Комментарий'}
+        )
+        self.assertEqual(response.status_code, HTTPStatus.CREATED)
+        data = self.guest_client.get(url).json()
+        self.assertEqual(data['results'][0]['author']['username'], 'reader')
+        self.assertEqual(Comment.objects.filter(post=post).count(), 1)
+
+    def test_follows(self):
+        url = reverse('api:follows')
+        response = self.send(
+            self.reader_client, 'post', url, {'author': 'author'}
+        )
+        self.assertEqual(response.status_code, HTTPStatus.CREATED)
+        data = self.reader_client.get(url).json()
+        self.assertEqual(data['results'][0]['author']['username'], 'author')
+        response = self.send(
+            self.reader_client, 'post', url, {'author': 'reader'}
+        )
+        self.assertEqual(response.status_code, HTTPStatus.BAD_REQUEST)
+        self.reader_client.delete(reverse('api:follow', args=['author']))
+        self.assertFalse(Follow.objects.filter(user=self.reader).exists())
+        self.assertEqual(
+            self.guest_client.get(url).status_code, HTTPStatus.UNAUTHORIZED
+        )
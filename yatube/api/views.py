@@ -0,0 +1,268 @@
+"""
+JSON API постов, групп, комментариев и подписок.
+
+Авторизация — сессия сайта: небезопасные методы, как и формы,
+требуют CSRF-токена в заголовке X-CSRFToken. Тело запроса проверяют
+те же формы, что и на сайте.
+"""
+import hashlib
+import json
+from http import HTTPStatus
+
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.http import HttpResponse, JsonResponse
+from django.utils.cache import get_conditional_response
+from django.views.decorators.http import require_http_methods
+
+from posts.forms import CommentForm, PostForm
+from posts.models import Comment, Follow, Group, Post
+
+from .pagination import paginate
+from .serializers import COMMENT, FOLLOW, GROUP, POST
+
+User = get_user_model()
+
+POST_KEYSET = ('pub_date', 'id')
+COMMENT_KEYSET = ('created', 'id')
+ID_KEYSET = ('id',)
+
+
+def error(status, detail, **extra):
+    return JsonResponse(
+        {'detail': detail, **extra}, status=status,
+        json_dumps_params={'ensure_ascii': False}
+    )
+
+
+def not_found():
+    return error(HTTPStatus.NOT_FOUND, 'Не найдено.')
+
+
+def form_error(form):
+    return error(
+        HTTPStatus.BAD_REQUEST, 'Данные не прошли проверку.',
+        errors={
+            field: [item['message'] for item in items]
+            for field, items in form.errors.get_json_data().items()
+        }
+    )
+
+
+def json_response(request, data, status=HTTPStatus.OK):
+    """
+    JSON с ETag по телу ответа: совпавший If-None-Match получает 304
+    без тела, и клиент не качает список повторно.
+    """
+    response = JsonResponse(
+        data, status=status, json_dumps_params={'ensure_ascii': False}
+    )
+    if request.method != 'GET' or status != HTTPStatus.OK:
+        return response
+    etag = f'"{hashlib.md5(response.content).hexdigest()}"'
+    response['ETag'] = etag
+    return get_conditional_response(request, etag=etag, response=response)
+
+
+def read_body(request):
+    """Тело запроса как JSON-объект; ValueError для всего остального."""
+    try:
+        data = json.loads(request.body or b'{}')
+    except ValueError:
+        raise ValueError('Тело запроса — не JSON.')
+    if not isinstance(data, dict):
+        raise ValueError('Ожидается JSON-объект.')
+    return data
+
+
+def list_response(request, rows, serializer, keyset):
+    """Страница строк .values() с полями из ?fields= и курсором."""
+    try:
+        names = serializer.select(request.GET.get('fields'))
+        rows = rows.values(*serializer.columns(names, *keyset))
+        page, next_cursor = paginate(request, rows, keyset)
+    except ValueError as exception:
+        return error(HTTPStatus.BAD_REQUEST, str(exception))
+    return json_response(request, {
+        'results': serializer.dump(page, names),
+        'next_cursor': next_cursor,
+    })
+
+
+def detail_response(request, rows, serializer, status=HTTPStatus.OK):
+    try:
+        names = serializer.select(request.GET.get('fields'))
+    except ValueError as exception:
+        return error(HTTPStatus.BAD_REQUEST, str(exception))
+    row = rows.values(*serializer.columns(names)).first()
+    if row is None:
+        return not_found()
+    return json_response(
+        request, serializer.dump([row], names)[0], status=status
+    )
+
+
+def write_access(request, owner_id=None):
+    """Ответ с ошибкой, если писать нельзя, иначе None."""
+    if not request.user.is_authenticated:
+        return error(HTTPStatus.UNAUTHORIZED, 'Нужна авторизация.')
+    if owner_id is not None and owner_id != request.user.pk:
+        return error(HTTPStatus.FORBIDDEN, 'Это чужая запись.')
+    return None
+
+
+def save_form(request, form_class, instance=None, **fields):
+    """
+    Проверяет тело запроса формой сайта. Возвращает сохранённый
+    без коммита объект или ответ с ошибкой.
+    """
+    try:
+        data = read_body(request)
+    except ValueError as exception:
+        return None, error(HTTPStatus.BAD_REQUEST, str(exception))
+    form = form_class({**fields, **data}, instance=instance)
+    if not form.is_valid():
+        return None, form_error(form)
+    return form.save(commit=False), None
+
+
+@transaction.atomic
+def create_post(request):
+    denied = write_access(request)
+    if denied:
+        return denied
+    post, failed = save_form(request, PostForm)
+    if failed:
+        return failed
+    post.author = request.user
+    post.save()
+    return detail_response(
+        request, Post.objects.filter(pk=post.pk), POST,
+        status=HTTPStatus.CREATED
+    )
+
+
+@require_http_methods(['GET', 'POST'])
+def posts(request):
+    """Посты от новых к старым; ?group=<slug>, ?author=<username>."""
+    if request.method == 'POST':
+        return create_post(request)
+    rows = Post.objects.all()
+    if request.GET.get('group'):
+        rows = rows.filter(group__slug=request.GET['group'])
+    if request.GET.get('author'):
+        rows = rows.filter(author__username=request.GET['author'])
+    return list_response(request, rows, POST, POST_KEYSET)
+
+
+@transaction.atomic
+def change_post(request, post_id):
+    """PATCH и DELETE поста; менять можно только свои посты."""
+    instance = Post.objects.filter(pk=post_id).first()
+    if instance is None:
+        return not_found()
+    denied = write_access(request, instance.author_id)
+    if denied:
+        return denied
+    if request.method == 'DELETE':
+        instance.delete()
+        return HttpResponse(status=HTTPStatus.NO_CONTENT)
+    post, failed = save_form(
+        request, PostForm, instance=instance,
+        text=instance.text, group=instance.group_id
+    )
+    if failed:
+        return failed
+    post.save()
+    return detail_response(request, Post.objects.filter(pk=post_id), POST)
+
+
+@require_http_methods(['GET', 'PATCH', 'DELETE'])
+def post(request, post_id):
+    if request.method != 'GET':
+        return change_post(request, post_id)
+    return detail_response(request, Post.objects.filter(pk=post_id), POST)
+
+
+@transaction.atomic
+def create_comment(request, post_id):
+    denied = write_access(request)
+    if denied:
+        return denied
+    comment, failed = save_form(request, CommentForm)
+    if failed:
+        return failed
+    comment.author = request.user
+    comment.post_id = post_id
+    comment.save()
+    return detail_response(
+        request, Comment.objects.filter(pk=comment.pk), COMMENT,
+        status=HTTPStatus.CREATED
+    )
+
+
+@require_http_methods(['GET', 'POST'])
+def comments(request, post_id):
+    """Комментарии поста от новых к старым."""
+    if not Post.objects.filter(pk=post_id).exists():
+        return not_found()
+    if request.method == 'POST':
+        return create_comment(request, post_id)
+    return list_response(
+        request, Comment.objects.filter(post_id=post_id), COMMENT,
+        COMMENT_KEYSET
+    )
+
+
+@require_http_methods(['GET'])
+def groups(request):
+    return list_response(request, Group.objects.all(), GROUP, ID_KEYSET)
+
+
+@require_http_methods(['GET'])
+def group(request, slug):
+    return detail_response(request, Group.objects.filter(slug=slug), GROUP)
+
+
+@transaction.atomic
+def create_follow(request):
+    try:
+        username = read_body(request).get('author')
+    except ValueError as exception:
+        return error(HTTPStatus.BAD_REQUEST, str(exception))
+    author = User.objects.filter(username=username).first()
+    if author is None or author == request.user:
+        return error(HTTPStatus.BAD_REQUEST, 'На этого автора не подписаться.')
+    follow, created = Follow.objects.get_or_create(
+        user=request.user, author=author
+    )
+    return detail_response(
+        request, Follow.objects.filter(pk=follow.pk), FOLLOW,
+        status=HTTPStatus.CREATED if created else HTTPStatus.OK
+    )
+
+
+@require_http_methods(['GET', 'POST'])
+def follows(request):
+    """Подписки текущего пользователя; POST {"author": "<username>"}."""
+    denied = write_access(request)
+    if denied:
+        return denied
+    if request.method == 'POST':
+        return create_follow(request)
+    return list_response(
+        request, Follow.objects.filter(user=request.user), FOLLOW,
+        ID_KEYSET
+    )
+
+
+@require_http_methods(['DELETE'])
+@transaction.atomic
+def follow(request, username):
+    denied = write_access(request)
+    if denied:
+        return denied
+    Follow.objects.filter(
+        user=request.user, author__username=username
+    ).delete()
+    return HttpResponse(status=HTTPStatus.NO_CONTENT)
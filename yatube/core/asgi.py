@@ -0,0 +1,238 @@
+"""
+ASGI без внешних зависимостей: Django 2.2 работает только по WSGI,
+поэтому обычные запросы уходят в WSGI-приложение в пуле потоков,
+а потоки событий (Server-Sent Events) обслуживаются в цикле asyncio
+и не занимают поток на каждого подписчика.
+"""
+import asyncio
+import io
+import json
+import re
+import sys
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.exceptions import PermissionDenied
+from django.db import close_old_connections
+from django.http import Http404
+
+from .events import get_broker
+
+ASGI_THREADS: int = 8
+# Тело больше этого отклоняется с 413, не дочитываясь.
+ASGI_MAX_BODY_SIZE: int = 10 * 1024 * 1024
+# Тело больше этого уходит из памяти во временный файл.
+ASGI_BODY_MEMORY_SIZE: int = 1024 * 1024
+EVENTS_HEARTBEAT: float = 15.0
+SSE_HEADERS = [
+    (b'content-type', b'text/event-stream; charset=utf-8'),
+    (b'cache-control', b'no-cache'),
+    (b'x-accel-buffering', b'no'),
+]
+
+
+def build_environ(scope, body):
+    """WSGI environ из ASGI scope и тела запроса."""
+    server = scope.get('server') or ('localhost', 80)
+    client = scope.get('client') or ('', 0)
+    environ = {
+        'REQUEST_METHOD': scope['method'],
+        'SCRIPT_NAME': scope.get('root_path', ''),
+        'PATH_INFO': scope['path'].encode().decode('latin-1'),
+        'QUERY_STRING': scope.get('query_string', b'').decode('latin-1'),
+        'SERVER_NAME': server[0],
+        'SERVER_PORT': str(server[1]),
+        'REMOTE_ADDR': client[0],
+        'SERVER_PROTOCOL': f'HTTP/{scope.get("http_version", "1.1")}',
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': scope.get('scheme', 'http'),
+        'wsgi.input': body,
+        'wsgi.errors': sys.stderr,
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': False,
+        'wsgi.run_once': False,
+    }
+    for name, value in scope.get('headers', []):
+        name = name.decode('latin-1').upper().replace('-', '_')
+        value = value.decode('latin-1')
+        if name not in ('CONTENT_TYPE', 'CONTENT_LENGTH'):
+            name = f'HTTP_{name}'
+        if name in environ:
+            value = f'{environ[name]},{value}'
+        environ[name] = value
+    return environ
+
+
+class BodyTooLarge(Exception):
+    pass
+
+
+async def read_body(receive):
+    """
+    Тело запроса во временном файле: в памяти не больше
+    ASGI_BODY_MEMORY_SIZE. Тело длиннее ASGI_MAX_BODY_SIZE
+    дальше не читается — BodyTooLarge.
+    """
+    limit = getattr(settings, 'ASGI_MAX_BODY_SIZE', ASGI_MAX_BODY_SIZE)
+    body = tempfile.SpooledTemporaryFile(getattr(
+        settings, 'ASGI_BODY_MEMORY_SIZE', ASGI_BODY_MEMORY_SIZE
+    ))
+    try:
+        while True:
+            message = await receive()
+            body.write(message.get('body', b''))
+            if body.tell() > limit:
+                raise BodyTooLarge
+            if not message.get('more_body'):
+                body.seek(0)
+                return body
+    except BaseException:
+        body.close()
+        raise
+
+
+def run_sync(executor, func, *args):
+    """Синхронный код (ORM, WSGI) в пуле, не блокируя цикл."""
+    return asyncio.get_running_loop().run_in_executor(executor, func, *args)
+
+
+def run_wsgi(application, environ):
+    response = {}
+
+    def start_response(status, headers, exc_info=None):
+        response['status'] = int(status.split(' ', 1)[0])
+        response['headers'] = [
+            (name.lower().encode('latin-1'), value.encode('latin-1'))
+            for name, value in headers
+        ]
+
+    result = application(environ, start_response)
+    try:
+        body = b''.join(result)
+    finally:
+        if hasattr(result, 'close'):
+            result.close()
+    return response['status'], response['headers'], body
+
+
+def resolve_channels(resolver, environ, kwargs):
+    """Каналы подписки; соединения с базой потока закрываются после."""
+    try:
+        return resolver(environ, **kwargs)
+    finally:
+        close_old_connections()
+
+
+class ASGIApplication:
+    """
+    routes — пары (регулярное выражение пути, функция), функция
+    получает environ и группы пути и возвращает список каналов или
+    бросает Http404 / PermissionDenied. Остальные пути — в WSGI.
+    """
+
+    def __init__(self, wsgi_application, routes=()):
+        self.wsgi_application = wsgi_application
+        self.routes = [(re.compile(path), func) for path, func in routes]
+        self.executor = ThreadPoolExecutor(
+            getattr(settings, 'ASGI_THREADS', ASGI_THREADS),
+            thread_name_prefix='asgi-wsgi'
+        )
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            return await self.lifespan(receive, send)
+        if scope['type'] != 'http':
+            raise ValueError(f'Неподдерживаемый тип ASGI: {scope["type"]}')
+        for path, resolver in self.routes:
+            match = path.fullmatch(scope['path'])
+            if match and scope['method'] == 'GET':
+                return await self.stream(
+                    scope, receive, send, resolver, match.groupdict()
+                )
+        try:
+            request_body = await read_body(receive)
+        except BodyTooLarge:
+            await send({'type': 'http.response.start', 'status': 413,
+                        'headers': []})
+            await send({'type': 'http.response.body', 'body': b''})
+            return
+        try:
+            status, headers, body = await run_sync(
+                self.executor, run_wsgi, self.wsgi_application,
+                build_environ(scope, request_body)
+            )
+        finally:
+            request_body.close()
+        await send({
+            'type': 'http.response.start', 'status': status,
+            'headers': headers,
+        })
+        await send({'type': 'http.response.body', 'body': body})
+
+    async def lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                self.executor.shutdown(wait=False)
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    async def stream(self, scope, receive, send, resolver, kwargs):
+        environ = build_environ(scope, io.BytesIO())
+        try:
+            channels = await run_sync(
+                self.executor, resolve_channels, resolver, environ, kwargs
+            )
+        except (Http404, PermissionDenied) as exception:
+            status = 404 if isinstance(exception, Http404) else 403
+            await send({'type': 'http.response.start', 'status': status,
+                        'headers': []})
+            await send({'type': 'http.response.body', 'body': b''})
+            return
+        await event_stream(receive, send, channels)
+
+
+async def event_stream(receive, send, channels):
+    """
+    Отдаёт события каналов как text/event-stream до отключения
+    клиента; в тишине шлёт комментарий, чтобы прокси не рвали связь.
+    """
+    heartbeat = getattr(settings, 'EVENTS_HEARTBEAT', EVENTS_HEARTBEAT)
+    subscription = get_broker().subscribe(channels)
+    disconnected = asyncio.ensure_future(wait_disconnect(receive))
+    try:
+        await send({'type': 'http.response.start', 'status': 200,
+                    'headers': SSE_HEADERS})
+        await send({'type': 'http.response.body', 'body': b': connected\n\n',
+                    'more_body': True})
+        while not disconnected.done():
+            event = asyncio.ensure_future(subscription.get())
+            await asyncio.wait(
+                {event, disconnected}, timeout=heartbeat,
+                return_when=asyncio.FIRST_COMPLETED
+            )
+            if not event.done():
+                event.cancel()
+                if not disconnected.done():
+                    await send({'type': 'http.response.body',
+                                'body': b': ping\n\n', 'more_body': True})
+                continue
+            await send({'type': 'http.response.body',
+                        'body': format_event(event.result()),
+                        'more_body': True})
+    finally:
+        subscription.close()
+        disconnected.cancel()
+
+
+async def wait_disconnect(receive):
+    while (await receive())['type'] != 'http.disconnect':
+        pass
+
+
+def format_event(event):
+    data = json.dumps(event, ensure_ascii=False, separators=(',', ':'))
+    return f'event: {event["type"]}\ndata: {data}\n\n'.encode()
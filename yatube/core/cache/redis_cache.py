@@ -0,0 +1,122 @@
+"Необязательный адаптер к Redis-совместимому серверу."
+import pickle
+import time
+
+from django.core.cache.backends.base import (DEFAULT_TIMEOUT, BaseCache,
+                                             InvalidCacheBackendError)
+
+try:
+    import redis
+except ImportError:  # pragma: no cover
+    redis = None
+
+
+class RedisCache(BaseCache):
+    """
+    Кэш в Redis (или совместимом сервере). Нужен пакет redis;
+    LOCATION — URL вида redis://host:6379/0.
+    """
+    pickle_protocol = pickle.HIGHEST_PROTOCOL
+
+    def __init__(self, location, params):
+        if redis is None:
+            raise InvalidCacheBackendError(
+                'Для RedisCache установите пакет redis'
+            )
+        super().__init__(params)
+        self._client = redis.Redis.from_url(location)
+
+    def _key(self, key, version):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        return key
+
+    def _ttl(self, timeout):
+        """Время жизни в секундах для Redis; None — бессрочно."""
+        timeout = self.get_backend_timeout(timeout)
+        if timeout is None:
+            return None
+        return max(0, int(timeout - time.time()))
+
+    def _dumps(self, value):
+        return pickle.dumps(value, self.pickle_protocol)
+
+    def get(self, key, default=None, version=None):
+        value = self._client.get(self._key(key, version))
+        return default if value is None else pickle.loads(value)
+
+    def get_many(self, keys, version=None):
+        made = {self._key(key, version): key for key in keys}
+        if not made:
+            return {}
+        values = self._client.mget(list(made))
+        return {
+            key: pickle.loads(value)
+            for key, value in zip(made.values(), values) if value is not None
+        }
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        ttl = self._ttl(timeout)
+        key = self._key(key, version)
+        if ttl == 0:
+            self._client.delete(key)
+            return
+        self._client.set(key, self._dumps(value), ex=ttl)
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        pipeline = self._client.pipeline()
+        ttl = self._ttl(timeout)
+        for key, value in data.items():
+            key = self._key(key, version)
+            if ttl == 0:
+                pipeline.delete(key)
+            else:
+                pipeline.set(key, self._dumps(value), ex=ttl)
+        pipeline.execute()
+        return []
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        ttl = self._ttl(timeout)
+        if ttl == 0:
+            return False
+        return bool(self._client.set(
+            self._key(key, version), self._dumps(value), ex=ttl, nx=True
+        ))
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self._key(key, version)
+        ttl = self._ttl(timeout)
+        if ttl is None:
+            return bool(self._client.persist(key))
+        return bool(self._client.expire(key, ttl))
+
+    def incr(self, key, delta=1, version=None):
+        key = self._key(key, version)
+        with self._client.pipeline() as pipeline:
+            while True:
+                try:
+                    pipeline.watch(key)
+                    value = pipeline.get(key)
+                    if value is None:
+                        raise ValueError("Key '%s' not found" % key)
+                    value = pickle.loads(value) + delta
+                    pipeline.multi()
+                    pipeline.set(key, self._dumps(value), keepttl=True)
+                    pipeline.execute()
+                    return value
+                except redis.WatchError:
+                    continue
+
+    def has_key(self, key, version=None):
+        return bool(self._client.exists(self._key(key, version)))
+
+    def delete(self, key, version=None):
+        self._client.delete(self._key(key, version))
+
+    def delete_many(self, keys, version=None):
+        made = [self._key(key, version) for key in keys]
+        if made:
+            self._client.delete(*made)
+
+    def clear(self):
+        self._client.flushdb()
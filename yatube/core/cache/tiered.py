@@ -0,0 +1,196 @@
+"Двухуровневый кэш: L1 в памяти процесса поверх общего L2."
+import time
+
+from django.core.cache import caches
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+from django.core.cache.backends.locmem import LocMemCache
+
+SEQUENCE_KEY: str = 'tiered:sequence'
+JOURNAL_KEY: str = 'tiered:journal:{}'
+# Столько секунд хранится запись журнала; отставший дольше воркер
+# сбрасывает L1 целиком.
+JOURNAL_TIMEOUT: int = 300
+# Записей журнала за одну проверку; при большем отставании L1 сбрасывается.
+JOURNAL_MAX_READ: int = 1000
+L1_TIMEOUT: int = 5
+CHECK_INTERVAL: float = 1.0
+
+
+class TieredCache(BaseCache):
+    """
+    Чтение сначала из L1 (LocMemCache процесса), затем из общего L2.
+    Запись в L2 добавляет в общий журнал изменённые ключи под новым
+    номером; раз в CHECK_INTERVAL воркер читает журнал с последнего
+    известного номера и удаляет из L1 только эти ключи. Инвалидация
+    из одного воркера доходит до остальных не позже чем через
+    CHECK_INTERVAL, а остальной L1 при этом не пропадает.
+    LOCATION — алиас общего кэша в settings.CACHES.
+    """
+
+    def __init__(self, location, params):
+        super().__init__(params)
+        options = params.get('OPTIONS', {})
+        self._l2_alias = location
+        self._l1 = LocMemCache(f'tiered:{location}', {
+            'TIMEOUT': options.get('L1_TIMEOUT', L1_TIMEOUT),
+            'OPTIONS': {'MAX_ENTRIES': options.get('L1_MAX_ENTRIES', 300)},
+            'KEY_PREFIX': params.get('KEY_PREFIX', ''),
+            'VERSION': params.get('VERSION', 1),
+            'KEY_FUNCTION': params.get('KEY_FUNCTION'),
+        })
+        self._check_interval = options.get('CHECK_INTERVAL', CHECK_INTERVAL)
+        self._sequence = None
+        self._own = set()
+        self._checked = 0.0
+
+    @property
+    def l2(self):
+        return caches[self._l2_alias]
+
+    def sync(self):
+        """
+        Раз в CHECK_INTERVAL убирает из L1 ключи, изменённые другими
+        воркерами. Если записей журнала не хватает (истекли, отставание
+        слишком велико или номер сбросился), L1 очищается целиком.
+        """
+        now = time.monotonic()
+        if self._sequence is not None and (
+            now - self._checked < self._check_interval
+        ):
+            return
+        self._checked = now
+        sequence = self.l2.get(SEQUENCE_KEY)
+        if sequence is None:
+            self._start_sequence()
+            sequence = self.l2.get(SEQUENCE_KEY, 0)
+        known = self._sequence
+        self._sequence = sequence
+        if known is None or known == sequence:
+            return
+        own, self._own = self._own, {
+            number for number in self._own if number > sequence
+        }
+        if not 0 < sequence - known <= JOURNAL_MAX_READ:
+            self._l1.clear()
+            return
+        numbers = [
+            number for number in range(known + 1, sequence + 1)
+            if number not in own
+        ]
+        journal = self.l2.get_many(
+            [JOURNAL_KEY.format(number) for number in numbers]
+        )
+        if len(journal) < len(numbers):
+            self._l1.clear()
+            return
+        for changed in journal.values():
+            for key, version in changed:
+                self._l1.delete(key, version=version)
+
+    def _start_sequence(self):
+        """
+        Номер журнала после потери счётчика (очистка L2, вытеснение)
+        начинается с отметки времени в микросекундах — дальше прежнего
+        больше чем на JOURNAL_MAX_READ, и все L1 очищаются.
+        """
+        self.l2.add(SEQUENCE_KEY, time.time_ns() // 1000, None)
+
+    def _publish(self, keys, version):
+        """Записывает изменённые ключи в журнал под новым номером."""
+        try:
+            number = self.l2.incr(SEQUENCE_KEY)
+        except ValueError:
+            self._start_sequence()
+            number = self.l2.incr(SEQUENCE_KEY)
+        self._own.add(number)
+        self.l2.set(
+            JOURNAL_KEY.format(number),
+            [(key, version) for key in keys], JOURNAL_TIMEOUT
+        )
+
+    def get(self, key, default=None, version=None):
+        self.sync()
+        missing = object()
+        value = self._l1.get(key, missing, version=version)
+        if value is not missing:
+            return value
+        value = self.l2.get(key, missing, version=version)
+        if value is missing:
+            return default
+        self._l1.set(key, value, version=version)
+        return value
+
+    def get_many(self, keys, version=None):
+        self.sync()
+        missing = object()
+        found, absent = {}, []
+        for key in keys:
+            value = self._l1.get(key, missing, version=version)
+            if value is missing:
+                absent.append(key)
+            else:
+                found[key] = value
+        if absent:
+            fetched = self.l2.get_many(absent, version=version)
+            for key, value in fetched.items():
+                self._l1.set(key, value, version=version)
+            found.update(fetched)
+        return found
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        self.set_many({key: value}, timeout, version)
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        timeout = self._l2_timeout(timeout)
+        failed = self.l2.set_many(data, timeout, version=version) or []
+        self._publish(data, version)
+        l1_timeout = self._l1.default_timeout
+        if timeout is not None:
+            l1_timeout = min(l1_timeout, timeout)
+        for key, value in data.items():
+            if key not in failed:
+                self._l1.set(key, value, l1_timeout, version=version)
+        return failed
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        """Новый ключ не может лежать в чужом L1: журнал не нужен."""
+        added = self.l2.add(
+            key, value, self._l2_timeout(timeout), version=version
+        )
+        if added:
+            self._l1.set(key, value, version=version)
+        return added
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        return self.l2.touch(key, self._l2_timeout(timeout), version=version)
+
+    def incr(self, key, delta=1, version=None):
+        value = self.l2.incr(key, delta, version=version)
+        self._l1.delete(key, version=version)
+        self._publish([key], version)
+        return value
+
+    def has_key(self, key, version=None):
+        self.sync()
+        if self._l1.has_key(key, version=version):
+            return True
+        return self.l2.has_key(key, version=version)
+
+    def delete(self, key, version=None):
+        self.delete_many([key], version)
+
+    def delete_many(self, keys, version=None):
+        self.l2.delete_many(keys, version=version)
+        for key in keys:
+            self._l1.delete(key, version=version)
+        self._publish(keys, version)
+
+    def clear(self):
+        """Очистка L2 сбрасывает и номер журнала: все L1 очистятся."""
+        self.l2.clear()
+        self._l1.clear()
+        self._sequence, self._own = None, set()
+
+    def _l2_timeout(self, timeout):
+        """Таймаут по умолчанию берётся из настроек этого кэша, не L2."""
+        return self.default_timeout if timeout is DEFAULT_TIMEOUT else timeout
@@ -0,0 +1,21 @@
+from django.db.backends.sqlite3 import base
+
+from core.db.config import SQLITE_TRANSACTION_MODE
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    """
+    SQLite с выбором режима транзакций atomic() через
+    OPTIONS['transaction_mode']: DEFERRED, IMMEDIATE или EXCLUSIVE.
+    """
+
+    def get_connection_params(self):
+        params = super().get_connection_params()
+        params.pop('transaction_mode', None)
+        return params
+
+    def _start_transaction_under_autocommit(self):
+        mode = self.settings_dict['OPTIONS'].get(
+            'transaction_mode', SQLITE_TRANSACTION_MODE
+        )
+        self.cursor().execute(f'BEGIN {mode}')
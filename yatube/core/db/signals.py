@@ -0,0 +1,58 @@
+from django.conf import settings
+from django.core.signals import request_started
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+
+SQLITE_PRAGMAS = {
+    'journal_mode': 'wal',
+    'busy_timeout': 20_000,
+}
+
+
+@receiver(connection_created)
+def configure_sqlite(sender, connection, **kwargs):
+    """
+    WAL пускает читателей параллельно с писателем, а busy_timeout
+    заставляет писателей ждать блокировку, а не падать сразу.
+    """
+    if connection.vendor != 'sqlite':
+        return
+    pragmas = getattr(settings, 'SQLITE_PRAGMAS', SQLITE_PRAGMAS)
+    for name, value in pragmas.items():
+        connection.connection.execute(f'PRAGMA {name} = {value}')
+
+
+@receiver(request_started)
+def check_connections(**kwargs):
+    """
+    Проверка постоянных соединений в запросе (CONN_HEALTH_CHECKS):
+    оборванное базой соединение закрывается и откроется заново,
+    а не уронит первый запрос к базе. Проверка идёт при первом
+    обращении к соединению, поэтому ответы без базы и базы, к которым
+    запрос не обращается, лишнего SELECT 1 не делают.
+    """
+    for connection in connections.all():
+        if not connection.settings_dict.get('CONN_HEALTH_CHECKS'):
+            continue
+        if not hasattr(connection, 'health_check_pending'):
+            check_on_first_use(connection)
+        connection.health_check_pending = True
+
+
+def check_on_first_use(connection):
+    """Проверяет соединение перед первым ensure_connection в запросе."""
+    ensure_connection = connection.ensure_connection
+
+    def checked_ensure_connection():
+        if connection.health_check_pending:
+            connection.health_check_pending = False
+            if (
+                connection.connection is not None
+                and not connection.in_atomic_block
+                and not connection.is_usable()
+            ):
+                connection.close()
+        ensure_connection()
+
+    connection.ensure_connection = checked_ensure_connection
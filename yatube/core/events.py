@@ -0,0 +1,182 @@
+"""
+Публикация событий в каналы и подписка на них.
+
+InProcessBroker раздаёт события подписчикам своего процесса; publish
+можно звать из любого потока, подписчики читают из asyncio-очередей.
+RedisBroker рассылает события через Redis, и их получают подписчики
+всех процессов. Брокер выбирается настройкой EVENTS_BROKER.
+"""
+import asyncio
+import json
+import logging
+import threading
+import time
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.utils.module_loading import import_string
+
+try:
+    import redis
+except ImportError:  # pragma: no cover
+    redis = None
+
+EVENTS_BROKER: str = 'core.events.InProcessBroker'
+EVENTS_QUEUE_SIZE: int = 100
+REDIS_CHANNEL_PREFIX: str = 'yatube:events:'
+REDIS_RECONNECT_DELAY: float = 1.0
+
+logger = logging.getLogger(__name__)
+
+_broker = None
+_broker_lock = threading.Lock()
+
+
+class Subscription:
+    """
+    Очередь событий одного подписчика. Медленный подписчик теряет
+    самые старые события, а не копит их без предела.
+    """
+
+    def __init__(self, broker, channels, loop, maxsize):
+        self.broker = broker
+        self.channels = tuple(channels)
+        self.loop = loop
+        self.queue = asyncio.Queue(maxsize)
+
+    def deliver(self, event):
+        try:
+            self.loop.call_soon_threadsafe(self._put, event)
+        except RuntimeError:
+            # Цикл подписчика уже закрыт, отписка вот-вот случится.
+            pass
+
+    def _put(self, event):
+        if self.queue.full():
+            self.queue.get_nowait()
+        self.queue.put_nowait(event)
+
+    async def get(self):
+        return await self.queue.get()
+
+    def close(self):
+        self.broker.unsubscribe(self)
+
+
+class InProcessBroker:
+    def __init__(self, queue_size=EVENTS_QUEUE_SIZE, **options):
+        self.queue_size = queue_size
+        self._subscribers = defaultdict(set)
+        self._lock = threading.Lock()
+
+    def subscribe(self, channels, loop=None):
+        subscription = Subscription(
+            self, channels, loop or asyncio.get_running_loop(),
+            self.queue_size
+        )
+        with self._lock:
+            for channel in subscription.channels:
+                self._subscribers[channel].add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            for channel in subscription.channels:
+                subscribers = self._subscribers.get(channel)
+                if subscribers is None:
+                    continue
+                subscribers.discard(subscription)
+                if not subscribers:
+                    del self._subscribers[channel]
+
+    def publish(self, channel, event):
+        self.deliver(channel, event)
+
+    def deliver(self, channel, event):
+        with self._lock:
+            subscribers = list(self._subscribers.get(channel, ()))
+        for subscription in subscribers:
+            subscription.deliver(event)
+
+
+class RedisBroker(InProcessBroker):
+    """
+    События через Redis PUBLISH: поток-слушатель процесса раздаёт
+    их местным подписчикам и после обрыва связи переподключается.
+    События, опубликованные за время обрыва, теряются. Нужен пакет
+    redis; LOCATION — URL.
+    """
+
+    def __init__(self, location, **options):
+        if redis is None:
+            raise ImproperlyConfigured(
+                'Для RedisBroker установите пакет redis'
+            )
+        super().__init__(**options)
+        self._client = redis.Redis.from_url(location)
+        self._listener = None
+
+    def subscribe(self, channels, loop=None):
+        with self._lock:
+            if self._listener is None:
+                self._listener = threading.Thread(
+                    target=self._listen, name='events-listener', daemon=True
+                )
+                self._listener.start()
+        return super().subscribe(channels, loop)
+
+    def _listen(self):
+        """
+        Слушает каналы до остановки процесса. Если поток всё же
+        завершился с ошибкой, следующая подписка запустит новый.
+        """
+        try:
+            while True:
+                try:
+                    self._receive()
+                except redis.RedisError as error:
+                    logger.warning(
+                        'Связь с Redis потеряна (%s), переподключение', error
+                    )
+                    time.sleep(REDIS_RECONNECT_DELAY)
+        finally:
+            with self._lock:
+                self._listener = None
+
+    def _receive(self):
+        pubsub = self._client.pubsub(ignore_subscribe_messages=True)
+        try:
+            pubsub.psubscribe(f'{REDIS_CHANNEL_PREFIX}*')
+            for message in pubsub.listen():
+                channel = message['channel'].decode()[
+                    len(REDIS_CHANNEL_PREFIX):
+                ]
+                self.deliver(channel, json.loads(message['data']))
+        finally:
+            pubsub.close()
+
+    def publish(self, channel, event):
+        self._client.publish(
+            f'{REDIS_CHANNEL_PREFIX}{channel}', json.dumps(event)
+        )
+
+
+def get_broker():
+    """Брокер процесса из EVENTS_BROKER и EVENTS_BROKER_OPTIONS."""
+    global _broker
+    with _broker_lock:
+        if _broker is None:
+            broker_class = import_string(
+                getattr(settings, 'EVENTS_BROKER', EVENTS_BROKER)
+            )
+            _broker = broker_class(
+                **getattr(settings, 'EVENTS_BROKER_OPTIONS', {})
+            )
+        return _broker
+
+
+def publish(channels, event):
+    broker = get_broker()
+    for channel in channels:
+        broker.publish(channel, event)
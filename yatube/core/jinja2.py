@@ -0,0 +1,54 @@
+"""
+Окружение Jinja2 для горячих страниц со списками постов
+(см. POSTS_JINJA2_VIEWS). Функции и фильтры повторяют теги и фильтры
+шаблонов Django, чтобы HTML обеих версий совпадал.
+"""
+from django.templatetags.static import static
+from django.urls import reverse
+from django.utils import formats
+from django.utils.dateformat import format as format_date
+from django.utils.timezone import template_localtime
+from jinja2 import Environment
+from markupsafe import Markup
+
+from core.templatetags.user_filters import addclass
+from posts.cards import get_page_card
+from posts.utils import JINJA2_ENGINE
+
+
+def url(name, *args, **kwargs):
+    """{% url %}: позиционные или именованные аргументы пути."""
+    return reverse(name, args=args or None, kwargs=kwargs or None)
+
+
+def date(value, format_string=None):
+    """Фильтр date Django, со временем в текущем часовом поясе."""
+    if value in (None, ''):
+        return ''
+    value = template_localtime(value)
+    try:
+        return formats.date_format(value, format_string)
+    except AttributeError:
+        try:
+            return format_date(value, format_string)
+        except AttributeError:
+            return ''
+
+
+def post_card(page_obj, post):
+    """{% post_card %}: кэшированная карточка, общая с шаблонами Django."""
+    return Markup(get_page_card(page_obj, post, using=JINJA2_ENGINE))
+
+
+def environment(**options):
+    env = Environment(**options)
+    env.globals.update({
+        'static': static,
+        'url': url,
+        'post_card': post_card,
+    })
+    env.filters.update({
+        'addclass': addclass,
+        'date': date,
+    })
+    return env
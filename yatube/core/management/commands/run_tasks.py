@@ -0,0 +1,73 @@
+import time
+from concurrent.futures import as_completed
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from core.tasks import (EXECUTORS, TASKS_EXECUTOR, get_due_tasks,
+                        make_executor, purge_tasks, run_task)
+
+
+class Command(BaseCommand):
+    help = (
+        'Выполняет фоновые задачи из очереди в базе: повторы после '
+        'ошибок и задачи, до которых не дошли пулы веб-процессов.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers', type=int,
+            default=max(getattr(settings, 'TASKS_WORKERS', 0), 1),
+            help='Размер пула (по умолчанию TASKS_WORKERS, не меньше 1).'
+        )
+        parser.add_argument(
+            '--executor', choices=EXECUTORS,
+            default=getattr(settings, 'TASKS_EXECUTOR', TASKS_EXECUTOR),
+            help='Пул потоков или процессов.'
+        )
+        parser.add_argument(
+            '--interval', type=float, default=1.0,
+            help='Секунд ожидания, когда очередь пуста.'
+        )
+        parser.add_argument(
+            '--once', action='store_true',
+            help='Выполнить готовые задачи и выйти.'
+        )
+
+    def handle(self, *args, **options):
+        if options['workers'] < 1:
+            raise CommandError('Нужен хотя бы один исполнитель.')
+        executor = make_executor(options['executor'], options['workers'])
+        purge_tasks()
+        try:
+            while True:
+                done = self.run_batch(executor, options['workers'] * 2)
+                if done:
+                    continue
+                if options['once']:
+                    return
+                purge_tasks()
+                time.sleep(options['interval'])
+        finally:
+            executor.shutdown()
+
+    def run_batch(self, executor, limit):
+        """Одна порция готовых задач; возвращает число запущенных."""
+        futures = [
+            executor.submit(run_task, task_id)
+            for task_id in get_due_tasks(limit)
+        ]
+        results = []
+        for future in as_completed(futures):
+            try:
+                results.append(future.result())
+            except Exception as error:
+                self.stderr.write(f'Исполнитель задач упал: {error}')
+        done = [result for result in results if result is not None]
+        if done:
+            self.stdout.write(
+                f'Задач выполнено: {done.count("ok")}, '
+                f'отложено: {done.count("retry")}, '
+                f'отклонено: {done.count("error")}'
+            )
+        return len(done)
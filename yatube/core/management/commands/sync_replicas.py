@@ -0,0 +1,38 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections
+
+from core.replicas import get_replicas, sync_replicas
+
+
+class Command(BaseCommand):
+    help = (
+        'Копирует основную SQLite-базу в реплики из DATABASE_REPLICAS. '
+        'С --interval повторяет копирование, изображая отстающую '
+        'репликацию.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--interval', type=float,
+            help='Секунд между копиями; без него копия делается один раз.'
+        )
+
+    def handle(self, *args, **options):
+        replicas = get_replicas()
+        if not replicas:
+            raise CommandError('DATABASE_REPLICAS пуст.')
+        aliases = (DEFAULT_DB_ALIAS, *replicas)
+        if any(connections[alias].vendor != 'sqlite' for alias in aliases):
+            raise CommandError('Копирование реплик есть только для SQLite.')
+        while True:
+            started = time.perf_counter()
+            sync_replicas(replicas)
+            self.stdout.write(
+                f'Реплики {", ".join(replicas)} обновлены за '
+                f'{time.perf_counter() - started:.2f} с'
+            )
+            if not options['interval']:
+                return
+            time.sleep(options['interval'])
@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from core.templating import warm_templates
+
+
+class Command(BaseCommand):
+    help = (
+        'Компилирует все шаблоны проекта: находит синтаксические ошибки '
+        'и показывает, сколько стоит прогрев при старте процесса.'
+    )
+
+    def handle(self, *args, **options):
+        compiled, seconds, errors = warm_templates(force=True)
+        if errors:
+            raise CommandError('\n'.join(
+                f'{name}: {error}' for name, error in errors.items()
+            ))
+        self.stdout.write(self.style.SUCCESS(
+            f'Шаблонов скомпилировано: {compiled} за {seconds * 1000:.0f} мс'
+        ))
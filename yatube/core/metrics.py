@@ -0,0 +1,343 @@
+"Метрики в текстовом формате Prometheus без внешних зависимостей."
+import glob
+import json
+import math
+import os
+import threading
+import time
+import uuid
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import connections
+
+METRICS_FLUSH_INTERVAL: float = 1.0
+LATENCY_BUCKETS = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0
+)
+QUERY_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 500)
+THUMBNAIL_BUCKETS = (0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+TASK_BUCKETS = (0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 30.0, 120.0)
+UNMATCHED_VIEW: str = 'unmatched'
+
+
+def format_value(value):
+    if value == math.inf:
+        return '+Inf'
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def format_labels(pairs):
+    if not pairs:
+        return ''
+    escaped = (
+        (name, str(value).replace('\\', '\\\\').replace('"', '\\"')
+         .replace('\n', '\\n'))
+        for name, value in pairs
+    )
+    return '{' + ','.join(f'{name}="{value}"' for name, value in escaped) + '}'
+
+
+class Metric:
+    """
+    Метрика с метками. Значения хранятся по ключу — JSON-списку
+    значений меток, чтобы снимок можно было записать в файл
+    и сложить со снимками других процессов.
+    """
+    kind = ''
+
+    def __init__(self, name, documentation, labelnames=(), registry=None):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+        (registry or REGISTRY).register(self)
+
+    def _key(self, labels):
+        return json.dumps([str(labels[name]) for name in self.labelnames])
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                key: list(value) if isinstance(value, list) else value
+                for key, value in self._values.items()
+            }
+
+
+class Counter(Metric):
+    kind = 'counter'
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+
+class Gauge(Metric):
+    """Gauge процесса; в общем отчёте суммируется по живым процессам."""
+    kind = 'gauge'
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount=1, **labels):
+        self.inc(-amount, **labels)
+
+    def set(self, value, **labels):
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+
+class Histogram(Metric):
+    """
+    Значение — [накопленные счётчики корзин..., сумма, количество]:
+    наблюдение попадает во все корзины с границей не меньше себя.
+    """
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(),
+                 buckets=LATENCY_BUCKETS, registry=None):
+        self.buckets = tuple(buckets) + (math.inf,)
+        super().__init__(name, documentation, labelnames, registry)
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            counts = self._values.setdefault(
+                key, [0] * (len(self.buckets) + 2)
+            )
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[index] += 1
+            counts[-2] += value
+            counts[-1] += 1
+
+
+class Registry:
+    """
+    Метрики процесса. С METRICS_DIR каждый процесс сбрасывает снимок
+    в свой файл, а отчёт складывает файлы всех процессов: так видны
+    суммарные числа всех воркеров WSGI. Счётчики и гистограммы
+    умерших процессов остаются в сумме, их gauge — нет.
+    """
+
+    def __init__(self):
+        self.metrics = {}
+        self._instance = uuid.uuid4().hex
+        self._flushed = 0.0
+        self._flush_lock = threading.Lock()
+
+    def register(self, metric):
+        self.metrics[metric.name] = metric
+
+    def snapshot(self):
+        return {
+            name: metric.snapshot() for name, metric in self.metrics.items()
+        }
+
+    def directory(self):
+        return getattr(settings, 'METRICS_DIR', None)
+
+    def path(self, directory):
+        return os.path.join(
+            directory, f'{os.getpid()}-{self._instance}.json'
+        )
+
+    def flush(self, force=False):
+        """Пишет снимок процесса в METRICS_DIR не чаще интервала."""
+        directory = self.directory()
+        if not directory:
+            return
+        interval = getattr(
+            settings, 'METRICS_FLUSH_INTERVAL', METRICS_FLUSH_INTERVAL
+        )
+        now = time.monotonic()
+        if not force and now - self._flushed < interval:
+            return
+        with self._flush_lock:
+            self._flushed = now
+            os.makedirs(directory, exist_ok=True)
+            path = self.path(directory)
+            temporary = f'{path}.tmp'
+            with open(temporary, 'w', encoding='utf-8') as file:
+                json.dump({'pid': os.getpid(), 'metrics': self.snapshot()},
+                          file)
+            os.replace(temporary, path)
+
+    def collect(self):
+        """Снимок этого процесса или сумма по всем процессам."""
+        directory = self.directory()
+        if not directory:
+            return self.snapshot()
+        self.flush(force=True)
+        merged = {name: {} for name in self.metrics}
+        for path in glob.glob(os.path.join(directory, '*.json')):
+            try:
+                with open(path, encoding='utf-8') as file:
+                    data = json.load(file)
+            except (OSError, ValueError):
+                continue
+            alive = process_alive(data['pid'])
+            for name, values in data['metrics'].items():
+                metric = self.metrics.get(name)
+                if metric is None or (metric.kind == 'gauge' and not alive):
+                    continue
+                target = merged[name]
+                for key, value in values.items():
+                    if isinstance(value, list):
+                        current = target.setdefault(key, [0] * len(value))
+                        target[key] = [
+                            left + right
+                            for left, right in zip(current, value)
+                        ]
+                    else:
+                        target[key] = target.get(key, 0) + value
+        return merged
+
+    def expose(self):
+        """Текстовый формат экспозиции Prometheus 0.0.4."""
+        lines = []
+        for name, values in sorted(self.collect().items()):
+            metric = self.metrics[name]
+            lines.append(f'# HELP {name} {metric.documentation}')
+            lines.append(f'# TYPE {name} {metric.kind}')
+            for key, value in sorted(values.items()):
+                pairs = list(zip(metric.labelnames, json.loads(key)))
+                if metric.kind != 'histogram':
+                    lines.append(
+                        f'{name}{format_labels(pairs)} {format_value(value)}'
+                    )
+                    continue
+                for bound, count in zip(metric.buckets, value):
+                    labels = format_labels(
+                        pairs + [('le', format_value(bound))]
+                    )
+                    lines.append(f'{name}_bucket{labels} {count}')
+                lines.append(
+                    f'{name}_sum{format_labels(pairs)} '
+                    f'{format_value(value[-2])}'
+                )
+                lines.append(
+                    f'{name}_count{format_labels(pairs)} '
+                    f'{format_value(value[-1])}'
+                )
+        return '\n'.join(lines) + '\n'
+
+
+def process_alive(pid):
+    if pid == os.getpid():
+        return True
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+REGISTRY = Registry()
+
+REQUEST_LATENCY = Histogram(
+    'yatube_request_duration_seconds', 'Время ответа по имени URL.',
+    ('view', 'method', 'status'),
+)
+REQUESTS_IN_FLIGHT = Gauge(
+    'yatube_requests_in_flight', 'Запросы в обработке.'
+)
+DB_QUERIES = Counter(
+    'yatube_db_queries_total', 'Запросы к базе по имени URL и алиасу базы.',
+    ('view', 'database'),
+)
+DB_QUERY_SECONDS = Counter(
+    'yatube_db_query_seconds_total',
+    'Время запросов к базе по имени URL и алиасу базы.',
+    ('view', 'database'),
+)
+DB_QUERIES_PER_REQUEST = Histogram(
+    'yatube_db_queries_per_request', 'Запросов ко всем базам на один ответ.',
+    ('view',), buckets=QUERY_BUCKETS,
+)
+POST_CARD_CACHE_REQUESTS = Counter(
+    'yatube_post_card_cache_requests_total',
+    'Обращения к кэшу карточек постов по результату.', ('result',),
+)
+THUMBNAILS = Counter(
+    'yatube_thumbnails_total', 'Нарезанные миниатюры постов.', ('result',)
+)
+THUMBNAIL_SECONDS = Histogram(
+    'yatube_thumbnail_duration_seconds',
+    'Время нарезки миниатюр одной картинки, включая очередь пула.',
+    buckets=THUMBNAIL_BUCKETS,
+)
+TASKS = Counter(
+    'yatube_tasks_total', 'Запуски фоновых задач по результату.',
+    ('task', 'result'),
+)
+TASK_SECONDS = Histogram(
+    'yatube_task_duration_seconds', 'Время выполнения фоновой задачи.',
+    ('task',), buckets=TASK_BUCKETS,
+)
+
+
+class QueryCounter:
+    """Обёртка connection.execute_wrapper: число и время запросов."""
+
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.count += 1
+            self.seconds += time.perf_counter() - started
+
+
+class MetricsMiddleware:
+    """
+    Время ответа, запросы к базам и число запросов в обработке.
+    Запросы считаются на всех соединениях, включая реплики.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        REQUESTS_IN_FLIGHT.inc()
+        queries = {}
+        started = time.perf_counter()
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    queries[connection.alias] = QueryCounter()
+                    stack.enter_context(connection.execute_wrapper(
+                        queries[connection.alias]
+                    ))
+                response = self.get_response(request)
+        finally:
+            REQUESTS_IN_FLIGHT.dec()
+        match = getattr(request, 'resolver_match', None)
+        view = match.view_name if match else UNMATCHED_VIEW
+        REQUEST_LATENCY.observe(
+            time.perf_counter() - started, view=view,
+            method=request.method, status=response.status_code,
+        )
+        for alias, counter in queries.items():
+            if counter.count:
+                DB_QUERIES.inc(counter.count, view=view, database=alias)
+                DB_QUERY_SECONDS.inc(
+                    counter.seconds, view=view, database=alias
+                )
+        DB_QUERIES_PER_REQUEST.observe(
+            sum(counter.count for counter in queries.values()), view=view
+        )
+        REGISTRY.flush()
+        return response
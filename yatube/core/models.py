@@ -0,0 +1,60 @@
+from django.db import models
+from django.utils import timezone
+
+
+class Task(models.Model):
+    """Фоновая задача в очереди (см. core/tasks.py)."""
+    QUEUED = 'queued'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+    STATUSES = (
+        (QUEUED, 'В очереди'),
+        (RUNNING, 'Выполняется'),
+        (DONE, 'Выполнена'),
+        (FAILED, 'Не выполнена'),
+    )
+
+    name = models.CharField(max_length=100, verbose_name='Задача')
+    args = models.TextField(default='[]', verbose_name='Аргументы (JSON)')
+    key = models.CharField(
+        max_length=200, unique=True, blank=True, null=True,
+        verbose_name='Ключ идемпотентности',
+        help_text='Задача с тем же ключом в очередь второй раз не попадёт'
+    )
+    status = models.CharField(
+        max_length=10, choices=STATUSES, default=QUEUED,
+        verbose_name='Состояние'
+    )
+    attempts = models.PositiveSmallIntegerField(
+        default=0, verbose_name='Попыток'
+    )
+    max_attempts = models.PositiveSmallIntegerField(
+        verbose_name='Предел попыток'
+    )
+    run_at = models.DateTimeField(
+        default=timezone.now, verbose_name='Выполнить не раньше'
+    )
+    locked_until = models.DateTimeField(
+        blank=True, null=True, verbose_name='Занята до',
+        help_text='Задачу упавшего исполнителя подхватят после этого срока'
+    )
+    last_error = models.TextField(blank=True, verbose_name='Последняя ошибка')
+    created = models.DateTimeField(
+        auto_now_add=True, verbose_name='Поставлена'
+    )
+    finished = models.DateTimeField(
+        blank=True, null=True, verbose_name='Завершена'
+    )
+
+    class Meta:
+        verbose_name_plural = 'Фоновые задачи'
+        verbose_name = 'Фоновая задача'
+        indexes = [
+            models.Index(
+                fields=['status', 'run_at'], name='core_task_due_idx'
+            ),
+        ]
+
+    def __str__(self):
+        return f'{self.name} ({self.get_status_display()})'
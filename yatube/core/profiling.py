@@ -0,0 +1,288 @@
+"Профилирование запросов: SQL, шаблоны и кэш в Server-Timing."
+import json
+import logging
+import random
+import time
+from collections import Counter, defaultdict
+from contextlib import ExitStack
+from contextvars import ContextVar
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import connections
+from django.template.base import Template
+from django.template.engine import Engine
+
+try:
+    from django.template.backends import jinja2 as jinja2_backend
+except ImportError:  # pragma: no cover
+    jinja2_backend = None
+
+logger = logging.getLogger(__name__)
+
+PROFILING_SAMPLE_RATE: float = 0.0
+PROFILING_LOG: bool = False
+# Столько запросов с одним текстом и разными параметрами — признак N+1.
+PROFILING_SIMILAR_THRESHOLD: int = 5
+SERVER_TIMING_TEMPLATES: int = 3
+
+_current = ContextVar('profile', default=None)
+_missing = object()
+
+
+class Profile:
+    """Замеры одного запроса."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.duration = None
+        self.queries = []
+        self.templates = defaultdict(lambda: [0, 0.0])
+        self.template_time = 0.0
+        self.template_depth = 0
+        self.template_loads = 0
+        self.template_load_time = 0.0
+        self.cache = defaultdict(lambda: [0, 0])
+        self.cache_depth = 0
+
+    def execute(self, execute, sql, params, many, context):
+        """Обёртка connection.execute_wrapper: время каждого запроса."""
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries.append(
+                (sql, repr(params), time.perf_counter() - started)
+            )
+
+    def add_template(self, name, duration, outermost):
+        stats = self.templates[name]
+        stats[0] += 1
+        stats[1] += duration
+        if outermost:
+            self.template_time += duration
+
+    def add_template_load(self, duration):
+        self.template_loads += 1
+        self.template_load_time += duration
+
+    def add_cache(self, backend, hits, misses):
+        stats = self.cache[backend]
+        stats[0] += hits
+        stats[1] += misses
+
+    def finish(self):
+        self.duration = time.perf_counter() - self.started
+
+    @property
+    def query_time(self):
+        return sum(duration for _, _, duration in self.queries)
+
+    def duplicates(self):
+        """Сколько запросов повторили уже сделанный с теми же параметрами."""
+        counts = Counter((sql, params) for sql, params, _ in self.queries)
+        return sum(count - 1 for count in counts.values())
+
+    def similar(self):
+        """Запросы, повторённые с разными параметрами не меньше порога."""
+        threshold = getattr(
+            settings, 'PROFILING_SIMILAR_THRESHOLD',
+            PROFILING_SIMILAR_THRESHOLD
+        )
+        counts = Counter(sql for sql, _, _ in self.queries)
+        return {
+            sql: count for sql, count in counts.most_common()
+            if count >= threshold
+        }
+
+    def server_timing(self):
+        """Значение заголовка Server-Timing."""
+        hits = sum(hits for hits, _ in self.cache.values())
+        misses = sum(misses for _, misses in self.cache.values())
+        metrics = [
+            f'total;dur={self.duration * 1000:.1f}',
+            f'db;dur={self.query_time * 1000:.1f};'
+            f'desc="{len(self.queries)} queries, '
+            f'{self.duplicates()} duplicates, '
+            f'{len(self.similar())} similar"',
+            f'tpl;dur={self.template_time * 1000:.1f}',
+            f'tpl-load;dur={self.template_load_time * 1000:.1f};'
+            f'desc="{self.template_loads} lookups"',
+        ]
+        slowest = sorted(
+            self.templates.items(), key=lambda item: item[1][1],
+            reverse=True
+        )[:SERVER_TIMING_TEMPLATES]
+        metrics += [
+            f'tpl-{index};dur={total * 1000:.1f};desc="{name} x{count}"'
+            for index, (name, (count, total)) in enumerate(slowest, 1)
+        ]
+        metrics.append(f'cache;desc="{hits} hits, {misses} misses"')
+        return ', '.join(metrics)
+
+    def as_dict(self):
+        return {
+            'duration_ms': round(self.duration * 1000, 3),
+            'queries': len(self.queries),
+            'query_ms': round(self.query_time * 1000, 3),
+            'duplicate_queries': self.duplicates(),
+            'similar_queries': self.similar(),
+            'template_ms': round(self.template_time * 1000, 3),
+            'template_loads': self.template_loads,
+            'template_load_ms': round(self.template_load_time * 1000, 3),
+            'templates': {
+                name: {'count': count, 'ms': round(total * 1000, 3)}
+                for name, (count, total) in self.templates.items()
+            },
+            'cache': {
+                backend: {'hits': hits, 'misses': misses}
+                for backend, (hits, misses) in self.cache.items()
+            },
+        }
+
+
+def _profile_render(render, get_name):
+    @wraps(render)
+    def wrapper(self, *args, **kwargs):
+        profile = _current.get()
+        if profile is None:
+            return render(self, *args, **kwargs)
+        outermost = profile.template_depth == 0
+        profile.template_depth += 1
+        started = time.perf_counter()
+        try:
+            return render(self, *args, **kwargs)
+        finally:
+            profile.template_depth -= 1
+            profile.add_template(
+                get_name(self) or '<string>', time.perf_counter() - started,
+                outermost
+            )
+
+    wrapper.profiled = True
+    return wrapper
+
+
+def instrument_templates():
+    """
+    Оборачивает Template._render: замеряется каждый шаблон, включая
+    include; у Jinja2 — шаблон страницы целиком. Отдельно считается
+    поиск шаблонов (Engine.find_template): без cached.Loader это
+    чтение и разбор файла. Вне профилируемого запроса обёртки только
+    проверяют контекстную переменную.
+    """
+    if getattr(Template._render, 'profiled', False):
+        return
+    find_template = Engine.find_template
+
+    @wraps(find_template)
+    def _find_template(self, *args, **kwargs):
+        profile = _current.get()
+        if profile is None:
+            return find_template(self, *args, **kwargs)
+        started = time.perf_counter()
+        try:
+            return find_template(self, *args, **kwargs)
+        finally:
+            profile.add_template_load(time.perf_counter() - started)
+
+    Template._render = _profile_render(
+        Template._render, lambda template: template.name
+    )
+    Engine.find_template = _find_template
+    if jinja2_backend is not None:
+        jinja2_backend.Template.render = _profile_render(
+            jinja2_backend.Template.render,
+            lambda template: template.template.name
+        )
+
+
+def _count_cache(method, many):
+    @wraps(method)
+    def wrapper(self, *args, **kwargs):
+        profile = _current.get()
+        # Вложенные вызовы (L2 внутри TieredCache) не считаются.
+        if profile is None or profile.cache_depth or not (args or many):
+            return method(self, *args, **kwargs)
+        profile.cache_depth += 1
+        try:
+            if many:
+                keys = list(args[0] if args else kwargs.pop('keys'))
+                found = method(self, keys, *args[1:], **kwargs)
+                profile.add_cache(
+                    type(self).__name__, len(found), len(keys) - len(found)
+                )
+                return found
+            default = args[1] if len(args) > 1 else kwargs.pop(
+                'default', None
+            )
+            value = method(self, args[0], _missing, *args[2:], **kwargs)
+            if value is _missing:
+                profile.add_cache(type(self).__name__, 0, 1)
+                return default
+            profile.add_cache(type(self).__name__, 1, 0)
+            return value
+        finally:
+            profile.cache_depth -= 1
+
+    wrapper.profiled = True
+    return wrapper
+
+
+def instrument_caches():
+    """Считает попадания и промахи get/get_many у бэкендов из CACHES."""
+    for alias in settings.CACHES:
+        backend = type(caches[alias])
+        for name, many in (('get', False), ('get_many', True)):
+            method = getattr(backend, name)
+            if not getattr(method, 'profiled', False):
+                setattr(backend, name, _count_cache(method, many))
+
+
+def is_sampled():
+    rate = getattr(settings, 'PROFILING_SAMPLE_RATE', PROFILING_SAMPLE_RATE)
+    return rate > 0 and random.random() < rate
+
+
+class ProfilingMiddleware:
+    """
+    Для доли запросов PROFILING_SAMPLE_RATE считает SQL (время,
+    повторы, похожие запросы), время шаблонов и попадания в кэш.
+    Итог уходит в заголовок Server-Timing, а при PROFILING_LOG ещё
+    и JSON-строкой в лог core.profiling. Остальные запросы проходят
+    без замеров.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        instrument_templates()
+        instrument_caches()
+
+    def __call__(self, request):
+        if not is_sampled():
+            return self.get_response(request)
+        profile = Profile()
+        token = _current.set(profile)
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(
+                        connection.execute_wrapper(profile.execute)
+                    )
+                response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        profile.finish()
+        timing = profile.server_timing()
+        if response.has_header('Server-Timing'):
+            timing = f'{response["Server-Timing"]}, {timing}'
+        response['Server-Timing'] = timing
+        if getattr(settings, 'PROFILING_LOG', PROFILING_LOG):
+            logger.info(json.dumps({
+                'method': request.method,
+                'path': request.path,
+                'status': response.status_code,
+                **profile.as_dict(),
+            }, ensure_ascii=False))
+        return response
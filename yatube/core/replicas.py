@@ -0,0 +1,127 @@
+"""
+Чтение с реплик: роутер баз и middleware с read-your-writes.
+
+Middleware включает чтение с реплики только для безопасных запросов
+к вьюхам из REPLICA_APPS. Любая запись за время запроса закрепляет
+браузер за основной базой на REPLICA_PIN_SECONDS: так автор сразу
+видит свой пост, комментарий или подписку, даже пока реплика отстаёт.
+"""
+import random
+import time
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+DATABASE_REPLICAS = ()
+REPLICA_APPS = ('posts', 'api')
+REPLICA_PIN_SECONDS: float = 5.0
+REPLICA_PIN_COOKIE: str = 'primary_until'
+# Сессии пишутся почти на каждый вход и всегда читаются с основной базы.
+PRIMARY_ONLY_APPS = ('sessions',)
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+_state = ContextVar('replica_routing', default=None)
+
+
+def get_replicas():
+    return getattr(settings, 'DATABASE_REPLICAS', DATABASE_REPLICAS)
+
+
+class RoutingState:
+    """Выбор базы в рамках одного запроса."""
+
+    def __init__(self, pinned):
+        self.pinned = pinned
+        self.replica = None
+        self.wrote = False
+
+
+class ReplicaRouter:
+    """
+    Пишет всегда в основную базу. Читает с реплики, выбранной
+    middleware для запроса, если браузер не закреплён за основной
+    базой, в этом запросе ещё не было записей и нет открытой
+    транзакции: внутри неё нужны свои же незакоммиченные строки.
+    """
+
+    def db_for_read(self, model, **hints):
+        state = _state.get()
+        if (
+            state is None or state.replica is None or state.pinned
+            or state.wrote or model._meta.app_label in PRIMARY_ONLY_APPS
+            or connections[DEFAULT_DB_ALIAS].in_atomic_block
+        ):
+            return DEFAULT_DB_ALIAS
+        return state.replica
+
+    def db_for_write(self, model, **hints):
+        state = _state.get()
+        if state is not None:
+            state.wrote = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        databases = {DEFAULT_DB_ALIAS, *get_replicas()}
+        if {obj1._state.db, obj2._state.db} <= databases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        """Схема приезжает на реплики вместе с данными."""
+        return db not in get_replicas()
+
+
+def is_pinned(request):
+    try:
+        until = float(request.COOKIES.get(REPLICA_PIN_COOKIE, 0))
+    except ValueError:
+        return False
+    return until > time.time()
+
+
+class ReplicaMiddleware:
+    """Выбирает реплику для чтения и закрепляет писавших за основной базой."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        state = RoutingState(pinned=is_pinned(request))
+        token = _state.set(state)
+        try:
+            response = self.get_response(request)
+        finally:
+            _state.reset(token)
+        if state.wrote:
+            seconds = getattr(
+                settings, 'REPLICA_PIN_SECONDS', REPLICA_PIN_SECONDS
+            )
+            response.set_cookie(
+                REPLICA_PIN_COOKIE, str(time.time() + seconds),
+                max_age=seconds, httponly=True, samesite='Lax'
+            )
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        state = _state.get()
+        replicas = get_replicas()
+        if (
+            state is not None and replicas
+            and request.method in SAFE_METHODS
+            and request.resolver_match.app_name in REPLICA_APPS
+        ):
+            state.replica = random.choice(replicas)
+
+
+def sync_replicas(replicas=None):
+    """
+    Подмена репликации для SQLite: копирует основную базу в файлы
+    реплик через backup API, то есть согласованным снимком.
+    """
+    source = connections[DEFAULT_DB_ALIAS]
+    source.ensure_connection()
+    for alias in replicas or get_replicas():
+        target = connections[alias]
+        target.ensure_connection()
+        source.connection.backup(target.connection)
@@ -0,0 +1,297 @@
+"""
+Очередь фоновых задач в базе, без внешних сервисов.
+
+Задача — функция с декоратором @task. delay() пишет её в таблицу
+core_task в той же транзакции, что и данные, а после коммита отдаёт
+пулу потоков или процессов текущего процесса, и вьюха не ждёт
+выполнения. Команда run_tasks выполняет то, до чего пул не дошёл:
+повторы после ошибок (с экспоненциальной задержкой) и задачи упавших
+процессов. Задача с уже известным ключом идемпотентности второй раз
+в очередь не ставится. При TASKS_WORKERS = 0 пула нет: задача
+выполняется в том же потоке после коммита, её ошибка не доходит
+до вьюхи, а повтор достаётся run_tasks; отложенные задачи ждут
+run_tasks.
+"""
+import json
+import logging
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import close_old_connections, connections, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from .metrics import TASK_SECONDS, TASKS
+from .models import Task
+
+logger = logging.getLogger(__name__)
+
+TASKS_WORKERS: int = 2
+TASKS_EXECUTOR: str = 'thread'
+TASKS_MAX_ATTEMPTS: int = 5
+TASKS_RETRY_DELAY: float = 10.0
+TASKS_RETRY_MAX_DELAY: float = 3600.0
+# Столько секунд задача числится за исполнителем; потом её подхватят.
+TASKS_LEASE: float = 300.0
+TASKS_KEEP_DONE: float = 7 * 24 * 3600
+EXECUTORS = ('thread', 'process')
+
+_registry = {}
+_executor = None
+_executor_lock = threading.Lock()
+_inherited_connections = []
+
+
+class TaskFunction:
+    """Зарегистрированная задача: вызов выполняет её сразу, delay — в фоне."""
+
+    def __init__(self, func, name, max_attempts):
+        self.func = func
+        self.name = name
+        self.max_attempts = max_attempts
+        self.__doc__ = func.__doc__
+
+    def __call__(self, *args):
+        return self.func(*args)
+
+    def delay(self, *args, key=None, countdown=0):
+        """
+        Ставит задачу в очередь. Аргументы должны сериализоваться
+        в JSON. Возвращает строку очереди или None, если задача
+        выполнена сразу или с ключом key уже стоит в очереди.
+        """
+        return enqueue(self, args, key=key, countdown=countdown)
+
+
+def task(func=None, *, name=None, max_attempts=None):
+    """Регистрирует функцию как задачу под именем модуль.функция."""
+    def decorator(func):
+        task_function = TaskFunction(
+            func, name or f'{func.__module__}.{func.__name__}', max_attempts
+        )
+        _registry[task_function.name] = task_function
+        return task_function
+    if func is not None:
+        return decorator(func)
+    return decorator
+
+
+def get_workers():
+    return getattr(settings, 'TASKS_WORKERS', TASKS_WORKERS)
+
+
+def get_retry_delay(attempts):
+    """Задержка перед попыткой attempts + 1: удваивается до предела."""
+    delay = getattr(settings, 'TASKS_RETRY_DELAY', TASKS_RETRY_DELAY)
+    return min(
+        delay * 2 ** (attempts - 1),
+        getattr(settings, 'TASKS_RETRY_MAX_DELAY', TASKS_RETRY_MAX_DELAY)
+    )
+
+
+def enqueue(task_function, args, key=None, countdown=0):
+    if not (get_workers() or countdown):
+        transaction.on_commit(lambda: run_inline(task_function, args, key))
+        return None
+    values = task_values(task_function, args, countdown)
+    if key is None:
+        row = Task.objects.create(**values)
+    else:
+        row, created = Task.objects.get_or_create(key=key, defaults=values)
+        if not created:
+            return None
+    if get_workers() and not countdown:
+        transaction.on_commit(lambda: dispatch(row.pk))
+    return row
+
+
+def task_values(task_function, args, countdown=0):
+    return {
+        'name': task_function.name,
+        'args': json.dumps(args),
+        'max_attempts': task_function.max_attempts or getattr(
+            settings, 'TASKS_MAX_ATTEMPTS', TASKS_MAX_ATTEMPTS
+        ),
+        'run_at': timezone.now() + timedelta(seconds=countdown),
+    }
+
+
+def run_inline(task_function, args, key=None):
+    """
+    Задача без пула, после коммита. Упавшая задача становится
+    строкой очереди с первой попыткой: её повторит run_tasks.
+    """
+    started = time.perf_counter()
+    try:
+        with transaction.atomic():
+            task_function(*args)
+    except Exception as error:
+        delay = get_retry_delay(1)
+        values = {
+            **task_values(task_function, args, delay),
+            'attempts': 1,
+            'last_error': f'{type(error).__name__}: {error}',
+        }
+        if key is None:
+            Task.objects.create(**values)
+        else:
+            Task.objects.get_or_create(key=key, defaults=values)
+        result = 'retry'
+        logger.warning('Задача %s упала, повтор через %s с',
+                       task_function.name, delay, exc_info=error)
+    else:
+        result = 'ok'
+    TASK_SECONDS.observe(time.perf_counter() - started,
+                         task=task_function.name)
+    TASKS.inc(task=task_function.name, result=result)
+    return result
+
+
+def drop_inherited_connections():
+    """
+    Процесс пула забывает соединения, полученные от родителя через fork,
+    не закрывая их: закрытие завершило бы на сервере сессию родителя.
+    Старые объекты живут до конца процесса, чтобы их не закрыл и
+    сборщик мусора; свои соединения процесс откроет сам.
+    """
+    for connection in connections.all():
+        if connection.connection is not None:
+            _inherited_connections.append(connection.connection)
+            connection.connection = None
+
+
+def make_executor(kind, workers):
+    if kind not in EXECUTORS:
+        raise ValueError(f'Неизвестный пул задач: {kind}')
+    if kind == 'process':
+        return ProcessPoolExecutor(
+            workers, initializer=drop_inherited_connections
+        )
+    return ThreadPoolExecutor(workers, thread_name_prefix='tasks')
+
+
+def get_executor():
+    """Пул процесса создаётся при первой задаче."""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = make_executor(
+                getattr(settings, 'TASKS_EXECUTOR', TASKS_EXECUTOR),
+                get_workers()
+            )
+        return _executor
+
+
+def shutdown_executor():
+    """Дожидается задач пула процесса и закрывает его."""
+    global _executor
+    with _executor_lock:
+        executor, _executor = _executor, None
+    if executor is not None:
+        executor.shutdown()
+
+
+def dispatch(task_id):
+    """
+    Отдаёт задачу пулу; без пула (его отключили после постановки)
+    её выполнит run_tasks.
+    """
+    if not get_workers():
+        return
+    get_executor().submit(run_task, task_id)
+
+
+def due_filter(now):
+    """Пора выполнять: срок подошёл или исполнитель не вернул задачу."""
+    return (
+        Q(status=Task.QUEUED, run_at__lte=now)
+        | Q(status=Task.RUNNING, locked_until__lt=now)
+    )
+
+
+def claim(task_id):
+    """
+    Забирает задачу одним UPDATE: из нескольких исполнителей его
+    выполнит только один. None — задачу уже забрали или не пора.
+    """
+    now = timezone.now()
+    lease = getattr(settings, 'TASKS_LEASE', TASKS_LEASE)
+    claimed = Task.objects.filter(due_filter(now), pk=task_id).update(
+        status=Task.RUNNING, attempts=F('attempts') + 1,
+        locked_until=now + timedelta(seconds=lease)
+    )
+    if not claimed:
+        return None
+    return Task.objects.get(pk=task_id)
+
+
+def execute(row):
+    """Выполняет забранную задачу и записывает исход."""
+    task_function = _registry.get(row.name)
+    started = time.perf_counter()
+    try:
+        if task_function is None:
+            raise LookupError(f'Задача {row.name} не зарегистрирована')
+        with transaction.atomic():
+            task_function(*json.loads(row.args))
+    except Exception as error:
+        result = fail(row, error)
+    else:
+        result = 'ok'
+        Task.objects.filter(pk=row.pk, attempts=row.attempts).update(
+            status=Task.DONE, finished=timezone.now(), locked_until=None
+        )
+    TASK_SECONDS.observe(time.perf_counter() - started, task=row.name)
+    TASKS.inc(task=row.name, result=result)
+    return result
+
+
+def fail(row, error):
+    """Повтор с задержкой, а после последней попытки — отказ."""
+    values = {'last_error': f'{type(error).__name__}: {error}',
+              'locked_until': None}
+    if row.attempts < row.max_attempts:
+        delay = get_retry_delay(row.attempts)
+        values.update(status=Task.QUEUED,
+                      run_at=timezone.now() + timedelta(seconds=delay))
+        result = 'retry'
+        logger.warning('Задача %s (%s) упала, повтор через %s с',
+                       row.pk, row.name, delay, exc_info=error)
+    else:
+        values.update(status=Task.FAILED, finished=timezone.now())
+        result = 'error'
+        logger.error('Задача %s (%s) не выполнена за %s попыток',
+                     row.pk, row.name, row.attempts, exc_info=error)
+    Task.objects.filter(pk=row.pk, attempts=row.attempts).update(**values)
+    return result
+
+
+def run_task(task_id):
+    """Забирает и выполняет задачу; идёт в потоке или процессе пула."""
+    close_old_connections()
+    try:
+        row = claim(task_id)
+        if row is None:
+            return None
+        return execute(row)
+    finally:
+        close_old_connections()
+
+
+def get_due_tasks(limit):
+    return list(
+        Task.objects.filter(due_filter(timezone.now()))
+        .order_by('run_at', 'pk').values_list('pk', flat=True)[:limit]
+    )
+
+
+def purge_tasks():
+    """Удаляет давно выполненные задачи; вместе с ними уходят их ключи."""
+    keep = getattr(settings, 'TASKS_KEEP_DONE', TASKS_KEEP_DONE)
+    deleted, _ = Task.objects.filter(
+        status=Task.DONE, finished__lt=timezone.now() - timedelta(seconds=keep)
+    ).delete()
+    return deleted
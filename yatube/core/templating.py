@@ -0,0 +1,87 @@
+"""
+Загрузка шаблонов: обход всех шаблонов проекта и прогрев кэша
+скомпилированных шаблонов при старте процесса.
+
+С cached.Loader каждый шаблон читается и разбирается один раз
+на процесс. Прогрев делает это до первого запроса, а заодно
+находит синтаксические ошибки в шаблонах, которые редко открывают.
+"""
+import logging
+import os
+import time
+
+from django.conf import settings
+from django.template import TemplateDoesNotExist, TemplateSyntaxError, engines
+from django.template.loaders.cached import Loader as CachedLoader
+
+logger = logging.getLogger(__name__)
+
+TEMPLATE_EXTENSIONS = ('.html', '.txt')
+TEMPLATES_WARMUP: bool = False
+
+
+def get_engines():
+    """Движки Django Templates из settings.TEMPLATES."""
+    return [
+        backend.engine for backend in engines.all()
+        if hasattr(backend, 'engine')
+    ]
+
+
+def is_cached(engine):
+    return any(
+        isinstance(loader, CachedLoader) for loader in engine.template_loaders
+    )
+
+
+def iter_template_names(engine):
+    """
+    Имена шаблонов из каталогов всех загрузчиков. Имя встречается
+    один раз: шаблон из первого каталога перекрывает остальные.
+    """
+    seen = set()
+    for loader in engine.template_loaders:
+        for inner in getattr(loader, 'loaders', [loader]):
+            for directory in inner.get_dirs():
+                for root, _, files in sorted(os.walk(str(directory))):
+                    for file in sorted(files):
+                        if not file.endswith(TEMPLATE_EXTENSIONS):
+                            continue
+                        name = os.path.relpath(
+                            os.path.join(root, file), str(directory)
+                        ).replace(os.sep, '/')
+                        if name not in seen:
+                            seen.add(name)
+                            yield name
+
+
+def warm_templates(force=False):
+    """
+    Компилирует все шаблоны движков с cached.Loader (с force —
+    и без него, чтобы только проверить). Возвращает число шаблонов,
+    секунды и ошибки {имя: исключение}.
+    """
+    started = time.perf_counter()
+    compiled, errors = 0, {}
+    for engine in get_engines():
+        if not (force or is_cached(engine)):
+            continue
+        for name in iter_template_names(engine):
+            try:
+                engine.get_template(name)
+            except (TemplateSyntaxError, TemplateDoesNotExist,
+                    UnicodeDecodeError) as error:
+                errors[name] = error
+            else:
+                compiled += 1
+    return compiled, time.perf_counter() - started, errors
+
+
+def warm_on_startup():
+    """Прогрев из wsgi.py и asgi.py; ошибки шаблонов только в лог."""
+    if not getattr(settings, 'TEMPLATES_WARMUP', TEMPLATES_WARMUP):
+        return
+    compiled, seconds, errors = warm_templates()
+    for name, error in errors.items():
+        logger.error('Шаблон %s не компилируется: %s', name, error)
+    logger.info('Шаблонов скомпилировано: %s за %.3f с', compiled, seconds)
@@ -0,0 +1,33 @@
+"""
+Окружение тестов. Тесты свободно чистят кэш, поэтому общий кэш
+(файл SQLite разработчика или Redis) на время прогона подменяется
+кэшем в памяти процесса.
+"""
+from django.conf import settings
+from django.test.runner import DiscoverRunner
+from django.test.utils import override_settings
+
+TEST_SHARED_CACHE = {
+    'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    'LOCATION': 'yatube-tests',
+}
+
+
+def override_test_caches():
+    """override_settings с settings.CACHES, где общий кэш — в памяти."""
+    return override_settings(
+        CACHES={**settings.CACHES, 'shared': TEST_SHARED_CACHE}
+    )
+
+
+class TestRunner(DiscoverRunner):
+    """manage.py test: DiscoverRunner с кэшем в памяти."""
+
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        self.caches = override_test_caches()
+        self.caches.enable()
+
+    def teardown_test_environment(self, **kwargs):
+        self.caches.disable()
+        super().teardown_test_environment(**kwargs)
@@ -1,7 +1,49 @@
 
+import json
+import os
+import shutil
+import sqlite3
+import tempfile
+import threading
+import time
+from copy import deepcopy
+from datetime import timedelta
 from http import HTTPStatus
+from io import StringIO
+from unittest import mock
 
-from django.test import Client, TestCase
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache, caches
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import connection, connections
+from django.db.utils import load_backend
+from django.test import (Client, TestCase, TransactionTestCase,
+                         modify_settings, override_settings)
+from django.urls import reverse
+from django.utils import timezone
+
+from core.cache.sqlite import SQLiteCache
+from core.cache.tiered import TieredCache
+from core.metrics import (REGISTRY, TASKS, Counter, Gauge, Histogram, Registry,
+                          format_labels)
+from core.db.config import parse_database_url
+from core.db.signals import check_connections
+from core.profiling import (Profile, _current, instrument_caches,
+                            instrument_templates)
+from core.models import Task
+from core.replicas import REPLICA_PIN_COOKIE, sync_replicas
+from core.tasks import (claim, drop_inherited_connections, execute,
+                        get_retry_delay, shutdown_executor, task)
+from core.templating import get_engines, warm_templates
+from core.testing import TEST_SHARED_CACHE
+from posts.models import Comment, Follow, Group, Post, TimelineEntry
+from posts.tasks import fanout
+from posts.tests.utils import run_commit_hooks
+
+User = get_user_model()
 
 
 class ViewTestClass(TestCase):
@@ -13,3 +55,710 @@ class ViewTestClass(TestCase):
         response = self.client.get('/404-page/')
         self.assertEqual(response.status_code, HTTPStatus.NOT_FOUND)
         self.assertTemplateUsed(response, 'core/404.html')
+
+
+class SQLiteCacheTests(TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.cache = SQLiteCache(
+            os.path.join(self.directory, 'cache.sqlite3'), {}
+        )
+
+    def tearDown(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def test_set_get_delete(self):
+        """Базовые операции общего кэша."""
+        self.cache.set('key', {'value': 1})
+        self.assertEqual(self.cache.get('key'), {'value': 1})
+        self.assertFalse(self.cache.add('key', 'other'))
+        self.assertTrue(self.cache.add('counter', 1))
+        self.assertEqual(self.cache.incr('counter'), 2)
+        self.cache.set_many({'a': 1, 'b': 2})
+        self.assertEqual(self.cache.get_many(['a', 'b', 'c']),
+                         {'a': 1, 'b': 2})
+        self.cache.delete('key')
+        self.assertIsNone(self.cache.get('key'))
+
+    def test_expired_value_is_missing(self):
+        """Просроченные значения не отдаются."""
+        self.cache.set('key', 'value', timeout=-1)
+        self.assertIsNone(self.cache.get('key'))
+        self.assertTrue(self.cache.add('key', 'new'))
+
+    def test_shared_between_instances(self):
+        """Два экземпляра (как два воркера) видят одни данные."""
+        other = SQLiteCache(self.cache._path, {})
+        self.cache.set('key', 'value')
+        self.assertEqual(other.get('key'), 'value')
+
+
+@override_settings(CACHES={
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'shared': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'tiered-tests',
+    },
+})
+class TieredCacheTests(TestCase):
+    def worker(self, name):
+        """
+        Отдельный L1 на общем L2 — как у воркера WSGI; KEY_PREFIX
+        разводит L1 двух «воркеров» внутри одного процесса.
+        """
+        return TieredCache('shared', {'OPTIONS': {
+            'CHECK_INTERVAL': 0, 'L1_TIMEOUT': 60
+        }, 'KEY_PREFIX': name})
+
+    def setUp(self):
+        caches['shared'].clear()
+        # L1 всех «воркеров» — одно хранилище LocMemCache процесса.
+        self.worker('first')._l1.clear()
+
+    def test_reads_are_served_from_l1(self):
+        """Повторное чтение не идёт в L2."""
+        cache = self.worker('first')
+        cache.set('key', 'value')
+        cache._l1.set('key', 'from-l1')
+        self.assertEqual(cache.get('key'), 'from-l1')
+
+    def test_invalidation_reaches_other_workers(self):
+        """Запись в одном воркере сбрасывает L1 другого."""
+        first, second = self.worker('first'), self.worker('second')
+        first.set('key', 'old')
+        self.assertEqual(second.get('key'), 'old')
+        first.set('key', 'new')
+        self.assertEqual(second.get('key'), 'new')
+        first.delete('key')
+        self.assertIsNone(second.get('key'))
+
+    def test_write_keeps_unrelated_l1_entries(self):
+        """Запись одного ключа не сбрасывает остальной L1 других воркеров."""
+        first, second = self.worker('first'), self.worker('second')
+        first.set('card', 'v1')
+        self.assertEqual(second.get('card'), 'v1')
+        second._l1.set('card', 'from-l1')
+        first.set_many({'other': 1, 'more': 2})
+        first.incr('other')
+        self.assertEqual(second.get('card'), 'from-l1')
+        self.assertEqual(second.get('other'), 2)
+
+    def test_clear_resets_other_workers(self):
+        """После очистки L2 чужой L1 тоже пуст, даже при новых записях."""
+        first, second = self.worker('first'), self.worker('second')
+        first.set('key', 'old')
+        self.assertEqual(second.get('key'), 'old')
+        first.clear()
+        first.set('key', 'new')
+        self.assertEqual(second.get('key'), 'new')
+
+
+class TestRunnerTests(TestCase):
+    def test_tests_run_off_shared_cache(self):
+        """Тесты идут с общим кэшем в памяти, а не в файле или Redis."""
+        self.assertEqual(settings.CACHES['shared'], TEST_SHARED_CACHE)
+        self.assertIsInstance(caches['shared'], LocMemCache)
+
+
+@modify_settings(MIDDLEWARE={'prepend': 'core.profiling.ProfilingMiddleware'})
+@override_settings(PROFILING_SAMPLE_RATE=1, PROFILING_LOG=False)
+class ProfilingMiddlewareTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='author')
+        Post.objects.create(text='Пост', author=cls.author)
+
+    def test_server_timing_header(self):
+        """Профилируемый ответ несёт SQL, шаблоны и кэш в Server-Timing."""
+        timing = self.client.get('/')['Server-Timing']
+        self.assertRegex(timing, r'db;dur=[\d.]+;desc="\d+ queries')
+        self.assertIn('tpl-1;dur=', timing)
+        self.assertIn('posts/index.html', timing)
+        self.assertRegex(timing, r'cache;desc="\d+ hits, \d+ misses"')
+
+    @override_settings(PROFILING_SAMPLE_RATE=0)
+    def test_not_sampled(self):
+        self.assertFalse(self.client.get('/').has_header('Server-Timing'))
+
+    @override_settings(PROFILING_LOG=True)
+    def test_json_log_line(self):
+        with self.assertLogs('core.profiling', 'INFO') as logs:
+            self.client.get('/')
+        record = json.loads(logs.records[0].getMessage())
+        self.assertEqual(record['path'], '/')
+        self.assertGreater(record['queries'], 0)
+        self.assertIn('posts/index.html', record['templates'])
+
+
+class ProfileTests(TestCase):
+    def profile(self, *queries):
+        profile = Profile()
+        profile.queries = [(sql, params, 0.001) for sql, params in queries]
+        profile.finish()
+        return profile
+
+    @override_settings(PROFILING_SIMILAR_THRESHOLD=3)
+    def test_duplicate_and_similar_queries(self):
+        """Повторы и N+1 различаются по параметрам запросов."""
+        profile = self.profile(
+            ('SELECT a WHERE id = %s', '(1,)'),
+            ('SELECT a WHERE id = %s', '(1,)'),
+            ('SELECT a WHERE id = %s', '(2,)'),
+            ('SELECT b', '()'),
+        )
+        self.assertEqual(profile.duplicates(), 1)
+        self.assertEqual(profile.similar(), {'SELECT a WHERE id = %s': 3})
+        self.assertIn('4 queries, 1 duplicates, 1 similar',
+                      profile.server_timing())
+
+    def test_queries_are_timed_through_execute_wrapper(self):
+        profile = Profile()
+        with connection.execute_wrapper(profile.execute):
+            User.objects.count()
+        self.assertEqual(len(profile.queries), 1)
+        self.assertIn('COUNT', profile.queries[0][0])
+
+    def test_cache_hits_and_misses(self):
+        """get и get_many считают попадания, вложенный L2 — нет."""
+        instrument_caches()
+        cache.set('present', None)
+        profile = Profile()
+        token = _current.set(profile)
+        try:
+            self.assertIsNone(cache.get('present', 'default'))
+            self.assertEqual(cache.get('absent', 'default'), 'default')
+            cache.get_many(['present', 'absent'])
+        finally:
+            _current.reset(token)
+        self.assertEqual(
+            dict(profile.cache), {type(caches['default']).__name__: [2, 2]}
+        )
+
+
+@override_settings(METRICS_TOKEN='secret')
+class MetricsEndpointTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='author')
+        cls.staff = User.objects.create_user(username='staff', is_staff=True)
+        Post.objects.create(text='Пост', author=cls.author)
+
+    def test_view_latency_db_and_cache_metrics(self):
+        """После запроса страницы /metrics показывает её метрики."""
+        cache.clear()
+        self.client.get('/')
+        self.client.get('/')
+        response = self.client.get(
+            '/metrics', HTTP_AUTHORIZATION='Bearer secret'
+        )
+        self.assertTrue(response['Content-Type'].startswith('text/plain'))
+        text = response.content.decode()
+        self.assertIn(
+            'yatube_request_duration_seconds_bucket{view="posts:index",'
+            'method="GET",status="200",le="+Inf"}', text
+        )
+        self.assertIn('# TYPE yatube_requests_in_flight gauge', text)
+        self.assertRegex(
+            text, r'yatube_db_queries_total\{view="posts:index",'
+            r'database="default"\} [1-9]'
+        )
+        self.assertRegex(
+            text,
+            r'yatube_post_card_cache_requests_total\{result="hit"\} [1-9]'
+        )
+
+    def test_access_needs_staff_or_token(self):
+        """Метрики видят сотрудники и сборщик с токеном, остальные — нет."""
+        for authorization in ('', 'Bearer wrong', 'Basic secret'):
+            with self.subTest(authorization=authorization):
+                response = self.client.get(
+                    '/metrics', HTTP_AUTHORIZATION=authorization
+                )
+                self.assertEqual(response.status_code, HTTPStatus.FORBIDDEN)
+        self.client.force_login(self.author)
+        response = self.client.get('/metrics')
+        self.assertEqual(response.status_code, HTTPStatus.FORBIDDEN)
+        self.client.force_login(self.staff)
+        response = self.client.get('/metrics')
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+
+    @override_settings(METRICS_TOKEN=None)
+    def test_without_token_bearer_is_refused(self):
+        response = self.client.get('/metrics', HTTP_AUTHORIZATION='Bearer ')
+        self.assertEqual(response.status_code, HTTPStatus.FORBIDDEN)
+
+    def test_unmatched_urls_share_one_label(self):
+        self.client.get('/no-such-page/')
+        self.assertIn('view="unmatched"', REGISTRY.expose())
+
+
+class MetricsRegistryTests(TestCase):
+    def setUp(self):
+        self.registry = Registry()
+        self.requests = Counter(
+            'test_requests_total', 'Запросы.', ('view',),
+            registry=self.registry
+        )
+        self.in_flight = Gauge(
+            'test_in_flight', 'В обработке.', registry=self.registry
+        )
+        self.latency = Histogram(
+            'test_latency_seconds', 'Время.', buckets=(0.1, 1),
+            registry=self.registry
+        )
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def test_histogram_exposition(self):
+        """Корзины накопительные, плюс +Inf, сумма и количество."""
+        self.latency.observe(0.05)
+        self.latency.observe(0.5)
+        self.latency.observe(5)
+        text = self.registry.expose()
+        self.assertIn('test_latency_seconds_bucket{le="0.1"} 1', text)
+        self.assertIn('test_latency_seconds_bucket{le="1"} 2', text)
+        self.assertIn('test_latency_seconds_bucket{le="+Inf"} 3', text)
+        self.assertIn('test_latency_seconds_sum 5.55', text)
+        self.assertIn('test_latency_seconds_count 3', text)
+
+    def write_worker(self, pid, requests, in_flight):
+        path = os.path.join(self.directory, f'{pid}-worker.json')
+        with open(path, 'w', encoding='utf-8') as file:
+            json.dump({'pid': pid, 'metrics': {
+                'test_requests_total': {'["posts:index"]': requests},
+                'test_in_flight': {'[]': in_flight},
+                'test_latency_seconds': {'[]': [1, 1, 1, 0.05, 1]},
+            }}, file)
+
+    def test_multiprocess_aggregation(self):
+        """Числа воркеров складываются; gauge умершего не учитывается."""
+        self.requests.inc(view='posts:index')
+        self.in_flight.inc()
+        self.latency.observe(0.5)
+        self.write_worker(os.getppid(), requests=2, in_flight=3)
+        self.write_worker(2 ** 22 + 1, requests=4, in_flight=7)
+        with self.settings(METRICS_DIR=self.directory):
+            text = self.registry.expose()
+        self.assertIn('test_requests_total{view="posts:index"} 7', text)
+        self.assertIn('test_in_flight 4', text)
+        self.assertIn('test_latency_seconds_bucket{le="0.1"} 2', text)
+        self.assertIn('test_latency_seconds_count 3', text)
+
+    def test_label_values_are_escaped(self):
+        self.assertEqual(
+            format_labels([('view', 'a"b\\c')]), '{view="a\\"b\\\\c"}'
+        )
+
+
+@override_settings(DATABASE_REPLICAS=['replica'], TASKS_WORKERS=0)
+@modify_settings(MIDDLEWARE={'append': 'core.replicas.ReplicaMiddleware'})
+class ReplicaRoutingTests(TransactionTestCase):
+    """Реплика — отдельный файл SQLite, обновляемый sync_replicas()."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.directory = tempfile.mkdtemp()
+        connections.databases['replica'] = {
+            **connections.databases['default'],
+            'NAME': os.path.join(cls.directory, 'replica.sqlite3'),
+        }
+
+    @classmethod
+    def tearDownClass(cls):
+        connections['replica'].close()
+        del connections['replica']
+        del connections.databases['replica']
+        shutil.rmtree(cls.directory)
+        super().tearDownClass()
+
+    def setUp(self):
+        self.author = User.objects.create_user(username='author')
+        self.group = Group.objects.create(title='Группа', slug='group')
+        self.post = Post.objects.create(
+            text='Пост', author=self.author, group=self.group
+        )
+        sync_replicas()
+        self.author_client = Client()
+        self.author_client.force_login(self.author)
+        self.guest_client = Client()
+
+    def test_posts_views_read_from_replica(self):
+        """Пока реплика не обновлена, новый пост не виден."""
+        Post.objects.create(text='Новый пост', author=self.author)
+        url = reverse('posts:index')
+        self.assertNotContains(self.guest_client.get(url), 'Новый пост')
+        sync_replicas()
+        self.assertContains(self.guest_client.get(url), 'Новый пост')
+
+    def test_writer_reads_own_writes(self):
+        """После комментария автор читает с основной базы, гость — нет."""
+        url = reverse('posts:post_detail', args=[self.post.pk])
+        response = self.author_client.post(
+            reverse('posts:add_comment', args=[self.post.pk]),
+            {'text': 'Свежий комментарий'}, follow=True
+        )
+        self.assertIn(REPLICA_PIN_COOKIE, response.client.cookies)
+        self.assertContains(response, 'Свежий комментарий')
+        self.assertNotContains(
+            self.guest_client.get(url), 'Свежий комментарий'
+        )
+
+    def test_metrics_count_replica_queries(self):
+        """Запросы к реплике попадают в метрики со своим алиасом."""
+        self.guest_client.get(reverse('posts:index'))
+        self.assertRegex(
+            REGISTRY.expose(), r'yatube_db_queries_total\{view="posts:index",'
+            r'database="replica"\} [1-9]'
+        )
+
+    def test_pin_expires(self):
+        Post.objects.create(text='Новый пост', author=self.author)
+        self.author_client.cookies[REPLICA_PIN_COOKIE] = '0'
+        self.assertNotContains(
+            self.author_client.get(reverse('posts:index')), 'Новый пост'
+        )
+
+
+class FileDatabaseTestCase(TransactionTestCase):
+    """
+    Запись из многих потоков. Тестовая база в памяти работает
+    без WAL и busy_timeout, поэтому на время класса основной базой
+    становится её копия в файле.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.directory = tempfile.mkdtemp()
+        path = os.path.join(cls.directory, 'db.sqlite3')
+        cls.memory = connections['default']
+        cls.memory.ensure_connection()
+        target = sqlite3.connect(path)
+        cls.memory.connection.backup(target)
+        target.close()
+        cls.memory_settings = connections.databases['default']
+        file_settings = {**cls.memory_settings, 'NAME': path}
+        connections.databases['default'] = file_settings
+        connections['default'] = load_backend(
+            file_settings['ENGINE']
+        ).DatabaseWrapper(file_settings)
+
+    @classmethod
+    def tearDownClass(cls):
+        # Потоки пула держат свои соединения с файлом базы.
+        shutdown_executor()
+        connections['default'].close()
+        connections.databases['default'] = cls.memory_settings
+        connections['default'] = cls.memory
+        shutil.rmtree(cls.directory)
+        super().tearDownClass()
+
+
+class SQLiteConcurrencyTests(FileDatabaseTestCase):
+    """Комментарии из многих потоков."""
+    threads = 8
+    comments = 10
+
+    def test_settings_from_database_url(self):
+        database = parse_database_url('postgres://user:p%40ss@db:5432/yatube')
+        self.assertEqual(
+            (database['USER'], database['PASSWORD'], database['HOST'],
+             database['PORT'], database['NAME']),
+            ('user', 'p@ss', 'db', '5432', 'yatube')
+        )
+        database = parse_database_url(
+            'sqlite:////tmp/db.sqlite3?timeout=20&check_same_thread=false'
+        )
+        self.assertEqual(database['NAME'], '/tmp/db.sqlite3')
+        self.assertEqual(database['OPTIONS'], {
+            'timeout': 20, 'check_same_thread': False,
+            'transaction_mode': 'IMMEDIATE',
+        })
+        database = parse_database_url(
+            'postgres://db/yatube?sslmode=require&connect_timeout=2.5'
+        )
+        self.assertEqual(
+            database['OPTIONS'], {'sslmode': 'require', 'connect_timeout': 2.5}
+        )
+
+    def test_health_check_on_first_use(self):
+        """Соединение проверяется при первом обращении, а не в начале."""
+        connection.ensure_connection()
+        with mock.patch.object(
+            connection, 'is_usable', return_value=True
+        ) as is_usable:
+            check_connections()
+            self.assertFalse(is_usable.called)
+            User.objects.exists()
+            User.objects.exists()
+        self.assertEqual(is_usable.call_count, 1)
+
+    def test_wal_and_busy_timeout(self):
+        with connection.cursor() as cursor:
+            cursor.execute('PRAGMA journal_mode')
+            self.assertEqual(cursor.fetchone()[0], 'wal')
+            cursor.execute('PRAGMA busy_timeout')
+            self.assertGreater(cursor.fetchone()[0], 0)
+
+    def test_concurrent_comments(self):
+        """Писатели ждут друг друга, а не падают с database is locked."""
+        author = User.objects.create_user(username='author')
+        post = Post.objects.create(text='Пост', author=author)
+        users = [
+            User.objects.create_user(username=f'user{number}')
+            for number in range(self.threads)
+        ]
+        url = reverse('posts:add_comment', args=[post.pk])
+        errors = []
+
+        def write_comments(user):
+            client = Client()
+            try:
+                client.force_login(user)
+                for number in range(self.comments):
+                    response = client.post(url, {'text': f'Ответ {number}'})
+                    if response.status_code != HTTPStatus.FOUND:
+                        errors.append(response.status_code)
+            except Exception as error:
+                errors.append(error)
+            finally:
+                connection.close()
+
+        workers = [
+            threading.Thread(target=write_comments, args=(user,))
+            for user in users
+        ]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+        self.assertEqual(errors, [])
+        total = self.threads * self.comments
+        self.assertEqual(Comment.objects.filter(post=post).count(), total)
+        post.refresh_from_db()
+        self.assertEqual(post.comments_count, total)
+
+
+TASK_TIMEOUT: float = 10.0
+flaky_calls = []
+
+
+@task(name='core.tests.flaky', max_attempts=2)
+def flaky(value):
+    flaky_calls.append(value)
+    raise ValueError('сбой')
+
+
+@override_settings(TASKS_WORKERS=2, TASKS_RETRY_DELAY=10.0,
+                   TASKS_RETRY_MAX_DELAY=30.0)
+class TaskQueueTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+        Follow.objects.create(user=cls.reader, author=cls.author)
+
+    def run_queued(self, row):
+        return execute(claim(row.pk))
+
+    @override_settings(TASKS_WORKERS=0)
+    def test_inline_without_workers(self):
+        """Без исполнителей пост попадает в ленту после коммита."""
+        post = Post.objects.create(text='Пост', author=self.author)
+        self.assertFalse(TimelineEntry.objects.filter(post=post).exists())
+        run_commit_hooks()
+        self.assertTrue(
+            TimelineEntry.objects.filter(user=self.reader, post=post).exists()
+        )
+        self.assertFalse(
+            Task.objects.filter(key=f'fanout:{post.pk}').exists()
+        )
+
+    @override_settings(TASKS_WORKERS=0)
+    def test_inline_failure_is_queued_for_retry(self):
+        """Ошибка задачи без пула не доходит до вьюхи, а ждёт повтора."""
+        self.assertIsNone(flaky.delay('inline', key='flaky:inline'))
+        with self.assertLogs('core.tasks', 'WARNING'):
+            run_commit_hooks()
+        row = Task.objects.get(key='flaky:inline')
+        self.assertEqual((row.status, row.attempts), (Task.QUEUED, 1))
+        self.assertIn('ValueError: сбой', row.last_error)
+        self.assertGreater(row.run_at, timezone.now())
+
+    @override_settings(TASKS_WORKERS=0)
+    def test_inline_countdown_waits_for_worker(self):
+        """Отложенная задача без пула остаётся в очереди для run_tasks."""
+        post = Post.objects.create(text='Пост', author=self.author)
+        row = fanout.delay(post.pk, countdown=60)
+        run_commit_hooks()
+        row.refresh_from_db()
+        self.assertEqual((row.status, row.attempts), (Task.QUEUED, 0))
+
+    def test_write_enqueues_fanout_once(self):
+        """Запись ставит раскладку в очередь; повтор ключа не дублирует."""
+        post = Post.objects.create(text='Пост', author=self.author)
+        self.assertFalse(TimelineEntry.objects.filter(post=post).exists())
+        row = Task.objects.get(key=f'fanout:{post.pk}')
+        self.assertIsNone(fanout.delay(post.pk, key=f'fanout:{post.pk}'))
+        self.assertEqual(Task.objects.filter(name=row.name).count(), 1)
+        label = json.dumps([row.name, 'ok'])
+        done = TASKS.snapshot().get(label, 0)
+        self.assertEqual(self.run_queued(row), 'ok')
+        row.refresh_from_db()
+        self.assertEqual((row.status, row.attempts), (Task.DONE, 1))
+        self.assertIsNone(claim(row.pk))
+        self.assertTrue(
+            TimelineEntry.objects.filter(user=self.reader, post=post).exists()
+        )
+        self.assertEqual(TASKS.snapshot()[label], done + 1)
+
+    def test_retry_with_backoff_then_fail(self):
+        """Упавшая задача откладывается, после предела попыток — отказ."""
+        row = flaky.delay('x')
+        with self.assertLogs('core.tasks', 'WARNING'):
+            self.assertEqual(self.run_queued(row), 'retry')
+        row.refresh_from_db()
+        self.assertEqual(row.status, Task.QUEUED)
+        self.assertIn('ValueError: сбой', row.last_error)
+        self.assertGreater(
+            row.run_at, timezone.now() + timedelta(seconds=9)
+        )
+        self.assertIsNone(claim(row.pk))
+        Task.objects.filter(pk=row.pk).update(run_at=timezone.now())
+        with self.assertLogs('core.tasks', 'ERROR'):
+            self.assertEqual(self.run_queued(row), 'error')
+        row.refresh_from_db()
+        self.assertEqual((row.status, row.attempts), (Task.FAILED, 2))
+        self.assertEqual(flaky_calls[-2:], ['x', 'x'])
+        self.assertEqual(
+            [get_retry_delay(n) for n in (1, 2, 3)], [10.0, 20.0, 30.0]
+        )
+
+    def test_pool_process_keeps_parent_connections_open(self):
+        """Процесс пула забывает соединения родителя, не закрывая их."""
+        connection.ensure_connection()
+        inherited = connection.connection
+        self.addCleanup(setattr, connection, 'connection', inherited)
+        with mock.patch('core.tasks._inherited_connections', []) as kept:
+            drop_inherited_connections()
+        self.assertIsNone(connection.connection)
+        self.assertIn(inherited, kept)
+        self.assertEqual(inherited.execute('SELECT 1').fetchone(), (1,))
+
+    def test_expired_lease_is_claimed_again(self):
+        """Задачу упавшего исполнителя подхватывают после срока аренды."""
+        row = flaky.delay('y')
+        self.assertIsNotNone(claim(row.pk))
+        self.assertIsNone(claim(row.pk))
+        Task.objects.filter(pk=row.pk).update(
+            locked_until=timezone.now() - timedelta(seconds=1)
+        )
+        self.assertEqual(claim(row.pk).attempts, 2)
+
+
+@override_settings(TASKS_WORKERS=2)
+class TaskWorkerTests(FileDatabaseTestCase):
+    def setUp(self):
+        self.author = User.objects.create_user(username='author')
+        self.reader = User.objects.create_user(username='reader')
+
+    def wait_for(self, condition):
+        deadline = time.monotonic() + TASK_TIMEOUT
+        while not condition():
+            self.assertLess(time.monotonic(), deadline)
+            time.sleep(0.05)
+
+    def test_pool_runs_tasks_after_commit(self):
+        """После коммита задачи выполняет пул процесса, не вьюха."""
+        client = Client()
+        client.force_login(self.reader)
+        client.get(reverse('posts:profile_follow', args=['author']))
+        post = Post.objects.create(text='Пост', author=self.author)
+        keys = [f'backfill:{Follow.objects.get().pk}', f'fanout:{post.pk}']
+        self.wait_for(lambda: Task.objects.filter(
+            key__in=keys, status=Task.DONE
+        ).count() == len(keys))
+        self.assertTrue(
+            TimelineEntry.objects.filter(user=self.reader, post=post).exists()
+        )
+
+    def test_worker_command_runs_due_tasks(self):
+        """run_tasks --once выполняет отложенные задачи и выходит."""
+        Follow.objects.create(user=self.reader, author=self.author)
+        post = Post.objects.create(text='Пост', author=self.author)
+        self.wait_for(lambda: TimelineEntry.objects.exists())
+        TimelineEntry.objects.all().delete()
+        row = fanout.delay(post.pk, countdown=60)
+        Task.objects.filter(pk=row.pk).update(run_at=timezone.now())
+        call_command('run_tasks', once=True, workers=1, stdout=StringIO())
+        row.refresh_from_db()
+        self.assertEqual(row.status, Task.DONE)
+        self.assertTrue(
+            TimelineEntry.objects.filter(user=self.reader, post=post).exists()
+        )
+
+
+def cached_templates():
+    """settings.TEMPLATES с cached.Loader, как без DEBUG."""
+    templates = deepcopy(settings.TEMPLATES)
+    options = templates[0]['OPTIONS']
+    if options['loaders'][0][0] != 'django.template.loaders.cached.Loader':
+        options['loaders'] = [
+            ('django.template.loaders.cached.Loader', options['loaders'])
+        ]
+    return templates
+
+
+class TemplateLoadingTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='author')
+
+    @override_settings(TEMPLATES=cached_templates())
+    def test_warm_up_fills_cached_loader(self):
+        """Прогрев кладёт в cached.Loader все шаблоны проекта."""
+        compiled, _, errors = warm_templates()
+        self.assertEqual(errors, {})
+        loader = get_engines()[0].template_loaders[0]
+        for name in ('base.html', 'includes/post_card.html',
+                     'posts/email/digest.txt'):
+            self.assertIn(name, loader.get_template_cache)
+        self.assertGreaterEqual(compiled, len(loader.get_template_cache))
+
+    def test_command_reports_broken_template(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        with open(os.path.join(directory, 'broken.html'), 'w') as file:
+            file.write('{% if %}')
+        call_command('warm_templates', stdout=StringIO())
+        templates = [{
+            'BACKEND': 'django.template.backends.django.DjangoTemplates',
+            'DIRS': [directory],
+        }]
+        with override_settings(TEMPLATES=templates):
+            with self.assertRaisesMessage(CommandError, 'broken.html'):
+                call_command('warm_templates', stdout=StringIO())
+
+    def count_lookups(self):
+        cache.clear()
+        profile = Profile()
+        token = _current.set(profile)
+        try:
+            self.client.get(reverse('posts:index'))
+        finally:
+            _current.reset(token)
+        return profile.template_loads
+
+    def test_lookups_do_not_grow_with_posts(self):
+        """Шаблоны карточек ищутся раз на страницу, а не на пост."""
+        instrument_templates()
+        Post.objects.create(text='Пост', author=self.author)
+        lookups = self.count_lookups()
+        for number in range(5):
+            Post.objects.create(text=f'Пост {number}', author=self.author)
+        self.assertEqual(self.count_lookups(), lookups)
@@ -1,7 +1,15 @@
+from django.conf import settings
+from django.core.exceptions import PermissionDenied
+from django.http import HttpResponse
 from django.shortcuts import render
+from django.utils.crypto import constant_time_compare
 
 from http import HTTPStatus
 
+from .metrics import REGISTRY
+
+METRICS_CONTENT_TYPE: str = 'text/plain; version=0.0.4; charset=utf-8'
+
 
 def page_not_found(request, exception):
     return render(request, 'core/404.html', {'path': request.path},
@@ -19,3 +27,23 @@ def permission_denied(request, exception):
 def internal_server_error(request):
     return render(request, 'core/500.html',
                   status=HTTPStatus.INTERNAL_SERVER_ERROR)
+
+
+def can_read_metrics(request):
+    """Сотрудники сайта или сборщик с токеном METRICS_TOKEN."""
+    if request.user.is_staff:
+        return True
+    token = getattr(settings, 'METRICS_TOKEN', None)
+    scheme, _, credentials = request.META.get(
+        'HTTP_AUTHORIZATION', ''
+    ).partition(' ')
+    return bool(token) and scheme.lower() == 'bearer' and (
+        constant_time_compare(credentials, token)
+    )
+
+
+def metrics(request):
+    """Метрики процесса или всех воркеров для Prometheus."""
+    if not can_read_metrics(request):
+        raise PermissionDenied
+    return HttpResponse(REGISTRY.expose(), content_type=METRICS_CONTENT_TYPE)
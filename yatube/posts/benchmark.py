@@ -0,0 +1,420 @@
+import json
+import os
+import platform
+import resource
+import subprocess
+import threading
+import time
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from http.cookies import SimpleCookie
+from urllib.error import HTTPError
+from urllib.parse import urlencode
+from urllib.request import Request, urlopen
+
+import django
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.servers.basehttp import ThreadedWSGIServer, WSGIRequestHandler
+from django.core.wsgi import get_wsgi_application
+from django.db import close_old_connections, connection
+from django.db.models import Count
+from django.middleware.csrf import get_token
+from django.test import Client, RequestFactory, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from core.profiling import Profile, _current, instrument_templates
+
+from .models import Follow, Group, Post, UserStats
+from .utils import has_jinja2
+
+User = get_user_model()
+
+BENCH_ITERATIONS: int = 50
+BENCH_MEMORY_ITERATIONS: int = 3
+BENCH_CONCURRENCY: int = 8
+BENCH_THRESHOLD: float = 0.2
+PERCENTILES = (50, 90, 95, 99)
+MODE_SEQUENTIAL: str = 'sequential'
+MODE_CONCURRENT: str = 'concurrent'
+MODE_RENDER: str = 'render'
+# Страницы со списком постов, у которых render-режим замеряет шаблоны:
+# сценарий и имя URL для POSTS_JINJA2_VIEWS.
+RENDER_SCENARIOS = {
+    'index': 'index',
+    'group_posts': 'group_list',
+    'profile': 'profile',
+    'follow_index': 'follow_index',
+}
+UNCACHED_LOADERS = [
+    'django.template.loaders.filesystem.Loader',
+    'django.template.loaders.app_directories.Loader',
+]
+TEMPLATE_LOADERS = {
+    'uncached': UNCACHED_LOADERS,
+    'cached': [('django.template.loaders.cached.Loader', UNCACHED_LOADERS)],
+}
+# Режим render с Jinja2: cached.Loader у Django и страницы через Jinja2.
+JINJA2_MODE: str = 'jinja2'
+# Замер очищает кэш: все кэши, кроме двухуровневых, подменяются
+# LocMemCache процесса с этим префиксом.
+BENCH_CACHE_LOCATION: str = 'yatube-benchmark'
+TIERED_CACHE: str = 'core.cache.tiered.TieredCache'
+LOCMEM_CACHE: str = 'django.core.cache.backends.locmem.LocMemCache'
+
+
+@dataclass
+class Scenario:
+    """Один замеряемый запрос: GET страницы или POST формы."""
+    name: str
+    url: str
+    method: str = 'get'
+    data: dict = field(default_factory=dict)
+    login: bool = True
+
+
+def pick_targets():
+    """
+    Самые тяжёлые объекты базы: автор с наибольшим числом постов,
+    самая большая группа, самый обсуждаемый пост и пользователь
+    с наибольшим числом подписок. В пустой базе — ObjectDoesNotExist.
+    """
+    author = User.objects.get(pk=UserStats.objects.order_by(
+        '-posts_count'
+    ).values_list('user', flat=True)[:1].get())
+    reader = User.objects.get(pk=Follow.objects.values('user').annotate(
+        total=Count('pk')
+    ).order_by('-total').values_list('user', flat=True)[:1].get())
+    group = Group.objects.annotate(total=Count('posts')).order_by(
+        '-total'
+    )[:1].get()
+    post = Post.objects.order_by('-comments_count')[:1].get()
+    return reader, author, group, post
+
+
+def build_scenarios(author, group, post):
+    index = reverse('posts:index')
+    return [
+        Scenario('index', index),
+        Scenario('index_cursor', f'{index}?cursor='),
+        Scenario('group_posts',
+                 reverse('posts:group_list', args=[group.slug])),
+        Scenario('profile', reverse('posts:profile', args=[author.username])),
+        Scenario('post_detail', reverse('posts:post_detail', args=[post.pk])),
+        Scenario('follow_index', reverse('posts:follow_index')),
+        Scenario('api_posts', reverse('api:posts')),
+        Scenario('add_comment',
+                 reverse('posts:add_comment', args=[post.pk]),
+                 method='post', data={'text': 'Замер комментария'}),
+        Scenario('post_create', reverse('posts:post_create'),
+                 method='post',
+                 data={'text': 'Замер поста', 'group': group.pk}),
+    ]
+
+
+def percentile(values, percent):
+    """Перцентиль с линейной интерполяцией между соседними значениями."""
+    ordered = sorted(values)
+    if not ordered:
+        return None
+    position = (len(ordered) - 1) * percent / 100
+    lower = int(position)
+    upper = min(lower + 1, len(ordered) - 1)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (
+        position - lower
+    )
+
+
+def summarize(latencies):
+    """Перцентили задержек в миллисекундах."""
+    summary = {
+        f'p{percent}_ms': round(percentile(latencies, percent) * 1000, 3)
+        for percent in PERCENTILES
+    }
+    summary['mean_ms'] = round(sum(latencies) / len(latencies) * 1000, 3)
+    summary['max_ms'] = round(max(latencies) * 1000, 3)
+    return summary
+
+
+def send(client, scenario):
+    return getattr(client, scenario.method)(scenario.url, scenario.data)
+
+
+def isolated_caches():
+    """
+    override_settings, где кэши замера — LocMemCache этого процесса
+    (TieredCache остаётся поверх них): замер очищает кэш, а общий
+    кэш работающего сайта трогать не должен.
+    """
+    return override_settings(CACHES={
+        alias: config if config['BACKEND'] == TIERED_CACHE else {
+            'BACKEND': LOCMEM_CACHE,
+            'LOCATION': f'{BENCH_CACHE_LOCATION}:{alias}',
+        }
+        for alias, config in settings.CACHES.items()
+    })
+
+
+def run_sequential(scenarios, user, iterations=BENCH_ITERATIONS,
+                   cold=False):
+    """
+    Каждый сценарий через тестовый клиент: задержки, число запросов
+    к базе и пик памяти (отдельным проходом: tracemalloc замедляет код).
+    cold — очищать кэш перед каждым запросом.
+    """
+    with isolated_caches():
+        client = Client()
+        client.force_login(user)
+        guest = Client()
+        results = {}
+        for scenario in scenarios:
+            current = client if scenario.login else guest
+            send(current, scenario)
+            latencies, queries, statuses = [], [], set()
+            for _ in range(iterations):
+                if cold:
+                    cache.clear()
+                with CaptureQueriesContext(connection) as context:
+                    started = time.perf_counter()
+                    response = send(current, scenario)
+                    latencies.append(time.perf_counter() - started)
+                queries.append(len(context.captured_queries))
+                statuses.add(response.status_code)
+            peaks = []
+            for _ in range(BENCH_MEMORY_ITERATIONS):
+                tracemalloc.start()
+                send(current, scenario)
+                peaks.append(tracemalloc.get_traced_memory()[1])
+                tracemalloc.stop()
+            results[scenario.name] = {
+                **summarize(latencies),
+                'requests': iterations,
+                'queries': max(queries),
+                'peak_memory_kb': round(max(peaks) / 1024, 1),
+                'statuses': sorted(statuses),
+            }
+        return results
+
+
+def templates_with(loaders):
+    """settings.TEMPLATES с другими загрузчиками у движка Django."""
+    templates = []
+    for backend in settings.TEMPLATES:
+        options = backend.get('OPTIONS', {})
+        if 'loaders' in options:
+            backend = {**backend, 'OPTIONS': {**options, 'loaders': loaders}}
+        templates.append(backend)
+    return templates
+
+
+def profile_request(client, scenario):
+    """Запрос с замером шаблонов, как у ProfilingMiddleware."""
+    profile = Profile()
+    token = _current.set(profile)
+    try:
+        send(client, scenario)
+    finally:
+        _current.reset(token)
+    return profile
+
+
+def render_modes():
+    """Настройки режимов render; jinja2 — если движок подключён."""
+    modes = {
+        mode: {'TEMPLATES': templates_with(loaders),
+               'POSTS_JINJA2_VIEWS': []}
+        for mode, loaders in TEMPLATE_LOADERS.items()
+    }
+    if has_jinja2():
+        modes[JINJA2_MODE] = {
+            'TEMPLATES': templates_with(TEMPLATE_LOADERS['cached']),
+            'POSTS_JINJA2_VIEWS': list(RENDER_SCENARIOS.values()),
+        }
+    return modes
+
+
+def run_render(scenarios, user, iterations=BENCH_ITERATIONS):
+    """
+    Стоимость рендера страниц со списками постов без кэша шаблонов,
+    с cached.Loader и через Jinja2. Кэш очищается перед каждым
+    запросом, чтобы карточки постов рендерились, а не доставались
+    готовыми.
+    """
+    with isolated_caches():
+        instrument_templates()
+        client = Client()
+        client.force_login(user)
+        results = {}
+        for mode, overrides in render_modes().items():
+            with override_settings(**overrides):
+                for scenario in scenarios:
+                    if scenario.name not in RENDER_SCENARIOS:
+                        continue
+                    send(client, scenario)
+                    profiles = []
+                    for _ in range(iterations):
+                        cache.clear()
+                        profiles.append(profile_request(client, scenario))
+                    results[f'{scenario.name}:{mode}'] = {
+                        **summarize([
+                            profile.template_time for profile in profiles
+                        ]),
+                        'requests': iterations,
+                        'template_lookups': profiles[-1].template_loads,
+                        'lookup_ms': round(sum(
+                            profile.template_load_time for profile in profiles
+                        ) / iterations * 1000, 3),
+                    }
+        return results
+
+
+class QuietRequestHandler(WSGIRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+
+def start_server():
+    """WSGI-приложение проекта в многопоточном сервере на свободном порту."""
+    server = ThreadedWSGIServer(
+        ('127.0.0.1', 0), QuietRequestHandler, allow_reuse_address=False
+    )
+    server.daemon_threads = True
+    server.set_app(get_wsgi_application())
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server
+
+
+def session_cookies(user):
+    """
+    Cookie сессии пользователя и пара токенов CSRF для POST-запросов
+    к живому серверу: тестовый клиент здесь не участвует.
+    """
+    client = Client()
+    client.force_login(user)
+    request = RequestFactory().get('/')
+    token = get_token(request)
+    cookies = {
+        settings.SESSION_COOKIE_NAME:
+            client.cookies[settings.SESSION_COOKIE_NAME].value,
+        settings.CSRF_COOKIE_NAME: request.META['CSRF_COOKIE'],
+    }
+    header = SimpleCookie(cookies).output(header='', sep=';').strip()
+    return header, token
+
+
+def run_concurrent(scenarios, user, iterations=BENCH_ITERATIONS,
+                   concurrency=BENCH_CONCURRENCY):
+    """
+    Сценарии по HTTP к WSGI-приложению из concurrency потоков:
+    задержки на стороне клиента, пропускная способность и ошибки.
+    """
+    cookie, token = session_cookies(user)
+    server = start_server()
+    base = f'http://127.0.0.1:{server.server_port}'
+    results = {}
+    try:
+        for scenario in scenarios:
+            def hit(_):
+                headers = {'Cookie': cookie} if scenario.login else {}
+                data = None
+                if scenario.method == 'post':
+                    data = urlencode(
+                        {**scenario.data, 'csrfmiddlewaretoken': token}
+                    ).encode()
+                request = Request(base + scenario.url, data, headers)
+                started = time.perf_counter()
+                try:
+                    with urlopen(request) as response:
+                        response.read()
+                        status = response.status
+                except HTTPError as error:
+                    status = error.code
+                return time.perf_counter() - started, status
+
+            with ThreadPoolExecutor(concurrency) as pool:
+                started = time.perf_counter()
+                outcomes = list(pool.map(hit, range(iterations)))
+                elapsed = time.perf_counter() - started
+            latencies = [latency for latency, _ in outcomes]
+            statuses = [status for _, status in outcomes]
+            results[scenario.name] = {
+                **summarize(latencies),
+                'requests': iterations,
+                'concurrency': concurrency,
+                'throughput_rps': round(iterations / elapsed, 1),
+                'errors': sum(status >= 400 for status in statuses),
+                'statuses': sorted(set(statuses)),
+            }
+    finally:
+        server.shutdown()
+        server.server_close()
+        close_old_connections()
+    results['max_rss_kb'] = resource.getrusage(
+        resource.RUSAGE_SELF
+    ).ru_maxrss
+    return results
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'],
+            cwd=settings.BASE_DIR, capture_output=True, text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def collect_metadata(**options):
+    return {
+        'commit': git_commit(),
+        'created': timezone.now().isoformat(),
+        'python': platform.python_version(),
+        'django': django.get_version(),
+        'database': connection.vendor,
+        'cpu_count': os.cpu_count(),
+        'posts': Post.objects.count(),
+        'users': User.objects.count(),
+        'options': options,
+    }
+
+
+def compare(baseline, current, threshold=BENCH_THRESHOLD):
+    """
+    Регрессии относительно прошлого прогона: рост p95 больше чем
+    на threshold или любой рост числа запросов к базе.
+    """
+    regressions = []
+    for mode, scenarios in current['results'].items():
+        old_scenarios = baseline.get('results', {}).get(mode, {})
+        for name, new in scenarios.items():
+            old = old_scenarios.get(name)
+            if not isinstance(new, dict) or not isinstance(old, dict):
+                continue
+            if new['p95_ms'] > old['p95_ms'] * (1 + threshold):
+                regressions.append(
+                    f'{mode}/{name}: p95 {old["p95_ms"]} -> '
+                    f'{new["p95_ms"]} мс'
+                )
+            if new.get('queries', 0) > old.get('queries', 0):
+                regressions.append(
+                    f'{mode}/{name}: запросов {old["queries"]} -> '
+                    f'{new["queries"]}'
+                )
+    return regressions
+
+
+def load_results(path):
+    with open(path, encoding='utf-8') as file:
+        return json.load(file)
+
+
+def save_results(path, results):
+    with open(path, 'w', encoding='utf-8') as file:
+        json.dump(results, file, ensure_ascii=False, indent=2)
@@ -0,0 +1,107 @@
+import uuid
+
+from django.conf import settings
+from django.core.cache import cache
+from django.template.loader import get_template
+
+from core.metrics import POST_CARD_CACHE_REQUESTS
+
+POST_CARD_TEMPLATE: str = 'includes/post_card_body.html'
+POST_CARD_TIMEOUT: int = 60 * 60
+POST_VERSION_KEY: str = 'post_card:v:post:{}'
+AUTHOR_VERSION_KEY: str = 'post_card:v:author:{}'
+GROUP_VERSION_KEY: str = 'post_card:v:group:{}'
+FRAGMENT_KEY: str = 'post_card:{}:{}:{}:{}'
+
+
+def bump_version(key):
+    """
+    Ставит новую версию: значения не повторяются, поэтому
+    вытесненная из кэша версия не оживит старые фрагменты.
+    """
+    cache.set(key, uuid.uuid4().hex, None)
+
+
+def bump_post(post_id):
+    bump_version(POST_VERSION_KEY.format(post_id))
+
+
+def bump_author(author_id):
+    bump_version(AUTHOR_VERSION_KEY.format(author_id))
+
+
+def bump_group(group_id):
+    bump_version(GROUP_VERSION_KEY.format(group_id))
+
+
+def get_versions(keys):
+    """Версии для ключей одним запросом; недостающие заводятся заново."""
+    versions = cache.get_many(keys)
+    missing = {
+        key: uuid.uuid4().hex for key in keys if key not in versions
+    }
+    if missing:
+        cache.set_many(missing, None)
+        versions.update(missing)
+    return versions
+
+
+def fragment_key(post, versions):
+    return FRAGMENT_KEY.format(
+        post.pk,
+        versions[POST_VERSION_KEY.format(post.pk)],
+        versions[AUTHOR_VERSION_KEY.format(post.author_id)],
+        versions[GROUP_VERSION_KEY.format(post.group_id)],
+    )
+
+
+def get_post_cards(posts, using=None):
+    """
+    Отрендеренные карточки постов {id: html}: двумя обращениями
+    к кэшу на всю страницу, рендерятся только промахи. using — движок
+    шаблонов; HTML движков совпадает, поэтому кэш у них общий.
+    """
+    posts = list(posts)
+    version_keys = set()
+    for post in posts:
+        version_keys.update((
+            POST_VERSION_KEY.format(post.pk),
+            AUTHOR_VERSION_KEY.format(post.author_id),
+            GROUP_VERSION_KEY.format(post.group_id),
+        ))
+    versions = get_versions(list(version_keys))
+    keys = {post.pk: fragment_key(post, versions) for post in posts}
+    fragments = cache.get_many(list(keys.values()))
+    cards, rendered = {}, {}
+    template = None
+    for post in posts:
+        html = fragments.get(keys[post.pk])
+        if html is None:
+            # Шаблон ищется один раз на страницу, а не на каждый промах.
+            template = template or get_template(
+                POST_CARD_TEMPLATE, using=using
+            )
+            html = template.render({'post': post})
+            rendered[keys[post.pk]] = html
+        cards[post.pk] = html
+    POST_CARD_CACHE_REQUESTS.inc(len(cards) - len(rendered), result='hit')
+    POST_CARD_CACHE_REQUESTS.inc(len(rendered), result='miss')
+    if rendered:
+        cache.set_many(rendered, getattr(
+            settings, 'POST_CARD_CACHE_TIMEOUT', POST_CARD_TIMEOUT
+        ))
+    return cards
+
+
+def get_page_card(page_obj, post, using=None):
+    """
+    Карточка поста страницы: карточки всей страницы достаются
+    из кэша разом при выводе первой из них.
+    """
+    cards = getattr(page_obj, 'post_cards', None)
+    if cards is None and page_obj is not None:
+        cards = get_post_cards(page_obj, using)
+        page_obj.post_cards = cards
+    if not cards or post.pk not in cards:
+        cards = get_post_cards([post], using)
+    return cards[post.pk]
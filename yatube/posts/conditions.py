@@ -0,0 +1,153 @@
+"""
+Валидаторы условного GET (ETag и Last-Modified) для страниц поста,
+группы и профиля.
+
+Валидатор строится одним запросом по индексам: дата последнего
+изменения поста по (group, modified) или (author, modified), последний
+комментарий по (post, created) и денормализованные счётчики. Этот же
+запрос отдаёт объект страницы, так что на ответ 200 он не добавляет
+запросов, а на 304 основные запросы и рендер не выполняются вовсе.
+"""
+import hashlib
+from functools import wraps
+
+from django.contrib.auth import get_user_model
+from django.db.models import Count, Exists, OuterRef, Subquery
+
+from .models import Comment, Follow, Group, Post
+
+User = get_user_model()
+
+
+def per_request(func):
+    """
+    Запоминает результат на объекте запроса: валидаторы и вьюха
+    спрашивают одно и то же состояние, а запрос к базе нужен один.
+    """
+    @wraps(func)
+    def wrapper(request, *args, **kwargs):
+        memo = request.__dict__.setdefault('_conditions', {})
+        key = (func.__name__, args, tuple(sorted(kwargs.items())))
+        if key not in memo:
+            memo[key] = func(request, *args, **kwargs)
+        return memo[key]
+
+    return wrapper
+
+
+def make_etag(request, *parts):
+    """
+    ETag из состояния страницы, адреса с параметрами и зрителя:
+    шапка и кнопки зависят от пользователя.
+    """
+    raw = repr((request.get_full_path(), request.user.pk) + parts)
+    return hashlib.md5(raw.encode()).hexdigest()
+
+
+def counters(user):
+    """Счётчики пользователя; строки UserStats может ещё не быть."""
+    stats = getattr(user, 'stats', None)
+    return stats and (
+        stats.posts_count, stats.followers_count, stats.following_count
+    )
+
+
+def latest_post(**filters):
+    return Subquery(
+        Post.objects.filter(**filters).order_by('-modified').values(
+            'modified'
+        )[:1]
+    )
+
+
+@per_request
+def post_state(request, post_id):
+    """Пост страницы с датой последнего комментария или None."""
+    latest_comment = Comment.objects.filter(
+        post=OuterRef('pk')
+    ).order_by('-created').values('created')[:1]
+    return Post.objects.select_related('author__stats', 'group').annotate(
+        last_comment=Subquery(latest_comment)
+    ).filter(pk=post_id).first()
+
+
+@per_request
+def group_state(request, slug):
+    """Группа с датой последней правки её постов и их числом или None."""
+    total = Post.objects.filter(group=OuterRef('pk')).order_by().values(
+        'group'
+    ).annotate(total=Count('pk')).values('total')
+    return Group.objects.annotate(
+        latest=latest_post(group=OuterRef('pk')), total=Subquery(total)
+    ).filter(slug=slug).first()
+
+
+@per_request
+def profile_state(request, username):
+    """
+    Автор со счётчиками, датой последней правки его постов
+    и подпиской текущего пользователя или None.
+    """
+    authors = User.objects.select_related('stats').annotate(
+        latest=latest_post(author=OuterRef('pk'))
+    )
+    if request.user.is_authenticated:
+        authors = authors.annotate(is_followed=Exists(Follow.objects.filter(
+            user=request.user, author=OuterRef('pk')
+        )))
+    return authors.filter(username=username).first()
+
+
+def post_etag(request, post_id):
+    """Имена авторов комментариев, как и в ленте группы, не учитываются."""
+    post = post_state(request, post_id)
+    if post is None:
+        return None
+    author = post.author
+    return make_etag(
+        request, post.modified, post.last_comment, post.comments_count,
+        author.username, author.get_full_name(), counters(author),
+        post.group and (post.group.slug, post.group.title),
+    )
+
+
+def post_last_modified(request, post_id):
+    post = post_state(request, post_id)
+    if post is None:
+        return None
+    return max(filter(None, (post.modified, post.last_comment)))
+
+
+def group_etag(request, slug):
+    """
+    Переименование автора поста ETag ленты группы не меняет:
+    такая правка попадёт на страницу со следующей правкой постов.
+    Удаление поста без правок остальных видно по их числу.
+    """
+    group = group_state(request, slug)
+    if group is None:
+        return None
+    return make_etag(
+        request, group.pk, group.title, group.description, group.latest,
+        group.total,
+    )
+
+
+def group_last_modified(request, slug):
+    group = group_state(request, slug)
+    return group and group.latest
+
+
+def profile_etag(request, username):
+    author = profile_state(request, username)
+    if author is None:
+        return None
+    return make_etag(
+        request, author.pk, author.get_full_name(), author.latest,
+        counters(author), getattr(author, 'is_followed', None),
+    )
+
+
+def profile_last_modified(request, username):
+    author = profile_state(request, username)
+    return author and author.latest
@@ -0,0 +1,80 @@
+from django.contrib.auth import get_user_model
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .models import Comment, Follow, Post, UserStats
+
+User = get_user_model()
+
+
+def bump_user(user_id, **deltas):
+    """
+    Сдвигает счётчики пользователя одним UPDATE. Недостающая строка
+    заводится только при увеличении: при каскадном удалении
+    пользователя её уже может не быть.
+    """
+    changes = {field: F(field) + delta for field, delta in deltas.items()}
+    if UserStats.objects.filter(user_id=user_id).update(**changes):
+        return
+    if all(delta > 0 for delta in deltas.values()):
+        UserStats.objects.get_or_create(user_id=user_id)
+        UserStats.objects.filter(user_id=user_id).update(**changes)
+
+
+def bump_post(post_id, delta):
+    """
+    Сдвигает счётчик комментариев поста. UPDATE обходит auto_now,
+    поэтому дата изменения ставится явно: от неё зависят ETag страниц.
+    """
+    Post.objects.filter(pk=post_id).update(
+        comments_count=F('comments_count') + delta, modified=timezone.now()
+    )
+
+
+def count_subquery(queryset, field):
+    """Коррелированный подзапрос COUNT(*) по полю field."""
+    return Coalesce(Subquery(
+        queryset.filter(
+            **{field: OuterRef('pk')}
+        ).order_by().values(field).annotate(total=Count('pk')).values('total')
+    ), 0)
+
+
+def reconcile_counters():
+    """
+    Пересчитывает все счётчики по данным одним UPDATE на таблицу.
+    Возвращает число исправленных строк (постов, пользователей).
+    """
+    UserStats.objects.bulk_create(
+        (UserStats(user_id=pk)
+         for pk in User.objects.filter(stats__isnull=True).values_list(
+             'pk', flat=True)),
+        ignore_conflicts=True,
+    )
+    posts = Post.objects.annotate(
+        actual=count_subquery(Comment.objects.all(), 'post')
+    ).exclude(comments_count=F('actual'))
+    fixed_posts = Post.objects.filter(pk__in=list(
+        posts.values_list('pk', flat=True)
+    )).update(comments_count=count_subquery(Comment.objects.all(), 'post'))
+
+    users = User.objects.annotate(
+        posts_total=count_subquery(Post.objects.all(), 'author'),
+        followers_total=count_subquery(Follow.objects.all(), 'author'),
+        following_total=count_subquery(Follow.objects.all(), 'user'),
+    )
+    drifted = [
+        UserStats(user_id=user.pk, posts_count=user.posts_total,
+                  followers_count=user.followers_total,
+                  following_count=user.following_total)
+        for user in users.select_related('stats').iterator()
+        if (user.stats.posts_count, user.stats.followers_count,
+            user.stats.following_count)
+        != (user.posts_total, user.followers_total, user.following_total)
+    ]
+    UserStats.objects.bulk_update(
+        drifted, ['posts_count', 'followers_count', 'following_count'],
+        batch_size=1000,
+    )
+    return fixed_posts, len(drifted)
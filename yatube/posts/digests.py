@@ -0,0 +1,155 @@
+"""
+Письма-дайджесты: новые посты авторов из подписок и комментарии
+к своим постам.
+
+События копятся в Notification по получателю. Когда самому старому
+событию получателя исполняется DIGEST_WINDOW секунд, все его события
+уходят одним письмом. События удаляются в транзакции обхода, а письма
+уходят только после её коммита: откат не отправит их второй раз.
+Письма отправляются пачками по DIGEST_BATCH_SIZE через одно соединение
+почтового бэкенда на весь обход.
+"""
+from collections import defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.core import mail
+from django.db import transaction
+from django.db.models import Min
+from django.template.loader import render_to_string
+from django.utils import timezone
+
+from .models import Follow, Notification, Post
+
+DIGEST_WINDOW: int = 15 * 60
+DIGEST_BATCH_SIZE: int = 100
+DIGEST_MAX_ITEMS: int = 50
+# id в одном DELETE: у SQLite предел параметров запроса.
+DIGEST_DELETE_CHUNK: int = 500
+DIGEST_TEMPLATE: str = 'posts/email/digest.txt'
+NOTIFICATION_BATCH_SIZE: int = 1000
+SITE_URL: str = 'http://localhost:8000'
+
+
+def get_window():
+    return getattr(settings, 'DIGEST_WINDOW', DIGEST_WINDOW)
+
+
+def notify_post(post):
+    """Событие о новом посте каждому подписчику автора."""
+    followers = Follow.objects.filter(
+        author_id=post.author_id
+    ).values_list('user_id', flat=True)
+    Notification.objects.bulk_create(
+        (Notification(recipient_id=user_id, kind=Notification.POST,
+                      post_id=post.pk)
+         for user_id in followers.iterator()),
+        batch_size=NOTIFICATION_BATCH_SIZE,
+    )
+
+
+def notify_comment(comment):
+    """Событие автору поста, если он комментирует не сам себя."""
+    author_id = Post.objects.filter(pk=comment.post_id).values_list(
+        'author_id', flat=True
+    ).first()
+    if author_id is None or author_id == comment.author_id:
+        return
+    Notification.objects.create(
+        recipient_id=author_id, kind=Notification.COMMENT,
+        post_id=comment.post_id, comment_id=comment.pk
+    )
+
+
+def get_due_recipients(now, flush=False):
+    """Получатели, чьё самое старое событие старше окна."""
+    pending = Notification.objects.filter(created__lte=now).values(
+        'recipient'
+    ).annotate(first=Min('created'))
+    if not flush:
+        pending = pending.filter(
+            first__lte=now - timedelta(seconds=get_window())
+        )
+    return list(
+        pending.order_by('recipient').values_list('recipient', flat=True)
+    )
+
+
+def build_digest(recipient, notifications):
+    """Письмо одному получателю или None, если у него нет адреса."""
+    if not recipient.email:
+        return None
+    limit = getattr(settings, 'DIGEST_MAX_ITEMS', DIGEST_MAX_ITEMS)
+    shown = notifications[:limit]
+    body = render_to_string(DIGEST_TEMPLATE, {
+        'recipient': recipient,
+        'posts': [item for item in shown if item.kind == Notification.POST],
+        'comments': [
+            item for item in shown if item.kind == Notification.COMMENT
+        ],
+        'more': len(notifications) - len(shown),
+        'site_url': getattr(settings, 'SITE_URL', SITE_URL).rstrip('/'),
+    })
+    return mail.EmailMessage(
+        f'Yatube: новых событий — {len(notifications)}', body,
+        to=[recipient.email]
+    )
+
+
+def take_batch(recipient_ids, now):
+    """
+    Письма пачки получателей. Удаляются ровно прочитанные события:
+    пришедшие во время обхода уйдут в следующий.
+    """
+    notifications = Notification.objects.filter(
+        recipient__in=recipient_ids, created__lte=now
+    ).select_related(
+        'recipient', 'post__author', 'comment__author'
+    ).order_by('recipient', 'created', 'pk')
+    grouped = defaultdict(list)
+    for notification in notifications:
+        grouped[notification.recipient].append(notification)
+    taken = [item.pk for items in grouped.values() for item in items]
+    for start in range(0, len(taken), DIGEST_DELETE_CHUNK):
+        Notification.objects.filter(
+            pk__in=taken[start:start + DIGEST_DELETE_CHUNK]
+        ).delete()
+    return [
+        message for message in (
+            build_digest(recipient, items)
+            for recipient, items in grouped.items()
+        ) if message is not None
+    ]
+
+
+def deliver(messages, batch_size):
+    """Отправляет письма пачками через одно соединение."""
+    connection = mail.get_connection()
+    connection.open()
+    try:
+        for start in range(0, len(messages), batch_size):
+            connection.send_messages(messages[start:start + batch_size])
+    finally:
+        connection.close()
+
+
+def send_digests(flush=False):
+    """
+    Отправляет созревшие дайджесты, с flush — все накопленные.
+    Письма уходят после коммита транзакции, в которой удалены
+    их события. Возвращает число писем.
+    """
+    now = timezone.now()
+    recipients = get_due_recipients(now, flush)
+    if not recipients:
+        return 0
+    batch_size = getattr(settings, 'DIGEST_BATCH_SIZE', DIGEST_BATCH_SIZE)
+    messages = []
+    with transaction.atomic():
+        for start in range(0, len(recipients), batch_size):
+            messages += take_batch(
+                recipients[start:start + batch_size], now
+            )
+        if messages:
+            transaction.on_commit(lambda: deliver(messages, batch_size))
+    return len(messages)
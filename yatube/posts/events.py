@@ -0,0 +1,101 @@
+"""
+События о новых постах и комментариях для потоков /events/.
+
+Событие уходит в каналы общей ленты, группы поста и его автора;
+подписчик ленты подписок слушает каналы авторов, на которых подписан.
+"""
+from importlib import import_module
+
+from django.conf import settings
+from django.contrib.auth import get_user
+from django.core.exceptions import PermissionDenied
+from django.core.handlers.wsgi import WSGIRequest
+from django.db import transaction
+from django.shortcuts import get_object_or_404
+from django.urls import reverse
+
+from core.events import publish
+
+from .models import Follow, Group
+
+FEED_CHANNEL: str = 'feed'
+GROUP_CHANNEL: str = 'group:{}'
+AUTHOR_CHANNEL: str = 'author:{}'
+EVENT_PREVIEW_CHARS: int = 200
+
+
+def post_channels(post):
+    channels = [FEED_CHANNEL, AUTHOR_CHANNEL.format(post.author_id)]
+    if post.group_id:
+        channels.append(GROUP_CHANNEL.format(post.group_id))
+    return channels
+
+
+def post_event(post):
+    return {
+        'type': 'post',
+        'id': post.pk,
+        'url': reverse('posts:post_detail', args=[post.pk]),
+        'author': post.author.username,
+        'group': post.group_id,
+        'text': post.text[:EVENT_PREVIEW_CHARS],
+        'pub_date': post.pub_date.isoformat(),
+    }
+
+
+def comment_event(comment):
+    return {
+        'type': 'comment',
+        'id': comment.pk,
+        'post': comment.post_id,
+        'url': reverse('posts:post_detail', args=[comment.post_id]),
+        'author': comment.author.username,
+        'text': comment.text[:EVENT_PREVIEW_CHARS],
+        'created': comment.created.isoformat(),
+    }
+
+
+def publish_post(post):
+    """Событие уходит после коммита: подписчик сразу может открыть пост."""
+    transaction.on_commit(
+        lambda: publish(post_channels(post), post_event(post))
+    )
+
+
+def publish_comment(comment):
+    post = comment.post
+    transaction.on_commit(
+        lambda: publish(post_channels(post), comment_event(comment))
+    )
+
+
+def feed_channels(environ):
+    return [FEED_CHANNEL]
+
+
+def group_channels(environ, slug):
+    group = get_object_or_404(Group.objects.only('pk'), slug=slug)
+    return [GROUP_CHANNEL.format(group.pk)]
+
+
+def follow_channels(environ):
+    """Каналы авторов, на которых подписан пользователь из сессии."""
+    request = WSGIRequest(environ)
+    engine = import_module(settings.SESSION_ENGINE)
+    request.session = engine.SessionStore(
+        request.COOKIES.get(settings.SESSION_COOKIE_NAME)
+    )
+    user = get_user(request)
+    if not user.is_authenticated:
+        raise PermissionDenied
+    authors = Follow.objects.filter(user=user).values_list(
+        'author_id', flat=True
+    )
+    return [AUTHOR_CHANNEL.format(author) for author in authors]
+
+
+EVENT_ROUTES = [
+    (r'/events/feed/', feed_channels),
+    (r'/events/group/(?P<slug>[-\w]+)/', group_channels),
+    (r'/events/follow/', follow_channels),
+]
@@ -1,6 +1,7 @@
 from django import forms
 
 from .models import Post, Comment
+from .thumbnails import schedule_thumbnails
 
 
 class PostForm(forms.ModelForm):
@@ -12,6 +13,17 @@ class PostForm(forms.ModelForm):
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
         self.fields['group'].empty_label = 'Группа не выбрана'
+        image = self.files.get('image')
+        self.upload_error = getattr(image, 'upload_error', None)
+        if self.upload_error:
+            self.files = self.files.copy()
+            del self.files['image']
+
+    def clean_image(self):
+        """Картинку, отклонённую ещё при загрузке, не пропускаем."""
+        if self.upload_error:
+            raise forms.ValidationError(self.upload_error)
+        return self.cleaned_data['image']
 
     def clean_text(self):
         text = self.cleaned_data['text']
@@ -19,6 +31,18 @@ class PostForm(forms.ModelForm):
             raise forms.ValidationError('Поле не заполнено')
         return text
 
+    def save(self, commit=True):
+        """Новая картинка сбрасывает миниатюры и ставит их нарезку."""
+        post = super().save(commit=False)
+        if 'image' in self.changed_data:
+            post.thumbnails = ''
+        if commit:
+            post.save()
+            self._save_m2m()
+            if 'image' in self.changed_data and post.image:
+                schedule_thumbnails(post)
+        return post
+
 
 class CommentForm(forms.ModelForm):
     """Форма для создание постов."""
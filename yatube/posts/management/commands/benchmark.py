@@ -0,0 +1,127 @@
+from django.core.exceptions import ObjectDoesNotExist
+from django.core.management.base import BaseCommand, CommandError
+
+from posts import benchmark
+from posts.seeding import seed_dataset
+
+
+class Command(BaseCommand):
+    help = (
+        'Замеряет задержки, число запросов и память страниц постов. '
+        'Сценарии add_comment и post_create пишут в базу: '
+        'запускайте на отдельной базе.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--seed', action='store_true',
+            help='Сначала наполнить базу данными (см. размеры ниже).'
+        )
+        parser.add_argument('--users', type=int, default=100_000)
+        parser.add_argument('--groups', type=int, default=200)
+        parser.add_argument('--posts', type=int, default=1_000_000)
+        parser.add_argument('--comments', type=int, default=2_000_000)
+        parser.add_argument(
+            '--follows', type=int, default=10,
+            help='Среднее число подписок на пользователя.'
+        )
+        parser.add_argument('--random-seed', type=int, default=0)
+        parser.add_argument(
+            '--mode', default='all',
+            choices=[benchmark.MODE_SEQUENTIAL, benchmark.MODE_CONCURRENT,
+                     benchmark.MODE_RENDER, 'all'],
+        )
+        parser.add_argument(
+            '--iterations', type=int, default=benchmark.BENCH_ITERATIONS
+        )
+        parser.add_argument(
+            '--concurrency', type=int, default=benchmark.BENCH_CONCURRENCY
+        )
+        parser.add_argument(
+            '--cold', action='store_true',
+            help='Очищать кэш перед каждым запросом.'
+        )
+        parser.add_argument(
+            '--scenario', action='append', dest='scenarios',
+            help='Замерить только эти сценарии.'
+        )
+        parser.add_argument(
+            '--output', default='benchmark.json',
+            help='Куда записать результаты в JSON.'
+        )
+        parser.add_argument(
+            '--compare', help='JSON прошлого прогона для сравнения.'
+        )
+        parser.add_argument(
+            '--threshold', type=float, default=benchmark.BENCH_THRESHOLD,
+            help='Допустимый рост p95, доля.'
+        )
+
+    def handle(self, *args, **options):
+        if options['seed']:
+            seed_dataset(
+                users=options['users'], groups=options['groups'],
+                posts=options['posts'], comments=options['comments'],
+                follows=options['follows'], seed=options['random_seed'],
+            )
+            self.stdout.write('База наполнена.')
+        try:
+            reader, author, group, post = benchmark.pick_targets()
+        except ObjectDoesNotExist:
+            raise CommandError(
+                'В базе нет постов, групп или подписок: запустите с --seed.'
+            )
+        scenarios = benchmark.build_scenarios(author, group, post)
+        if options['scenarios']:
+            scenarios = [
+                scenario for scenario in scenarios
+                if scenario.name in options['scenarios']
+            ]
+        modes = {
+            benchmark.MODE_SEQUENTIAL: lambda: benchmark.run_sequential(
+                scenarios, reader, options['iterations'], options['cold']
+            ),
+            benchmark.MODE_CONCURRENT: lambda: benchmark.run_concurrent(
+                scenarios, reader, options['iterations'],
+                options['concurrency']
+            ),
+            benchmark.MODE_RENDER: lambda: benchmark.run_render(
+                scenarios, reader, options['iterations']
+            ),
+        }
+        if options['mode'] != 'all':
+            modes = {options['mode']: modes[options['mode']]}
+        results = {
+            'meta': benchmark.collect_metadata(
+                iterations=options['iterations'],
+                concurrency=options['concurrency'], cold=options['cold'],
+            ),
+            'results': {mode: run() for mode, run in modes.items()},
+        }
+        self.report(results)
+        benchmark.save_results(options['output'], results)
+        self.stdout.write(self.style.SUCCESS(
+            f'Результаты записаны в {options["output"]}'
+        ))
+        if options['compare']:
+            self.check_regressions(
+                benchmark.load_results(options['compare']), results,
+                options['threshold']
+            )
+
+    def report(self, results):
+        for mode, scenario_results in results['results'].items():
+            for name, result in scenario_results.items():
+                if isinstance(result, dict):
+                    self.stdout.write(
+                        f'{mode:<10} {name:<21} '
+                        f'p50 {result["p50_ms"]:>9} мс  '
+                        f'p95 {result["p95_ms"]:>9} мс  '
+                        f'запросов {result.get("queries", "-")}'
+                    )
+
+    def check_regressions(self, baseline, results, threshold):
+        regressions = benchmark.compare(baseline, results, threshold)
+        if regressions:
+            raise CommandError('Регрессии:\n' + '\n'.join(regressions))
+        self.stdout.write(self.style.SUCCESS('Регрессий нет.'))
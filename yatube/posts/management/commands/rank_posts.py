@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from posts.ranking import prune_scores, rebuild_scores
+
+
+class Command(BaseCommand):
+    help = (
+        'Удаляет устаревшие оценки популярного, а с --rebuild '
+        'пересчитывает все оценки по постам и комментариям.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--rebuild', action='store_true',
+            help='Пересчитать оценки после смены весов RANKING_*.'
+        )
+
+    def handle(self, *args, **options):
+        if options['rebuild']:
+            with transaction.atomic():
+                scored = rebuild_scores()
+            self.stdout.write(self.style.SUCCESS(
+                f'Оценок пересчитано: {scored}'
+            ))
+            return
+        deleted = prune_scores()
+        self.stdout.write(self.style.SUCCESS(
+            f'Устаревших оценок удалено: {deleted}'
+        ))
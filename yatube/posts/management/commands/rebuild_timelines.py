@@ -0,0 +1,37 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from posts.models import Follow
+from posts.timeline import drop_orphan_timelines, rebuild_timeline
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = 'Пересобирает материализованные ленты подписок.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'usernames', nargs='*',
+            help='Пользователи, чьи ленты пересобрать (по умолчанию все).'
+        )
+
+    def handle(self, *args, **options):
+        users = User.objects.filter(
+            pk__in=Follow.objects.values('user')
+        ).order_by('pk')
+        if options['usernames']:
+            users = User.objects.filter(username__in=options['usernames'])
+        else:
+            # Отписавшихся от всех нет среди users: их ленты чистятся здесь.
+            deleted = drop_orphan_timelines()
+            self.stdout.write(f'Удалено записей без подписок: {deleted}')
+        rebuilt = 0
+        for user in users.iterator():
+            with transaction.atomic():
+                rebuild_timeline(user)
+            rebuilt += 1
+        self.stdout.write(
+            self.style.SUCCESS(f'Пересобрано лент: {rebuilt}')
+        )
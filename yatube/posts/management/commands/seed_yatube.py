@@ -0,0 +1,49 @@
+from django.core.management.base import BaseCommand
+
+from posts.seeding import SEED_BATCH_SIZE, SEED_PREFIX, seed_dataset
+
+
+class Command(BaseCommand):
+    help = (
+        'Наполняет базу пользователями, группами, постами, комментариями '
+        'и подписками. Одинаковый --seed даёт одинаковые данные.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=10_000)
+        parser.add_argument('--groups', type=int, default=100)
+        parser.add_argument('--posts', type=int, default=100_000)
+        parser.add_argument('--comments', type=int, default=200_000)
+        parser.add_argument(
+            '--follows', type=int, default=10,
+            help='Среднее число подписок на пользователя.'
+        )
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument(
+            '--prefix', default=SEED_PREFIX,
+            help='Начало имён пользователей и slug групп.'
+        )
+        parser.add_argument(
+            '--workers', type=int,
+            help='Процессов генерации (по умолчанию по числу ядер).'
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=SEED_BATCH_SIZE
+        )
+
+    def handle(self, *args, **options):
+        def log(stage, seconds):
+            self.stdout.write(f'{stage:<10} {seconds:8.1f} с')
+
+        user_ids = seed_dataset(
+            users=options['users'], groups=options['groups'],
+            posts=options['posts'], comments=options['comments'],
+            follows=options['follows'], seed=options['seed'],
+            prefix=options['prefix'], batch_size=options['batch_size'],
+            workers=options['workers'], log=log,
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f'Создано пользователей: {len(user_ids)}, '
+            f'постов: {options["posts"]}, '
+            f'комментариев: {options["comments"]}'
+        ))
@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+
+from posts.digests import send_digests
+
+
+class Command(BaseCommand):
+    help = (
+        'Отправляет письма-дайджесты, чьё окно DIGEST_WINDOW истекло. '
+        'Подходит для cron, когда фоновые задачи выполняются сразу.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--flush', action='store_true',
+            help='Отправить все накопленные события, не дожидаясь окна.'
+        )
+
+    def handle(self, *args, **options):
+        sent = send_digests(flush=options['flush'])
+        self.stdout.write(self.style.SUCCESS(f'Отправлено писем: {sent}'))
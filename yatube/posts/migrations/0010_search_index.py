@@ -0,0 +1,49 @@
+from django.db import migrations
+
+SEARCH_TABLE = 'posts_search'
+
+
+def fts5_available(schema_editor):
+    connection = schema_editor.connection
+    if connection.vendor != 'sqlite':
+        return False
+    with connection.cursor() as cursor:
+        cursor.execute('PRAGMA compile_options')
+        options = {row[0] for row in cursor.fetchall()}
+    return 'ENABLE_FTS5' in options
+
+
+def create_search_index(apps, schema_editor):
+    if not fts5_available(schema_editor):
+        return
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute(
+            f'CREATE VIRTUAL TABLE IF NOT EXISTS {SEARCH_TABLE} USING fts5('
+            "text, post_id UNINDEXED, tokenize='unicode61', prefix='2 3')"
+        )
+        cursor.execute(
+            f'INSERT INTO {SEARCH_TABLE} (rowid, text, post_id) '
+            'SELECT id * 2, text, id FROM posts_post'
+        )
+        cursor.execute(
+            f'INSERT INTO {SEARCH_TABLE} (rowid, text, post_id) '
+            'SELECT id * 2 + 1, text, post_id FROM posts_comment'
+        )
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute(f'DROP TABLE IF EXISTS {SEARCH_TABLE}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0009_counters'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
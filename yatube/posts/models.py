@@ -1,4 +1,7 @@
+import json
+
 from django.contrib.auth import get_user_model
+from django.core.files.storage import default_storage
 from django.db import models
 
 TEXT_PREVIEW_CHARS: int = 15
@@ -22,6 +25,22 @@ class Group(models.Model):
         return self.title
 
 
+class PostQuerySet(models.QuerySet):
+    """Запросы к постам."""
+
+    def for_listing(self):
+        """
+        Посты для ленты: автор и группа одним JOIN
+        и только нужные карточке поля.
+        """
+        return self.select_related('author', 'group').only(
+            'text', 'pub_date', 'image', 'thumbnails', 'comments_count',
+            'author', 'group',
+            'author__username', 'author__first_name', 'author__last_name',
+            'group__title', 'group__slug',
+        )
+
+
 class Post(models.Model):
     """Таблица для постов."""
     text = models.TextField(
@@ -32,6 +51,11 @@ class Post(models.Model):
         auto_now_add=True,
         verbose_name="Дата публикации"
     )
+    modified = models.DateTimeField(
+        auto_now=True,
+        verbose_name='Дата изменения',
+        help_text='Правка поста, его комментариев или миниатюр'
+    )
     author = models.ForeignKey(
         User,
         on_delete=models.CASCADE,
@@ -54,15 +78,70 @@ class Post(models.Model):
         help_text='Загрузите картинку'
 
     )
+    thumbnails = models.TextField(
+        blank=True,
+        default='',
+        editable=False,
+        verbose_name='Миниатюры',
+        help_text='JSON: имя размера -> файл миниатюры'
+    )
+    comments_count = models.IntegerField(
+        default=0,
+        editable=False,
+        verbose_name='Число комментариев'
+    )
+
+    objects = PostQuerySet.as_manager()
 
     class Meta:
         ordering = ['-pub_date']
         verbose_name = 'Пост'
         verbose_name_plural = 'Посты'
+        indexes = [
+            models.Index(fields=['pub_date', 'id'], name='post_date_idx'),
+            models.Index(
+                fields=['group', 'pub_date', 'id'],
+                name='post_group_date_idx'
+            ),
+            models.Index(
+                fields=['author', 'pub_date', 'id'],
+                name='post_author_date_idx'
+            ),
+            models.Index(
+                fields=['group', 'modified'],
+                name='post_group_modified_idx'
+            ),
+            models.Index(
+                fields=['author', 'modified'],
+                name='post_author_modified_idx'
+            ),
+        ]
 
     def __str__(self):
         return self.text[:TEXT_PREVIEW_CHARS] + '...'
 
+    def thumbnail_url(self, size_name):
+        """URL готовой миниатюры или None, пока её режут."""
+        name = json.loads(self.thumbnails or '{}').get(size_name)
+        return default_storage.url(name) if name else None
+
+    @property
+    def card_image_url(self):
+        """Миниатюра для карточки, а пока её нет — исходная картинка."""
+        if not self.image:
+            return None
+        return self.thumbnail_url('card') or self.image.url
+
+
+class CommentQuerySet(models.QuerySet):
+    """Запросы к комментариям."""
+
+    def for_listing(self):
+        """Комментарии с автором одним JOIN и только нужные поля."""
+        return self.select_related('author').only(
+            'text', 'created', 'post', 'author', 'author__username'
+        )
+
 
 class Comment(models.Model):
     text = models.TextField(
@@ -85,8 +164,15 @@ class Comment(models.Model):
         on_delete=models.CASCADE
     )
 
+    objects = CommentQuerySet.as_manager()
+
     class Meta:
         ordering = ('-created',)
+        indexes = [
+            models.Index(
+                fields=['post', 'created'], name='comment_post_created_idx'
+            ),
+        ]
 
     def __str__(self):
         return f'Комментарий {self.name}, пост - {self.post}'
@@ -114,6 +200,171 @@ class Follow(models.Model):
                 fields=['author', 'user'], name='unique_follow'
             )
         ]
+        indexes = [
+            models.Index(
+                fields=['user', 'author'], name='follow_user_author_idx'
+            ),
+        ]
 
     def __str__(self):
         return f"Последователь: '{self.user}', автор: '{self.author}'"
+
+
+class UserStats(models.Model):
+    """Счётчики пользователя, обновляемые вместе с данными."""
+    user = models.OneToOneField(
+        User,
+        related_name='stats',
+        on_delete=models.CASCADE,
+        primary_key=True,
+        verbose_name='Пользователь'
+    )
+    posts_count = models.IntegerField(
+        default=0, verbose_name='Число постов'
+    )
+    followers_count = models.IntegerField(
+        default=0, verbose_name='Число подписчиков'
+    )
+    following_count = models.IntegerField(
+        default=0, verbose_name='Число подписок'
+    )
+
+    class Meta:
+        verbose_name_plural = 'Счётчики пользователей'
+        verbose_name = 'Счётчики пользователя'
+
+    def __str__(self):
+        return f"Счётчики '{self.user}'"
+
+
+class TimelineEntry(models.Model):
+    """Материализованная лента подписок: пост в ленте подписчика."""
+    user = models.ForeignKey(
+        User,
+        related_name='timeline_entries',
+        on_delete=models.CASCADE,
+        verbose_name='Подписчик'
+    )
+    post = models.ForeignKey(
+        Post,
+        related_name='timeline_entries',
+        on_delete=models.CASCADE,
+        verbose_name='Пост'
+    )
+    author = models.ForeignKey(
+        User,
+        related_name='+',
+        on_delete=models.CASCADE,
+        verbose_name='Автор'
+    )
+    pub_date = models.DateTimeField(verbose_name='Дата публикации')
+
+    class Meta:
+        verbose_name_plural = 'Записи лент'
+        verbose_name = 'Запись ленты'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'post'], name='unique_timeline_entry'
+            )
+        ]
+        indexes = [
+            models.Index(
+                fields=['user', 'pub_date', 'post'],
+                name='timeline_user_date_idx'
+            ),
+            models.Index(
+                fields=['user', 'author'], name='timeline_user_author_idx'
+            ),
+        ]
+
+    def __str__(self):
+        return f"Лента '{self.user}': {self.post}"
+
+
+class Notification(models.Model):
+    """Событие для письма-дайджеста; удаляется, когда письмо ушло."""
+    POST = 'post'
+    COMMENT = 'comment'
+    KINDS = (
+        (POST, 'Новый пост автора из подписок'),
+        (COMMENT, 'Новый комментарий к посту'),
+    )
+
+    recipient = models.ForeignKey(
+        User,
+        related_name='notifications',
+        on_delete=models.CASCADE,
+        verbose_name='Получатель'
+    )
+    kind = models.CharField(
+        max_length=10, choices=KINDS, verbose_name='Событие'
+    )
+    post = models.ForeignKey(
+        Post,
+        related_name='+',
+        on_delete=models.CASCADE,
+        verbose_name='Пост'
+    )
+    comment = models.ForeignKey(
+        Comment,
+        related_name='+',
+        on_delete=models.CASCADE,
+        blank=True,
+        null=True,
+        verbose_name='Комментарий'
+    )
+    created = models.DateTimeField(
+        auto_now_add=True, verbose_name='Дата события'
+    )
+
+    class Meta:
+        verbose_name_plural = 'Уведомления'
+        verbose_name = 'Уведомление'
+        indexes = [
+            models.Index(
+                fields=['recipient', 'created'],
+                name='notification_recipient_idx'
+            ),
+        ]
+
+    def __str__(self):
+        return f"Уведомление '{self.recipient}': {self.get_kind_display()}"
+
+
+class PostScore(models.Model):
+    """Оценка поста в популярном (см. posts/ranking.py)."""
+    post = models.OneToOneField(
+        Post,
+        related_name='score',
+        on_delete=models.CASCADE,
+        primary_key=True,
+        verbose_name='Пост'
+    )
+    group = models.ForeignKey(
+        Group,
+        related_name='+',
+        on_delete=models.SET_NULL,
+        blank=True,
+        null=True,
+        verbose_name='Группа'
+    )
+    rank = models.FloatField(
+        verbose_name='Оценка',
+        help_text='log2 суммы весов событий с поправкой на их давность'
+    )
+    updated = models.DateTimeField(verbose_name='Последнее событие')
+
+    class Meta:
+        verbose_name_plural = 'Оценки постов'
+        verbose_name = 'Оценка поста'
+        indexes = [
+            models.Index(fields=['rank', 'post'], name='score_rank_idx'),
+            models.Index(
+                fields=['group', 'rank', 'post'],
+                name='score_group_rank_idx'
+            ),
+            models.Index(fields=['updated'], name='score_updated_idx'),
+        ]
+
+    def __str__(self):
+        return f'Оценка {self.post_id}: {self.rank:.3f}'
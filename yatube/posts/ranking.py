@@ -0,0 +1,198 @@
+"""
+Популярные посты: оценки с затуханием, обновляемые по событиям.
+
+Событие весом w через время Δt весит w * 2 ** (-Δt / RANKING_HALF_LIFE).
+Затухание умножает все оценки на один множитель и порядок постов
+не меняет, поэтому в PostScore.rank хранится log2 суммы
+w * 2 ** ((t - RANKING_EPOCH) / RANKING_HALF_LIFE) по событиям поста.
+Новое событие прибавляется одним UPDATE без пересчёта остальных
+оценок, а логарифм растёт со временем линейно и не переполняется.
+Страница популярного — чтение первых строк индекса (rank, post).
+
+События — публикация поста (вес растёт с числом подписчиков автора)
+и комментарий к нему. Удалённый комментарий оценку не уменьшает.
+"""
+import math
+from datetime import datetime, timedelta
+
+from django.conf import settings
+from django.core.paginator import Paginator
+from django.db.models import F
+from django.db.models.functions import Log, Power
+from django.utils import timezone
+
+from .models import Comment, Post, PostScore, UserStats
+from .utils import POST_PER_PAGE
+
+RANKING_EPOCH = datetime(2022, 1, 1, tzinfo=timezone.utc)
+RANKING_HALF_LIFE: float = 24 * 3600
+RANKING_POST_WEIGHT: float = 1.0
+RANKING_FOLLOWER_WEIGHT: float = 0.5
+RANKING_COMMENT_WEIGHT: float = 1.0
+RANKING_LIMIT: int = 100
+RANKING_KEEP: float = 14 * 24 * 3600
+RANKING_BATCH_SIZE: int = 1000
+
+
+def get_setting(name, default):
+    return getattr(settings, name, default)
+
+
+def event_rank(weight, when):
+    """log2 вклада события весом weight, случившегося в момент when."""
+    elapsed = (when - RANKING_EPOCH).total_seconds()
+    return math.log2(weight) + elapsed / get_setting(
+        'RANKING_HALF_LIFE', RANKING_HALF_LIFE
+    )
+
+
+def add_ranks(first, second):
+    """Сумма двух вкладов в логарифмах, без переполнения."""
+    top, bottom = max(first, second), min(first, second)
+    return top + math.log2(1 + 2 ** (bottom - top))
+
+
+def post_weight(followers):
+    """Вес публикации: у автора с подписчиками пост заметнее."""
+    return (
+        get_setting('RANKING_POST_WEIGHT', RANKING_POST_WEIGHT)
+        + get_setting('RANKING_FOLLOWER_WEIGHT', RANKING_FOLLOWER_WEIGHT)
+        * math.log2(1 + (followers or 0))
+    )
+
+
+def get_followers(author_id):
+    return UserStats.objects.filter(user_id=author_id).values_list(
+        'followers_count', flat=True
+    ).first()
+
+
+def score_post(post):
+    """Оценка нового поста: его публикация — первое событие."""
+    PostScore.objects.get_or_create(post_id=post.pk, defaults={
+        'group_id': post.group_id,
+        'rank': event_rank(
+            post_weight(get_followers(post.author_id)), post.pub_date
+        ),
+        'updated': post.pub_date,
+    })
+
+
+def move_post(post):
+    """Пост перенесли в другую группу: за ним переезжает оценка."""
+    PostScore.objects.filter(post_id=post.pk).exclude(
+        group_id=post.group_id
+    ).update(group_id=post.group_id)
+
+
+def add_event(post_id, weight, when):
+    """
+    Прибавляет событие к оценке поста одним UPDATE:
+    rank = x + log2(1 + 2 ** (rank - x)), где x — вклад события.
+    Поста без оценки (старше RANKING_KEEP или опубликованного до
+    появления рейтинга) оценка заводится заново.
+    """
+    rank = event_rank(weight, when)
+    scores = PostScore.objects.filter(post_id=post_id)
+    changes = {
+        'rank': Log(2, 1 + Power(2, F('rank') - rank)) + rank,
+        'updated': when,
+    }
+    if scores.update(**changes):
+        return
+    post = Post.objects.filter(pk=post_id).values_list(
+        'group_id', 'author_id', 'pub_date'
+    ).first()
+    if post is None:
+        return
+    group_id, author_id, pub_date = post
+    published = event_rank(post_weight(get_followers(author_id)), pub_date)
+    _, created = PostScore.objects.get_or_create(post_id=post_id, defaults={
+        'group_id': group_id,
+        'rank': add_ranks(published, rank),
+        'updated': when,
+    })
+    if not created:
+        scores.update(**changes)
+
+
+def comment_added(comment):
+    add_event(
+        comment.post_id,
+        get_setting('RANKING_COMMENT_WEIGHT', RANKING_COMMENT_WEIGHT),
+        comment.created
+    )
+
+
+def popular_posts(group=None):
+    """Первые RANKING_LIMIT постов по оценке, всего сайта или группы."""
+    if group is None:
+        posts = Post.objects.filter(score__isnull=False)
+    else:
+        posts = Post.objects.filter(score__group=group)
+    return posts.for_listing().order_by('-score__rank', '-score__post')[
+        :get_setting('RANKING_LIMIT', RANKING_LIMIT)
+    ]
+
+
+def get_popular_page(request, group=None):
+    """
+    Страница популярного. Список ограничен RANKING_LIMIT, поэтому
+    COUNT(*) и OFFSET дёшевы при любом числе постов.
+    """
+    paginator = Paginator(popular_posts(group), POST_PER_PAGE)
+    return paginator.get_page(request.GET.get('page'))
+
+
+def get_stale_before():
+    return timezone.now() - timedelta(
+        seconds=get_setting('RANKING_KEEP', RANKING_KEEP)
+    )
+
+
+def prune_scores():
+    """Удаляет оценки постов без событий дольше RANKING_KEEP."""
+    deleted, _ = PostScore.objects.filter(
+        updated__lt=get_stale_before()
+    ).delete()
+    return deleted
+
+
+def rebuild_scores():
+    """
+    Пересчитывает оценки по постам и комментариям за RANKING_KEEP:
+    после смены весов или периода полураспада и для постов,
+    опубликованных до появления рейтинга. Возвращает число оценок.
+    """
+    since = get_stale_before()
+    scores = {}
+
+    def publish(post_id, group_id, pub_date, followers):
+        rank = event_rank(post_weight(followers), pub_date)
+        scores[post_id] = PostScore(
+            post_id=post_id, group_id=group_id, rank=rank, updated=pub_date
+        )
+
+    posts = Post.objects.filter(pub_date__gte=since).values_list(
+        'pk', 'group_id', 'pub_date', 'author__stats__followers_count'
+    )
+    for row in posts.iterator():
+        publish(*row)
+    comments = Comment.objects.filter(created__gte=since).order_by(
+        'created'
+    ).values_list(
+        'post_id', 'post__group_id', 'post__pub_date',
+        'post__author__stats__followers_count', 'created'
+    )
+    weight = get_setting('RANKING_COMMENT_WEIGHT', RANKING_COMMENT_WEIGHT)
+    for post_id, group_id, pub_date, followers, created in comments.iterator():
+        if post_id not in scores:
+            publish(post_id, group_id, pub_date, followers)
+        score = scores[post_id]
+        score.rank = add_ranks(score.rank, event_rank(weight, created))
+        score.updated = created
+    PostScore.objects.all().delete()
+    PostScore.objects.bulk_create(
+        scores.values(), batch_size=RANKING_BATCH_SIZE
+    )
+    return len(scores)
@@ -0,0 +1,289 @@
+import bisect
+import math
+import re
+import threading
+import time
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection, transaction
+
+from .models import Comment, Post
+
+SEARCH_TABLE: str = 'posts_search'
+SEARCH_LIMIT: int = 100
+# Строк FTS5 на один найденный пост: комментарии того же поста
+# отсеиваются, поэтому строк читается с запасом.
+SEARCH_OVERFETCH: int = 4
+SEARCH_VERSION_KEY: str = 'search:memory:version'
+KIND_POST: int = 0
+KIND_COMMENT: int = 1
+BM25_K1: float = 1.2
+BM25_B: float = 0.75
+WORD_RE = re.compile(r'\w+', re.UNICODE)
+
+
+def tokenize(text):
+    return [word.casefold() for word in WORD_RE.findall(text or '')]
+
+
+def search_rowid(kind, object_id):
+    """Посты и комментарии живут в одной таблице: rowid = id * 2 + вид."""
+    return object_id * 2 + kind
+
+
+class FTS5Backend:
+    """Индекс в виртуальной таблице SQLite FTS5 с ранжированием bm25."""
+
+    def index(self, kind, object_id, post_id, text):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'INSERT OR REPLACE INTO {SEARCH_TABLE} '
+                '(rowid, text, post_id) VALUES (%s, %s, %s)',
+                [search_rowid(kind, object_id), text, post_id]
+            )
+
+    def remove(self, kind, object_id):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'DELETE FROM {SEARCH_TABLE} WHERE rowid = %s',
+                [search_rowid(kind, object_id)]
+            )
+
+    def search(self, query, limit):
+        words = tokenize(query)
+        if not words:
+            return []
+        match = ' '.join(f'"{word}"*' for word in words)
+        found, seen = [], set()
+        batch, offset = limit * SEARCH_OVERFETCH, 0
+        with connection.cursor() as cursor:
+            while len(found) < limit:
+                cursor.execute(
+                    f'SELECT post_id FROM {SEARCH_TABLE} '
+                    f'WHERE {SEARCH_TABLE} MATCH %s ORDER BY rank '
+                    'LIMIT %s OFFSET %s', [match, batch, offset]
+                )
+                rows = cursor.fetchall()
+                for (post_id,) in rows:
+                    if post_id not in seen:
+                        seen.add(post_id)
+                        found.append(post_id)
+                if len(rows) < batch:
+                    break
+                offset += batch
+        return found[:limit]
+
+    def rebuild(self):
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {SEARCH_TABLE}')
+            cursor.execute(
+                f'INSERT INTO {SEARCH_TABLE} (rowid, text, post_id) '
+                'SELECT id * 2 + %s, text, id FROM posts_post',
+                [KIND_POST]
+            )
+            cursor.execute(
+                f'INSERT INTO {SEARCH_TABLE} (rowid, text, post_id) '
+                'SELECT id * 2 + %s, text, post_id FROM posts_comment',
+                [KIND_COMMENT]
+            )
+
+
+class MemoryBackend:
+    """
+    Инвертированный индекс в памяти процесса для баз без FTS5:
+    BM25 по словам, префиксы ищутся бисекцией по отсортированному словарю.
+    Строится из базы при первом поиске.
+
+    Индекс у каждого процесса свой. Правки применяются после коммита
+    и увеличивают общий номер версии в кэше; процесс, пропустивший
+    чужую правку, видит другой номер и перестраивает индекс из базы.
+    Перестройка читает все посты и комментарии, поэтому бэкенд годится
+    для разработки и небольших баз, а не для нагруженной записи.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._built = False
+        self._version = None
+        self._postings = defaultdict(dict)
+        self._documents = {}
+        self._terms = []
+        self._total_length = 0
+
+    def _add(self, key, post_id, text):
+        words = tokenize(text)
+        counts = defaultdict(int)
+        for word in words:
+            counts[word] += 1
+        for word, count in counts.items():
+            if word not in self._postings:
+                bisect.insort(self._terms, word)
+            self._postings[word][key] = count
+        self._documents[key] = (post_id, len(words), tuple(counts))
+        self._total_length += len(words)
+
+    def _discard(self, key):
+        document = self._documents.pop(key, None)
+        if document is None:
+            return
+        _, length, words = document
+        self._total_length -= length
+        for word in words:
+            postings = self._postings[word]
+            postings.pop(key, None)
+            if not postings:
+                del self._postings[word]
+                del self._terms[bisect.bisect_left(self._terms, word)]
+
+    def _ensure_built(self):
+        version = cache.get(SEARCH_VERSION_KEY)
+        if version is None:
+            cache.add(SEARCH_VERSION_KEY, time.time_ns() // 1000, None)
+            version = cache.get(SEARCH_VERSION_KEY)
+        if not self._built or version != self._version:
+            self.rebuild()
+            self._version = version
+
+    def _bump_version(self):
+        """
+        Новый номер версии после своей правки. Индекс остаётся
+        актуальным, только если других правок между номерами не было.
+        """
+        try:
+            version = cache.incr(SEARCH_VERSION_KEY)
+        except ValueError:
+            version = None
+        if version is None or self._version is None or (
+            version != self._version + 1
+        ):
+            self._built = False
+        else:
+            self._version = version
+
+    def _apply(self, change):
+        def apply():
+            with self._lock:
+                if self._built:
+                    change()
+                self._bump_version()
+        transaction.on_commit(apply)
+
+    def index(self, kind, object_id, post_id, text):
+        key = search_rowid(kind, object_id)
+
+        def change():
+            self._discard(key)
+            self._add(key, post_id, text)
+        self._apply(change)
+
+    def remove(self, kind, object_id):
+        self._apply(lambda: self._discard(search_rowid(kind, object_id)))
+
+    def _expand(self, word):
+        index = bisect.bisect_left(self._terms, word)
+        while (index < len(self._terms)
+               and self._terms[index].startswith(word)):
+            yield self._terms[index]
+            index += 1
+
+    def search(self, query, limit):
+        words = tokenize(query)
+        with self._lock:
+            self._ensure_built()
+            if not words or not self._documents:
+                return []
+            total = len(self._documents)
+            average = self._total_length / total or 1
+            scores = None
+            for word in words:
+                word_scores = defaultdict(float)
+                for term in self._expand(word):
+                    postings = self._postings[term]
+                    idf = math.log(
+                        1 + (total - len(postings) + 0.5)
+                        / (len(postings) + 0.5)
+                    )
+                    for key, count in postings.items():
+                        length = self._documents[key][1]
+                        word_scores[key] += idf * count * (BM25_K1 + 1) / (
+                            count + BM25_K1 * (
+                                1 - BM25_B + BM25_B * length / average
+                            )
+                        )
+                if scores is None:
+                    scores = word_scores
+                else:
+                    scores = {
+                        key: score + word_scores[key]
+                        for key, score in scores.items() if key in word_scores
+                    }
+            best = {}
+            for key, score in scores.items():
+                post_id = self._documents[key][0]
+                best[post_id] = max(score, best.get(post_id, 0))
+        return sorted(best, key=best.get, reverse=True)[:limit]
+
+    def rebuild(self):
+        with self._lock:
+            self._postings.clear()
+            self._documents.clear()
+            self._terms.clear()
+            self._total_length = 0
+            for pk, text in Post.objects.values_list(
+                    'pk', 'text').iterator():
+                self._add(search_rowid(KIND_POST, pk), pk, text)
+            for pk, post_id, text in Comment.objects.values_list(
+                    'pk', 'post_id', 'text').iterator():
+                self._add(search_rowid(KIND_COMMENT, pk), post_id, text)
+            self._built = True
+
+
+_memory_backend = MemoryBackend()
+_fts5_databases = {}
+
+
+def has_fts5():
+    """Есть ли в базе таблица FTS5 для поиска (проверяется один раз)."""
+    if connection.vendor != 'sqlite':
+        return False
+    name = connection.settings_dict['NAME']
+    if name not in _fts5_databases:
+        _fts5_databases[name] = (
+            SEARCH_TABLE in connection.introspection.table_names()
+        )
+    return _fts5_databases[name]
+
+
+def get_backend():
+    """Бэкенд поиска из POSTS_SEARCH_BACKEND: auto, fts5 или memory."""
+    name = getattr(settings, 'POSTS_SEARCH_BACKEND', 'auto')
+    if name == 'fts5' or (name == 'auto' and has_fts5()):
+        return FTS5Backend()
+    return _memory_backend
+
+
+def index_post(post):
+    get_backend().index(KIND_POST, post.pk, post.pk, post.text)
+
+
+def remove_post(post_id):
+    get_backend().remove(KIND_POST, post_id)
+
+
+def index_comment(comment):
+    get_backend().index(
+        KIND_COMMENT, comment.pk, comment.post_id, comment.text
+    )
+
+
+def remove_comment(comment_id):
+    get_backend().remove(KIND_COMMENT, comment_id)
+
+
+def search_posts(query, limit=SEARCH_LIMIT):
+    """Посты по релевантности: id из индекса, затем один запрос к базе."""
+    ids = get_backend().search(query, limit)
+    posts = Post.objects.for_listing().in_bulk(ids)
+    return [posts[pk] for pk in ids if pk in posts]
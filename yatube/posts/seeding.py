@@ -0,0 +1,350 @@
+import os
+import random
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from datetime import timedelta
+from functools import lru_cache
+from itertools import islice
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.db import connection, transaction
+from django.utils import timezone
+
+from . import ranking, search
+from .counters import reconcile_counters
+from .models import Comment, Follow, Group, Post, TimelineEntry
+from .timeline import get_fanout_limit
+
+User = get_user_model()
+
+SEED_BATCH_SIZE: int = 5000
+# Строк в одной задаче пула: меньше — больше накладных расходов
+# на пересылку, больше — дольше ждать первую пачку.
+SEED_CHUNK_SIZE: int = 50_000
+# Сколько частей пул готовит впрок, пока родитель пишет в базу.
+SEED_PENDING_CHUNKS: int = 2 * (os.cpu_count() or 1)
+SEED_PASSWORD: str = 'seed-password'
+SEED_PREFIX: str = 'seed'
+# Показатель закона Ципфа: чем больше, тем сильнее перекос
+# в пользу первых авторов.
+SEED_SKEW: float = 1.1
+SEED_DAYS: int = 365
+GROUP_SHARE: float = 0.7
+WORDS = (
+    'лето', 'город', 'книга', 'дорога', 'море', 'кофе', 'работа', 'кино',
+    'музыка', 'друзья', 'поезд', 'утро', 'вечер', 'дождь', 'снег', 'кот',
+    'собака', 'сад', 'лес', 'горы', 'река', 'ужин', 'завтрак', 'отпуск',
+    'проект', 'код', 'идея', 'вопрос', 'ответ', 'новости', 'спорт', 'игра',
+)
+
+
+@contextmanager
+def explicit_dates(*fields):
+    """
+    Отключает auto_now_add у полей, чтобы bulk_create сохранил
+    заранее разложенные по времени даты.
+    """
+    saved = [field.auto_now_add for field in fields]
+    for field in fields:
+        field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field, auto_now_add in zip(fields, saved):
+            field.auto_now_add = auto_now_add
+
+
+def bulk_insert(model, objects, batch_size=SEED_BATCH_SIZE, **kwargs):
+    """
+    bulk_create по частям: сам он сначала собирает все объекты
+    в список, а на миллионах строк это лишние гигабайты. Размер
+    одного INSERT Django подбирает сам под лимиты базы.
+    """
+    objects = iter(objects)
+    while True:
+        batch = list(islice(objects, batch_size))
+        if not batch:
+            return
+        model.objects.bulk_create(batch, **kwargs)
+
+
+# Генераторы ниже выполняются в процессах пула и не трогают базу:
+# возвращают кортежи с номерами строк, а id подставляет родитель.
+# У каждой части свой Random от (seed, вид, номер части), поэтому
+# результат не зависит от числа процессов.
+
+def chunk_rng(seed, kind, chunk):
+    return random.Random(f'{seed}:{kind}:{chunk}')
+
+
+@lru_cache(maxsize=8)
+def zipf_weights(size, skew=SEED_SKEW):
+    """Накопленные веса 1 / rank ** skew для random.choices."""
+    total, weights = 0.0, []
+    for rank in range(1, size + 1):
+        total += 1 / rank ** skew
+        weights.append(total)
+    return weights
+
+
+@lru_cache(maxsize=8)
+def popularity_order(seed, size):
+    """
+    Порядок популярности для подписок. Он свой, а не как у авторства:
+    самые подписываемые авторы не обязаны писать больше всех, иначе
+    ленты разрастаются до десятков миллионов строк.
+    """
+    order = list(range(size))
+    random.Random(f'{seed}:popular').shuffle(order)
+    return order
+
+
+def make_text(rng, words=12):
+    return ' '.join(rng.choices(WORDS, k=rng.randint(3, words))).capitalize()
+
+
+def spread_offsets(rng, start, stop, total, days=SEED_DAYS):
+    """
+    Секунды «назад» для строк start..stop из total: каждой части
+    достаётся свой отрезок времени, и даты растут вместе с id.
+    """
+    span = days * 24 * 60 * 60
+    newest = span * (1 - stop / total)
+    oldest = span * (1 - start / total)
+    return sorted(
+        (rng.uniform(newest, oldest) for _ in range(stop - start)),
+        reverse=True
+    )
+
+
+def generate_users(seed, chunk, start, stop):
+    rng = chunk_rng(seed, 'users', chunk)
+    return [rng.choice(WORDS).capitalize() for _ in range(start, stop)]
+
+
+def generate_posts(seed, chunk, start, stop, total, users, groups):
+    """Авторство по Ципфу: немногие пишут большую часть постов."""
+    rng = chunk_rng(seed, 'posts', chunk)
+    authors = rng.choices(
+        range(users), cum_weights=zipf_weights(users), k=stop - start
+    )
+    return [
+        (author,
+         rng.randrange(groups) if groups and rng.random() < GROUP_SHARE
+         else None,
+         make_text(rng, 40), offset)
+        for author, offset in zip(
+            authors, spread_offsets(rng, start, stop, total)
+        )
+    ]
+
+
+def generate_comments(seed, chunk, start, stop, total, users, posts):
+    """Комментарии тоже скапливаются под немногими постами."""
+    rng = chunk_rng(seed, 'comments', chunk)
+    targets = rng.choices(
+        range(posts), cum_weights=zipf_weights(posts), k=stop - start
+    )
+    return [
+        (post, rng.randrange(users), make_text(rng), offset)
+        for post, offset in zip(
+            targets, spread_offsets(rng, start, stop, total)
+        )
+    ]
+
+
+def generate_follows(seed, chunk, start, stop, users, per_user):
+    """
+    Пользователи start..stop подписываются на 0..2*per_user авторов
+    по Ципфу от популярности. Пары уникальны, на себя подписки нет.
+    """
+    rng = chunk_rng(seed, 'follows', chunk)
+    popular = popularity_order(seed, users)
+    weights = zipf_weights(users)
+    follows = []
+    for user in range(start, stop):
+        authors = set(rng.choices(
+            popular, cum_weights=weights, k=rng.randint(0, per_user * 2)
+        ))
+        authors.discard(user)
+        follows.extend((user, author) for author in sorted(authors))
+    return follows
+
+
+def generate(pool, function, seed, total, *args, chunk_size=SEED_CHUNK_SIZE):
+    """
+    Части в порядке номеров. С пулом — не больше SEED_PENDING_CHUNKS
+    частей впереди записи, чтобы не копить их в памяти.
+    """
+    tasks = (
+        (seed, chunk, start, min(start + chunk_size, total), *args)
+        for chunk, start in enumerate(range(0, total, chunk_size))
+    )
+    if pool is None:
+        for arguments in tasks:
+            yield function(*arguments)
+        return
+    pending = deque()
+    for arguments in tasks:
+        pending.append(pool.submit(function, *arguments))
+        if len(pending) >= SEED_PENDING_CHUNKS:
+            yield pending.popleft().result()
+    while pending:
+        yield pending.popleft().result()
+
+
+def seed_users(pool, seed, count, prefix, batch_size):
+    password = make_password(SEED_PASSWORD)
+    index = 0
+    for first_names in generate(pool, generate_users, seed, count):
+        bulk_insert(User, (
+            User(username=f'{prefix}{index + offset}', password=password,
+                 first_name=first_name)
+            for offset, first_name in enumerate(first_names)
+        ), batch_size)
+        index += len(first_names)
+    ids = dict(
+        User.objects.filter(username__startswith=prefix).values_list(
+            'username', 'pk'
+        ).iterator()
+    )
+    return [ids[f'{prefix}{index}'] for index in range(count)]
+
+
+def seed_groups(seed, count, prefix):
+    rng = chunk_rng(seed, 'groups', 0)
+    Group.objects.bulk_create(
+        Group(title=f'{make_text(rng, 3)} {index}',
+              slug=f'{prefix}-{index}', description=make_text(rng))
+        for index in range(count)
+    )
+    return list(
+        Group.objects.filter(slug__startswith=f'{prefix}-').order_by(
+            'pk'
+        ).values_list('pk', flat=True)
+    )
+
+
+def seed_posts(pool, seed, count, user_ids, group_ids, batch_size):
+    now = timezone.now()
+    with explicit_dates(Post._meta.get_field('pub_date')):
+        for rows in generate(pool, generate_posts, seed, count,
+                             count, len(user_ids), len(group_ids)):
+            bulk_insert(Post, (
+                Post(text=text, author_id=user_ids[author],
+                     group_id=None if group is None else group_ids[group],
+                     pub_date=now - timedelta(seconds=offset))
+                for author, group, text, offset in rows
+            ), batch_size)
+
+
+def seed_comments(pool, seed, count, user_ids, post_ids, batch_size):
+    now = timezone.now()
+    with explicit_dates(Comment._meta.get_field('created')):
+        for rows in generate(pool, generate_comments, seed, count,
+                             count, len(user_ids), len(post_ids)):
+            bulk_insert(Comment, (
+                Comment(text=text, post_id=post_ids[post],
+                        author_id=user_ids[author],
+                        created=now - timedelta(seconds=offset))
+                for post, author, text, offset in rows
+            ), batch_size)
+
+
+def seed_follows(pool, seed, per_user, user_ids, batch_size):
+    for rows in generate(pool, generate_follows, seed, len(user_ids),
+                         len(user_ids), per_user):
+        bulk_insert(Follow, (
+            Follow(user_id=user_ids[user], author_id=user_ids[author])
+            for user, author in rows
+        ), batch_size)
+
+
+def seed_timelines(prefix=SEED_PREFIX):
+    """
+    Раскладывает посты по лентам подписчиков одним INSERT ... SELECT
+    по JOIN подписок и постов: построчный bulk_create здесь на порядок
+    медленнее. Авторы с числом подписчиков выше порога пропускаются,
+    как и при обычной раскладке.
+    """
+    rows = Follow.objects.filter(
+        user__username__startswith=prefix,
+        author__posts__isnull=False,
+    ).exclude(
+        author__stats__followers_count__gt=get_fanout_limit()
+    ).order_by().values_list(
+        'user_id', 'author__posts__id', 'author_id',
+        'author__posts__pub_date'
+    )
+    select, params = rows.query.sql_with_params()
+    ops = connection.ops
+    table = ops.quote_name(TimelineEntry._meta.db_table)
+    columns = ', '.join(
+        ops.quote_name(column)
+        for column in ('user_id', 'post_id', 'author_id', 'pub_date')
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'{ops.insert_statement(ignore_conflicts=True)} {table} '
+            f'({columns}) {select} '
+            f'{ops.ignore_conflicts_suffix_sql(ignore_conflicts=True)}',
+            params
+        )
+
+
+def seed_dataset(users=1000, groups=20, posts=10000, comments=20000,
+                 follows=10, seed=0, prefix=SEED_PREFIX,
+                 batch_size=SEED_BATCH_SIZE, workers=None, log=None):
+    """
+    Наполняет базу: строки генерирует пул из workers процессов
+    (по умолчанию по числу ядер, 0 — без пула), а пишет этот процесс
+    пачками bulk_create. Сигналы при этом не срабатывают, поэтому
+    в конце пересчитываются счётчики, ленты, оценки популярного
+    и поисковый индекс.
+    Одинаковый seed даёт одинаковые данные при любом числе процессов.
+    log(этап, секунды) вызывается после каждого этапа.
+    """
+    if workers is None:
+        workers = os.cpu_count()
+    pool = ProcessPoolExecutor(workers) if workers else None
+    started = time.perf_counter()
+
+    def done(stage):
+        nonlocal started
+        if log is not None:
+            log(stage, time.perf_counter() - started)
+        started = time.perf_counter()
+
+    try:
+        with transaction.atomic():
+            user_ids = seed_users(pool, seed, users, prefix, batch_size)
+            done('users')
+            group_ids = seed_groups(seed, groups, prefix)
+            done('groups')
+            seed_posts(pool, seed, posts, user_ids, group_ids, batch_size)
+            done('posts')
+            post_ids = list(
+                Post.objects.filter(
+                    author__username__startswith=prefix
+                ).order_by('pk').values_list('pk', flat=True)
+            )
+            seed_comments(pool, seed, comments, user_ids, post_ids,
+                          batch_size)
+            done('comments')
+            seed_follows(pool, seed, follows, user_ids, batch_size)
+            done('follows')
+            reconcile_counters()
+            done('counters')
+            seed_timelines(prefix)
+            done('timelines')
+            ranking.rebuild_scores()
+            done('ranking')
+    finally:
+        if pool is not None:
+            pool.shutdown()
+    search.get_backend().rebuild()
+    done('search')
+    return user_ids
@@ -0,0 +1,93 @@
+from django.contrib.auth import get_user_model
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from . import cards, events, ranking, search, tasks
+from .counters import bump_post, bump_user
+from .models import Comment, Follow, Group, Post, UserStats
+from .timeline import drop_timeline, is_back_to_fanout
+
+User = get_user_model()
+
+
+@receiver(post_save, sender=User)
+def user_saved(sender, instance, created, **kwargs):
+    """У нового пользователя сразу есть строка счётчиков."""
+    if created:
+        UserStats.objects.get_or_create(user=instance)
+    elif kwargs.get('update_fields') != frozenset(['last_login']):
+        cards.bump_author(instance.pk)
+
+
+@receiver(post_save, sender=Group)
+@receiver(post_delete, sender=Group)
+def group_changed(sender, instance, **kwargs):
+    """Карточки постов группы перерисовываются после её правки."""
+    cards.bump_group(instance.pk)
+
+
+@receiver(post_save, sender=Post)
+def post_saved(sender, instance, created, **kwargs):
+    """Новый пост раскладывается по лентам подписчиков в фоне."""
+    cards.bump_post(instance.pk)
+    search.index_post(instance)
+    if not created:
+        ranking.move_post(instance)
+    else:
+        bump_user(instance.author_id, posts_count=1)
+        ranking.score_post(instance)
+        tasks.fanout.delay(instance.pk, key=f'fanout:{instance.pk}')
+        tasks.notify_post.delay(instance.pk, key=f'notify:post:{instance.pk}')
+        events.publish_post(instance)
+
+
+@receiver(post_delete, sender=Post)
+def post_deleted(sender, instance, **kwargs):
+    cards.bump_post(instance.pk)
+    search.remove_post(instance.pk)
+    bump_user(instance.author_id, posts_count=-1)
+
+
+@receiver(post_save, sender=Comment)
+def comment_saved(sender, instance, created, **kwargs):
+    search.index_comment(instance)
+    if created:
+        bump_post(instance.post_id, 1)
+        cards.bump_post(instance.post_id)
+        ranking.comment_added(instance)
+        events.publish_comment(instance)
+        tasks.notify_comment.delay(
+            instance.pk, key=f'notify:comment:{instance.pk}'
+        )
+
+
+@receiver(post_delete, sender=Comment)
+def comment_deleted(sender, instance, **kwargs):
+    bump_post(instance.post_id, -1)
+    cards.bump_post(instance.post_id)
+    search.remove_comment(instance.pk)
+
+
+@receiver(post_save, sender=Follow)
+def follow_saved(sender, instance, created, **kwargs):
+    """После подписки посты автора добавляются в ленту в фоне."""
+    if created:
+        bump_user(instance.user_id, following_count=1)
+        bump_user(instance.author_id, followers_count=1)
+        tasks.backfill.delay(
+            instance.user_id, instance.author_id,
+            key=f'backfill:{instance.pk}'
+        )
+
+
+@receiver(post_delete, sender=Follow)
+def follow_deleted(sender, instance, **kwargs):
+    """
+    После отписки посты автора убираются из ленты. Автор, опустившийся
+    до порога раскладки, снова раскладывается по лентам подписчиков.
+    """
+    bump_user(instance.user_id, following_count=-1)
+    bump_user(instance.author_id, followers_count=-1)
+    drop_timeline(instance.user_id, instance.author_id)
+    if is_back_to_fanout(instance.author_id):
+        tasks.refill.delay(instance.author_id)
@@ -0,0 +1,65 @@
+"""Фоновые задачи постов: раскладка по лентам и письма-дайджесты."""
+import time
+
+from core.tasks import task
+
+from . import digests
+from .models import Comment, Follow, Post
+from .timeline import backfill_timeline, fanout_post, refill_timelines
+
+
+@task
+def fanout(post_id):
+    """Пост могли удалить, пока задача ждала очереди."""
+    post = Post.objects.filter(pk=post_id).only('author', 'pub_date').first()
+    if post is not None:
+        fanout_post(post)
+
+
+@task
+def backfill(user_id, author_id):
+    """От автора могли отписаться, пока задача ждала очереди."""
+    if Follow.objects.filter(user=user_id, author=author_id).exists():
+        backfill_timeline(user_id, author_id)
+
+
+@task
+def refill(author_id):
+    refill_timelines(author_id)
+
+
+@task
+def notify_post(post_id):
+    post = Post.objects.filter(pk=post_id).only('author').first()
+    if post is not None:
+        digests.notify_post(post)
+        schedule_digests()
+
+
+@task
+def notify_comment(comment_id):
+    comment = Comment.objects.filter(pk=comment_id).only(
+        'post', 'author'
+    ).first()
+    if comment is not None:
+        digests.notify_comment(comment)
+        schedule_digests()
+
+
+@task
+def send_digests():
+    digests.send_digests()
+
+
+def schedule_digests():
+    """
+    Один обход на окно DIGEST_WINDOW: ключ — номер окна, а запуск —
+    когда созреют все события, пришедшие за это окно. Задача всегда
+    отложена, поэтому письма уходят из run_tasks, а не из запроса.
+    """
+    window = digests.get_window()
+    now = time.time()
+    number = int(now // window)
+    send_digests.delay(
+        key=f'digests:{number}', countdown=(number + 2) * window - now
+    )
@@ -0,0 +1,12 @@
+from django import template
+from django.utils.safestring import mark_safe
+
+from posts.cards import get_page_card
+
+register = template.Library()
+
+
+@register.simple_tag(takes_context=True)
+def post_card(context, post):
+    """Кэшированная карточка поста (см. posts.cards.get_page_card)."""
+    return mark_safe(get_page_card(context.get('page_obj'), post))
@@ -0,0 +1,98 @@
+import json
+import os
+import tempfile
+from io import StringIO
+
+from django.core.cache import caches
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import TestCase
+
+from posts import benchmark
+from posts.seeding import seed_dataset
+
+
+class BenchmarkTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        seed_dataset(
+            users=20, groups=2, posts=60, comments=40, follows=3, seed=1,
+            workers=0
+        )
+
+    def test_sequential_run_measures_every_scenario(self):
+        """Каждый сценарий получает перцентили, запросы и память."""
+        reader, author, group, post = benchmark.pick_targets()
+        scenarios = benchmark.build_scenarios(author, group, post)
+        results = benchmark.run_sequential(scenarios, reader, iterations=2)
+        self.assertEqual(
+            set(results), {scenario.name for scenario in scenarios}
+        )
+        for name, result in results.items():
+            with self.subTest(name=name):
+                self.assertLessEqual(result['p50_ms'], result['p99_ms'])
+                self.assertGreater(result['queries'], 0)
+                self.assertGreater(result['peak_memory_kb'], 0)
+                self.assertLess(max(result['statuses']), 400)
+
+    def test_cold_run_keeps_shared_cache(self):
+        """Холодный замер чистит свой кэш, а не общий кэш сайта."""
+        reader, author, group, post = benchmark.pick_targets()
+        scenarios = benchmark.build_scenarios(author, group, post)[:1]
+        caches['shared'].set('benchmark:canary', 'жив')
+        benchmark.run_sequential(scenarios, reader, iterations=1, cold=True)
+        self.assertEqual(caches['shared'].get('benchmark:canary'), 'жив')
+
+    def test_render_compares_template_loaders(self):
+        """С cached.Loader поиск шаблонов дешевле, а их число то же."""
+        reader, author, group, post = benchmark.pick_targets()
+        scenarios = benchmark.build_scenarios(author, group, post)
+        results = benchmark.run_render(scenarios, reader, iterations=2)
+        self.assertEqual(
+            set(results),
+            {f'{name}:{mode}' for name in benchmark.RENDER_SCENARIOS
+             for mode in benchmark.render_modes()}
+        )
+        for name in benchmark.RENDER_SCENARIOS:
+            with self.subTest(name=name):
+                cached = results[f'{name}:cached']
+                uncached = results[f'{name}:uncached']
+                self.assertGreater(uncached['p50_ms'], 0)
+                self.assertEqual(
+                    cached['template_lookups'], uncached['template_lookups']
+                )
+                self.assertLess(cached['lookup_ms'], uncached['lookup_ms'])
+                jinja2 = results.get(f'{name}:{benchmark.JINJA2_MODE}')
+                if jinja2 is not None:
+                    self.assertGreater(jinja2['p50_ms'], 0)
+
+    def test_command_writes_json_and_compares(self):
+        """Команда пишет JSON и падает на регрессии относительно него."""
+        with tempfile.TemporaryDirectory() as directory:
+            output = os.path.join(directory, 'result.json')
+            call_command(
+                'benchmark', mode=benchmark.MODE_SEQUENTIAL, iterations=1,
+                scenarios=['index'], output=output, stdout=StringIO()
+            )
+            with open(output, encoding='utf-8') as file:
+                saved = json.load(file)
+            self.assertIn('index', saved['results']['sequential'])
+            self.assertEqual(saved['meta']['database'], 'sqlite')
+            saved['results']['sequential']['index']['p95_ms'] = 0
+            saved['results']['sequential']['index']['queries'] = 0
+            benchmark.save_results(output, saved)
+            with self.assertRaisesMessage(CommandError, 'index'):
+                call_command(
+                    'benchmark', mode=benchmark.MODE_SEQUENTIAL,
+                    iterations=1, scenarios=['index'], compare=output,
+                    output=os.path.join(directory, 'new.json'),
+                    stdout=StringIO()
+                )
+
+
+class PercentileTests(TestCase):
+    def test_percentile_interpolates(self):
+        self.assertEqual(benchmark.percentile([1, 2, 3, 4, 5], 50), 3)
+        self.assertEqual(benchmark.percentile([1, 2], 50), 1.5)
+        self.assertEqual(benchmark.percentile([1, 2, 3], 100), 3)
+        self.assertIsNone(benchmark.percentile([], 50))
@@ -0,0 +1,78 @@
+from django.contrib.auth import get_user_model
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from posts.models import Comment, Post
+from posts.tests.utils import QueryBudgetMixin
+from posts.utils import COMMENT_PER_PAGE
+
+User = get_user_model()
+
+# Пост с автором и группой, порция комментариев с авторами.
+DETAIL_BUDGET: int = 2
+
+
+class CommentPaginationTests(QueryBudgetMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='author')
+        cls.post = Post.objects.create(text='Пост', author=cls.author)
+        cls.DETAIL_URL = reverse('posts:post_detail', args=[cls.post.pk])
+        cls.COMMENTS_URL = reverse('posts:post_comments', args=[cls.post.pk])
+        cls.add_comments(COMMENT_PER_PAGE + 5)
+
+    @classmethod
+    def add_comments(cls, number):
+        for index in range(number):
+            commenter = User.objects.create_user(
+                username=f'reader{Comment.objects.count()}'
+            )
+            Comment.objects.create(
+                text=f'Комментарий {index}', author=commenter, post=cls.post
+            )
+
+    def setUp(self):
+        self.client = Client()
+
+    def test_detail_shows_first_batch(self):
+        """На странице поста только первая порция, новые сверху."""
+        comments = self.client.get(self.DETAIL_URL).context['comments']
+        newest = list(Comment.objects.filter(post=self.post)[
+            :COMMENT_PER_PAGE
+        ])
+        self.assertEqual(list(comments), newest)
+        self.assertTrue(comments.has_next())
+
+    def test_detail_query_budget(self):
+        """Число запросов не зависит от числа комментариев."""
+        self.assertPageQueryBudget(
+            self.client, self.DETAIL_URL, DETAIL_BUDGET,
+            grow=lambda: self.add_comments(10)
+        )
+
+    def test_json_next_batch(self):
+        """JSON отдаёт следующую порцию и ссылку на ещё одну, если она есть."""
+        first = self.client.get(self.DETAIL_URL).context['comments']
+        data = self.client.get(
+            self.COMMENTS_URL, {'cursor': first.next_cursor}
+        ).json()
+        rest = list(Comment.objects.filter(post=self.post)[COMMENT_PER_PAGE:])
+        self.assertEqual(
+            [comment['id'] for comment in data['comments']],
+            [comment.pk for comment in rest]
+        )
+        self.assertEqual(
+            data['comments'][0]['author'], rest[0].author.username
+        )
+        self.assertIsNone(data['next'])
+
+    def test_htmx_fragment(self):
+        """Для HTMX отдаётся фрагмент без обвязки страницы."""
+        response = self.client.get(self.COMMENTS_URL, HTTP_HX_REQUEST='true')
+        self.assertTemplateUsed(response, 'includes/comment_list.html')
+        self.assertTemplateNotUsed(response, 'base.html')
+        self.assertContains(response, 'Показать ещё')
+
+    def test_missing_post(self):
+        url = reverse('posts:post_comments', args=[self.post.pk + 100])
+        self.assertEqual(self.client.get(url).status_code, 404)
@@ -0,0 +1,106 @@
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from posts.models import Comment, Follow, Group, Post
+
+User = get_user_model()
+
+
+class ConditionalGetTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(title='Группа', slug='group')
+        cls.post = Post.objects.create(
+            text='Пост', author=cls.author, group=cls.group
+        )
+        cls.urls = (
+            reverse('posts:post_detail', args=[cls.post.pk]),
+            reverse('posts:group_list', args=[cls.group.slug]),
+            reverse('posts:profile', args=[cls.author.username]),
+        )
+
+    def setUp(self):
+        self.guest_client = Client()
+        self.reader_client = Client()
+        self.reader_client.force_login(self.reader)
+
+    def etags(self, client=None):
+        client = client or self.guest_client
+        return {url: client.get(url)['ETag'] for url in self.urls}
+
+    def test_not_modified_without_main_queries(self):
+        """На совпавший ETag — 304 одним запросом валидатора."""
+        for url, etag in self.etags().items():
+            with self.subTest(url=url):
+                with CaptureQueriesContext(connection) as context:
+                    response = self.guest_client.get(
+                        url, HTTP_IF_NONE_MATCH=etag
+                    )
+                self.assertEqual(response.status_code, 304)
+                self.assertEqual(len(context.captured_queries), 1)
+                self.assertTrue(response.has_header('Last-Modified'))
+
+    def test_pages_are_revalidated_and_private(self):
+        """Страницы зрителя не кладутся в общие кэши и всегда сверяются."""
+        for url in (reverse('posts:index'), *self.urls):
+            with self.subTest(url=url):
+                response = self.reader_client.get(url)
+                cache_control = {
+                    part.strip() for part in
+                    response['Cache-Control'].split(',')
+                }
+                self.assertEqual(cache_control, {'private', 'no-cache'})
+
+    def test_etag_changes_with_content(self):
+        """Правка, новый комментарий и новый пост меняют ETag."""
+        changes = {
+            'edit': lambda: Post.objects.get(pk=self.post.pk).save(),
+            'comment': lambda: Comment.objects.create(
+                text='Комментарий', author=self.reader, post=self.post
+            ),
+            'post': lambda: Post.objects.create(
+                text='Ещё пост', author=self.author, group=self.group
+            ),
+        }
+        affected = {
+            'edit': self.urls,
+            'comment': self.urls,
+            'post': self.urls[1:],
+        }
+        for name, change in changes.items():
+            with self.subTest(change=name):
+                before = self.etags()
+                change()
+                after = self.etags()
+                for url in affected[name]:
+                    self.assertNotEqual(before[url], after[url], url)
+
+    def test_etag_differs_per_user(self):
+        guest = self.etags()
+        reader = self.etags(self.reader_client)
+        for url in self.urls:
+            with self.subTest(url=url):
+                self.assertNotEqual(guest[url], reader[url])
+
+    def test_follow_changes_profile_etag(self):
+        url = self.urls[2]
+        before = self.reader_client.get(url)['ETag']
+        Follow.objects.create(user=self.reader, author=self.author)
+        response = self.reader_client.get(url, HTTP_IF_NONE_MATCH=before)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.context['following'])
+
+    def test_missing_objects_are_not_found(self):
+        urls = (
+            reverse('posts:post_detail', args=[self.post.pk + 100]),
+            reverse('posts:group_list', args=['missing']),
+            reverse('posts:profile', args=['missing']),
+        )
+        for url in urls:
+            with self.subTest(url=url):
+                self.assertEqual(self.guest_client.get(url).status_code, 404)
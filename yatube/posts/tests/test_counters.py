@@ -0,0 +1,88 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from posts.models import Comment, Follow, Post, UserStats
+
+User = get_user_model()
+
+
+class CountersTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.post = Post.objects.create(text='Пост', author=cls.author)
+
+    def setUp(self):
+        self.reader_client = Client()
+        self.reader_client.force_login(self.reader)
+
+    def stats(self, user):
+        return UserStats.objects.get(user=user)
+
+    def test_post_counter(self):
+        """Счётчик постов автора меняется при создании и удалении."""
+        self.assertEqual(self.stats(self.author).posts_count, 1)
+        Post.objects.create(text='Второй пост', author=self.author)
+        self.assertEqual(self.stats(self.author).posts_count, 2)
+        Post.objects.filter(pk=self.post.pk).delete()
+        self.assertEqual(self.stats(self.author).posts_count, 1)
+
+    def test_comment_counter(self):
+        """add_comment увеличивает счётчик комментариев поста."""
+        self.reader_client.post(
+            reverse('posts:add_comment', args=[self.post.pk]),
+            {'text': 'Комментарий'}
+        )
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.comments_count, 1)
+        Comment.objects.all().delete()
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.comments_count, 0)
+
+    def test_follow_counters(self):
+        """Подписка и отписка меняют счётчики обеих сторон."""
+        self.reader_client.get(
+            reverse('posts:profile_follow', args=[self.author.username])
+        )
+        self.assertEqual(self.stats(self.author).followers_count, 1)
+        self.assertEqual(self.stats(self.reader).following_count, 1)
+        self.reader_client.get(
+            reverse('posts:profile_unfollow', args=[self.author.username])
+        )
+        self.assertEqual(self.stats(self.author).followers_count, 0)
+        self.assertEqual(self.stats(self.reader).following_count, 0)
+
+    def test_reconcile_command_fixes_drift(self):
+        """reconcile_counters исправляет разошедшиеся счётчики."""
+        Follow.objects.create(user=self.reader, author=self.author)
+        Comment.objects.create(
+            text='Комментарий', author=self.reader, post=self.post
+        )
+        UserStats.objects.update(
+            posts_count=7, followers_count=7, following_count=7
+        )
+        Post.objects.update(comments_count=7)
+        UserStats.objects.filter(user=self.reader).delete()
+        call_command('reconcile_counters', stdout=StringIO())
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.comments_count, 1)
+        author, reader = self.stats(self.author), self.stats(self.reader)
+        self.assertEqual(
+            (author.posts_count, author.followers_count,
+             author.following_count), (1, 1, 0)
+        )
+        self.assertEqual(
+            (reader.posts_count, reader.followers_count,
+             reader.following_count), (0, 0, 1)
+        )
+
+    def test_deleting_user_keeps_other_counters(self):
+        """Удаление пользователя поправляет счётчики его авторов."""
+        Follow.objects.create(user=self.reader, author=self.author)
+        User.objects.filter(pk=self.reader.pk).delete()
+        self.assertEqual(self.stats(self.author).followers_count, 0)
@@ -0,0 +1,161 @@
+import os
+import shutil
+import tempfile
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core import mail
+from django.core.management import call_command
+from django.db import transaction
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from core.models import Task
+from posts.digests import send_digests
+from posts.models import Comment, Follow, Notification, Post
+
+from .utils import run_commit_hooks
+
+User = get_user_model()
+
+
+@override_settings(TASKS_WORKERS=0, DIGEST_WINDOW=600,
+                   SITE_URL='https://yatube.test')
+class DigestTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(
+            username='author', email='author@yatube.test'
+        )
+        cls.readers = [
+            User.objects.create_user(
+                username=f'reader{number}',
+                email=f'reader{number}@yatube.test'
+            )
+            for number in range(3)
+        ]
+        cls.silent = User.objects.create_user(username='silent')
+        for user in (*cls.readers, cls.silent):
+            Follow.objects.create(user=user, author=cls.author)
+
+    def age_notifications(self):
+        Notification.objects.update(
+            created=timezone.now() - timedelta(seconds=601)
+        )
+
+    def test_events_are_coalesced_after_window(self):
+        """За окно события копятся, потом уходят одним письмом."""
+        posts = [
+            Post.objects.create(text=f'Пост {number}', author=self.author)
+            for number in range(2)
+        ]
+        Comment.objects.create(
+            text='Отличный пост', author=self.readers[0], post=posts[0]
+        )
+        run_commit_hooks()
+        self.assertEqual(send_digests(), 0)
+        self.age_notifications()
+        self.assertEqual(send_digests(), len(self.readers) + 1)
+        self.assertFalse(Notification.objects.exists())
+        self.assertEqual(mail.outbox, [])
+        run_commit_hooks()
+        digest = next(
+            message for message in mail.outbox
+            if message.to == ['reader1@yatube.test']
+        )
+        self.assertIn('Пост 0', digest.body)
+        self.assertIn('Пост 1', digest.body)
+        self.assertIn(f'https://yatube.test/posts/{posts[1].pk}/', digest.body)
+        digest = next(
+            message for message in mail.outbox
+            if message.to == ['author@yatube.test']
+        )
+        self.assertIn('reader0: Отличный пост', digest.body)
+
+    def test_own_comment_is_not_notified(self):
+        post = Post.objects.create(text='Пост', author=self.author)
+        run_commit_hooks()
+        Notification.objects.all().delete()
+        Comment.objects.create(text='Сам себе', author=self.author, post=post)
+        run_commit_hooks()
+        self.assertFalse(Notification.objects.exists())
+
+    def test_sweep_never_runs_in_request(self):
+        """Обход только ставится в очередь, даже без пула задач."""
+        post = Post.objects.create(text='Пост', author=self.author)
+        run_commit_hooks()
+        self.age_notifications()
+        Comment.objects.create(
+            text='Комментарий', author=self.readers[0], post=post
+        )
+        run_commit_hooks()
+        self.assertEqual(mail.outbox, [])
+        self.assertTrue(Task.objects.filter(
+            name='posts.tasks.send_digests', status=Task.QUEUED
+        ).exists())
+
+    def test_late_notification_is_kept(self):
+        """Событие, записанное во время обхода, не удаляется неотправленным."""
+        Post.objects.create(text='Пост', author=self.author)
+        run_commit_hooks()
+        self.age_notifications()
+        late = []
+
+        def send_messages(connection, messages):
+            notification = Notification.objects.create(
+                recipient=self.readers[0], kind=Notification.POST,
+                post=Post.objects.get()
+            )
+            self.age_notifications()
+            late.append(notification)
+            return len(messages)
+
+        with mock.patch(
+            'django.core.mail.backends.locmem.EmailBackend.send_messages',
+            send_messages
+        ):
+            send_digests()
+            run_commit_hooks()
+        self.assertEqual(list(Notification.objects.all()), late)
+
+    def test_rollback_sends_nothing(self):
+        """После отката обхода письма не уходят, события остаются."""
+        Post.objects.create(text='Пост', author=self.author)
+        run_commit_hooks()
+        self.age_notifications()
+        with self.assertRaises(RuntimeError), transaction.atomic():
+            send_digests()
+            raise RuntimeError
+        run_commit_hooks()
+        self.assertEqual(mail.outbox, [])
+        self.assertEqual(Notification.objects.count(), len(self.readers) + 1)
+
+    def test_one_connection_for_all_batches(self):
+        """Все пачки уходят через одно соединение: один файл писем."""
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        Post.objects.create(text='Пост', author=self.author)
+        run_commit_hooks()
+        self.age_notifications()
+        with override_settings(
+            EMAIL_BACKEND='django.core.mail.backends.filebased.EmailBackend',
+            EMAIL_FILE_PATH=directory, DIGEST_BATCH_SIZE=1
+        ):
+            self.assertEqual(send_digests(), len(self.readers))
+            run_commit_hooks()
+        files = os.listdir(directory)
+        self.assertEqual(len(files), 1)
+        with open(os.path.join(directory, files[0])) as sent:
+            self.assertEqual(sent.read().count('Subject: '), len(self.readers))
+
+    def test_flush_command(self):
+        Post.objects.create(text='Пост', author=self.author)
+        run_commit_hooks()
+        out = StringIO()
+        call_command('send_digests', stdout=out)
+        self.assertIn('Отправлено писем: 0', out.getvalue())
+        call_command('send_digests', flush=True, stdout=out)
+        run_commit_hooks()
+        self.assertEqual(len(mail.outbox), len(self.readers))
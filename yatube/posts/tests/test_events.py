@@ -0,0 +1,160 @@
+import asyncio
+import json
+
+from django.contrib.auth import get_user_model
+from django.core.wsgi import get_wsgi_application
+from django.test import Client, TransactionTestCase, override_settings
+
+from core.asgi import ASGIApplication, read_body
+from posts.events import EVENT_ROUTES
+from posts.models import Comment, Follow, Group, Post
+
+User = get_user_model()
+
+EVENT_TIMEOUT: float = 5.0
+
+
+class ASGIConnection:
+    """Один HTTP-запрос к ASGI-приложению с очередями вместо сокета."""
+
+    def __init__(self, application, path, cookies='', method='GET',
+                 chunks=(b'',)):
+        self.inbox = asyncio.Queue()
+        self.outbox = asyncio.Queue()
+        scope = {
+            'type': 'http', 'method': method, 'path': path,
+            'query_string': b'', 'headers': [(b'cookie', cookies.encode())],
+        }
+        for number, chunk in enumerate(chunks, 1):
+            self.inbox.put_nowait({
+                'type': 'http.request', 'body': chunk,
+                'more_body': number < len(chunks),
+            })
+        self.task = asyncio.ensure_future(
+            application(scope, self.inbox.get, self.outbox.put)
+        )
+
+    async def receive(self):
+        return await asyncio.wait_for(self.outbox.get(), EVENT_TIMEOUT)
+
+    async def close(self):
+        await self.inbox.put({'type': 'http.disconnect'})
+        await asyncio.wait_for(self.task, EVENT_TIMEOUT)
+
+
+def parse_event(message):
+    lines = message['body'].decode().strip().split('\n')
+    return lines[0][len('event: '):], json.loads(lines[1][len('data: '):])
+
+
+@override_settings(TASKS_WORKERS=0)
+class EventStreamTests(TransactionTestCase):
+    def setUp(self):
+        self.application = ASGIApplication(
+            get_wsgi_application(), EVENT_ROUTES
+        )
+        self.author = User.objects.create_user(username='author')
+        self.reader = User.objects.create_user(username='reader')
+        self.group = Group.objects.create(title='Группа', slug='group')
+
+    def run_async(self, coroutine):
+        asyncio.run(coroutine)
+
+    async def open_stream(self, path, cookies=''):
+        connection = ASGIConnection(self.application, path, cookies)
+        start = await connection.receive()
+        self.assertEqual(start['status'], 200)
+        await connection.receive()
+        return connection
+
+    def test_feed_and_group_streams_get_posts_and_comments(self):
+        async def scenario():
+            feed = await self.open_stream('/events/feed/')
+            group = await self.open_stream('/events/group/group/')
+            post = Post.objects.create(
+                text='Новый пост', author=self.author, group=self.group
+            )
+            for stream in (feed, group):
+                kind, data = parse_event(await stream.receive())
+                self.assertEqual((kind, data['id']), ('post', post.pk))
+            Comment.objects.create(
+                text='Комментарий', author=self.reader, post=post
+            )
+            kind, data = parse_event(await feed.receive())
+            self.assertEqual((kind, data['post']), ('comment', post.pk))
+            await feed.close()
+            await group.close()
+
+        self.run_async(scenario())
+
+    def test_follow_stream_gets_only_followed_authors(self):
+        Follow.objects.create(user=self.reader, author=self.author)
+        client = Client()
+        client.force_login(self.reader)
+        cookies = '; '.join(
+            f'{name}={morsel.value}' for name, morsel in client.cookies.items()
+        )
+
+        async def scenario():
+            stream = await self.open_stream('/events/follow/', cookies)
+            Post.objects.create(text='Чужой пост', author=self.reader)
+            post = Post.objects.create(text='Пост автора', author=self.author)
+            kind, data = parse_event(await stream.receive())
+            self.assertEqual(data['id'], post.pk)
+            await stream.close()
+
+        self.run_async(scenario())
+
+    def test_follow_stream_needs_login_and_group_must_exist(self):
+        async def scenario():
+            for path, status in (('/events/follow/', 403),
+                                 ('/events/group/missing/', 404)):
+                connection = ASGIConnection(self.application, path)
+                self.assertEqual(
+                    (await connection.receive())['status'], status
+                )
+                await connection.task
+
+        self.run_async(scenario())
+
+    def test_pages_are_served_through_wsgi(self):
+        async def scenario():
+            connection = ASGIConnection(self.application, '/')
+            start = await connection.receive()
+            body = await connection.receive()
+            await connection.task
+            self.assertEqual(start['status'], 200)
+            self.assertIn('Последние обновления'.encode(), body['body'])
+            self.assertIn(b'data-events="/events/feed/"', body['body'])
+
+        self.run_async(scenario())
+
+    @override_settings(ASGI_MAX_BODY_SIZE=10)
+    def test_long_body_is_rejected_while_reading(self):
+        """Тело длиннее лимита — 413, остаток тела не читается."""
+        async def scenario():
+            connection = ASGIConnection(
+                self.application, '/api/v1/posts/', method='POST',
+                chunks=(b'x' * 8, b'x' * 8, b'x' * 8)
+            )
+            self.assertEqual((await connection.receive())['status'], 413)
+            await connection.task
+            self.assertEqual(connection.inbox.qsize(), 1)
+
+        self.run_async(scenario())
+
+    @override_settings(ASGI_BODY_MEMORY_SIZE=4)
+    def test_body_is_spooled_to_disk(self):
+        """Тело больше ASGI_BODY_MEMORY_SIZE не держится в памяти."""
+        async def scenario():
+            inbox = asyncio.Queue()
+            for chunk, more in ((b'abc', True), (b'def', False)):
+                inbox.put_nowait({
+                    'type': 'http.request', 'body': chunk, 'more_body': more
+                })
+            body = await read_body(inbox.get)
+            with body:
+                self.assertTrue(body._rolled)
+                self.assertEqual(body.read(), b'abcdef')
+
+        self.run_async(scenario())
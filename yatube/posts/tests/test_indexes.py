@@ -0,0 +1,69 @@
+import re
+from unittest import skipUnless
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from posts.models import Comment, Follow, Group, Post
+
+User = get_user_model()
+
+# Полный проход по таблице без индекса: «SCAN posts_post».
+FULL_SCAN_RE = re.compile(r'^SCAN (?!subquery)\w+$')
+TEMP_SORT = 'USE TEMP B-TREE'
+
+
+@skipUnless(connection.vendor == 'sqlite', 'EXPLAIN QUERY PLAN из SQLite')
+class ListQueryPlanTests(TestCase):
+    """Запросы страниц со списками идут по индексам, без сортировки."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(title='Группа', slug='group')
+        Follow.objects.create(user=cls.reader, author=cls.author)
+        cls.post = Post.objects.create(
+            text='Пост', author=cls.author, group=cls.group
+        )
+        Comment.objects.create(
+            text='Комментарий', author=cls.reader, post=cls.post
+        )
+
+    def setUp(self):
+        self.reader_client = Client()
+        self.reader_client.force_login(self.reader)
+
+    def explain(self, sql, params):
+        with connection.cursor() as cursor:
+            cursor.execute('EXPLAIN QUERY PLAN ' + sql, params)
+            return [row[-1] for row in cursor.fetchall()]
+
+    def captured_plans(self, url):
+        with CaptureQueriesContext(connection) as context:
+            self.reader_client.get(url)
+        for query in context.captured_queries:
+            sql = query['sql']
+            if sql.startswith('SELECT') and '"posts_' in sql:
+                # Параметры уже подставлены в текст запроса.
+                yield sql, self.explain(sql, ())
+
+    def test_list_views_use_indexes(self):
+        """Запросы страниц со списками читают по индексам, без сортировки."""
+        urls = [
+            reverse('posts:index'),
+            reverse('posts:group_list', args=[self.group.slug]),
+            reverse('posts:profile', args=[self.author.username]),
+            reverse('posts:follow_index'),
+            reverse('posts:post_detail', args=[self.post.pk]),
+        ]
+        urls += [f'{url}?cursor=' for url in urls[:4]]
+        for url in urls:
+            for sql, plan in self.captured_plans(url):
+                with self.subTest(url=url, sql=sql):
+                    for step in plan:
+                        self.assertNotRegex(step, FULL_SCAN_RE)
+                        self.assertNotIn(TEMP_SORT, step)
@@ -0,0 +1,114 @@
+import re
+import shutil
+import tempfile
+from unittest import skipUnless
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.template import engines
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from posts.forms import CommentForm
+from posts.models import Follow, Group, Post
+from posts.tests.test_thumbnails import make_image
+
+try:
+    from core.jinja2 import addclass, date
+except ImportError:
+    addclass = date = None
+
+User = get_user_model()
+
+
+def normalize(html):
+    """HTML без разницы в пробелах между движками."""
+    html = re.sub(r'\s+', ' ', html)
+    return re.sub(r'>\s+<', '><', html).strip()
+
+
+@skipUnless(addclass, 'Пакет jinja2 не установлен')
+class Jinja2ParityTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        """Каталог медиа создаётся, только если тесты класса запускаются."""
+        media_root = tempfile.mkdtemp(dir=settings.BASE_DIR)
+        cls.addClassCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        media = override_settings(MEDIA_ROOT=media_root)
+        media.enable()
+        cls.addClassCleanup(media.disable)
+        super().setUpClass()
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(
+            username='author', first_name='Лев', last_name='Толстой'
+        )
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(
+            title='Группа <b>', slug='group', description='Описание & ко'
+        )
+        Follow.objects.create(user=cls.reader, author=cls.author)
+        for number in range(12):
+            Post.objects.create(
+                text=f'Пост {number} <script>', author=cls.author,
+                group=cls.group if number % 2 else None
+            )
+        Post.objects.create(
+            text='С картинкой', author=cls.author, group=cls.group,
+            image=make_image()
+        )
+
+    def render(self, client, url, name, jinja2):
+        cache.clear()
+        views = [name] if jinja2 else []
+        with override_settings(POSTS_JINJA2_VIEWS=views):
+            response = client.get(url)
+        self.assertEqual(response.status_code, 200)
+        # Шаблоны Django шлют template_rendered, Jinja2 — нет.
+        self.assertEqual(not response.templates, jinja2)
+        return normalize(response.content.decode())
+
+    def assert_parity(self, client, url, name):
+        self.assertEqual(
+            self.render(client, url, name, jinja2=True),
+            self.render(client, url, name, jinja2=False)
+        )
+
+    def test_list_pages_match_django(self):
+        author_client = Client()
+        author_client.force_login(self.author)
+        reader_client = Client()
+        reader_client.force_login(self.reader)
+        pages = [
+            ('index', reverse('posts:index')),
+            ('index', reverse('posts:index') + '?page=2'),
+            ('group_list', reverse('posts:group_list', args=['group'])),
+            ('profile', reverse('posts:profile', args=['author'])),
+            ('follow_index', reverse('posts:follow_index')),
+        ]
+        for client in (author_client, reader_client, Client()):
+            for name, url in pages:
+                if name == 'follow_index' and client is not reader_client:
+                    continue
+                with self.subTest(url=url):
+                    self.assert_parity(client, url, name)
+
+    @override_settings(POSTS_PAGINATION='cursor')
+    def test_cursor_pages_match_django(self):
+        self.assert_parity(Client(), reverse('posts:index'), 'index')
+
+    def test_filters_match_django(self):
+        post = Post.objects.first()
+        django = engines['django'].from_string(
+            '{% load user_filters %}{{ value|date:"D, G:i | d E Y" }}'
+            '{{ form.text|addclass:"form-control" }}'
+        )
+        context = {'value': post.pub_date, 'form': CommentForm()}
+        self.assertEqual(
+            date(post.pub_date, 'D, G:i | d E Y')
+            + addclass(CommentForm()['text'], 'form-control'),
+            django.render(context)
+        )
+        self.assertEqual(date(None, 'd E Y'), '')
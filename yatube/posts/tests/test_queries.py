@@ -0,0 +1,65 @@
+from django.contrib.auth import get_user_model
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from posts.models import Comment, Follow, Group, Post
+from posts.tests.utils import QueryBudgetMixin
+
+User = get_user_model()
+
+# COUNT(*) пагинатора и выборка постов.
+GUEST_LIST_BUDGET: int = 2
+# Плюс сессия, пользователь и поиск «тяжёлых» авторов.
+AUTH_LIST_BUDGET: int = 5
+
+
+class ListingQueriesTests(QueryBudgetMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(title='Группа', slug='group')
+        Follow.objects.create(user=cls.reader, author=cls.author)
+
+    def setUp(self):
+        self.guest_client = Client()
+        self.reader_client = Client()
+        self.reader_client.force_login(self.reader)
+        self.add_posts(2)
+
+    def add_posts(self, number):
+        for i in range(number):
+            post = Post.objects.create(
+                text=f'Пост {i}', author=self.author, group=self.group
+            )
+            Comment.objects.create(
+                text='Комментарий', author=self.reader, post=post
+            )
+
+    def test_list_pages_query_budget(self):
+        """Списки постов не делают запросов на каждый пост."""
+        pages = {
+            reverse('posts:index'): GUEST_LIST_BUDGET,
+            reverse('posts:group_list', args=[self.group.slug]):
+                GUEST_LIST_BUDGET + 1,
+            reverse('posts:profile', args=[self.author.username]):
+                GUEST_LIST_BUDGET + 1,
+        }
+        for url, budget in pages.items():
+            with self.subTest(url=url):
+                self.assertPageQueryBudget(
+                    self.guest_client, url, budget,
+                    grow=lambda: self.add_posts(5)
+                )
+
+    def test_follow_index_query_budget(self):
+        """Лента подписок не делает запросов на каждый пост."""
+        self.assertPageQueryBudget(
+            self.reader_client, reverse('posts:follow_index'),
+            AUTH_LIST_BUDGET, grow=lambda: self.add_posts(5)
+        )
+
+    def test_listing_has_comments_count(self):
+        """Счётчик комментариев доступен в for_listing()."""
+        post = Post.objects.for_listing().first()
+        self.assertEqual(post.comments_count, 1)
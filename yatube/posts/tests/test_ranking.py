@@ -0,0 +1,173 @@
+import math
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from posts import ranking
+from posts.models import Comment, Follow, Group, Post, PostScore
+
+User = get_user_model()
+
+HALF_LIFE = 24 * 3600
+
+
+def at(moment):
+    """Подменяет текущее время: от него зависят даты постов и событий."""
+    return mock.patch('django.utils.timezone.now', return_value=moment)
+
+
+@override_settings(RANKING_HALF_LIFE=HALF_LIFE, RANKING_POST_WEIGHT=1.0,
+                   RANKING_FOLLOWER_WEIGHT=0.5, RANKING_COMMENT_WEIGHT=1.0)
+class RankingTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(title='Группа', slug='group')
+        cls.other_group = Group.objects.create(title='Другая', slug='other')
+        cls.start = timezone.now() - timedelta(days=5)
+
+    def setUp(self):
+        cache.clear()
+
+    def publish(self, hours, **fields):
+        with at(self.start + timedelta(hours=hours)):
+            return Post.objects.create(
+                text='Пост', author=self.author, **fields
+            )
+
+    def comment(self, post, hours):
+        with at(self.start + timedelta(hours=hours)):
+            return Comment.objects.create(
+                text='Комментарий', author=self.reader, post=post
+            )
+
+    def popular(self, group=None):
+        return list(ranking.popular_posts(group))
+
+    def test_rank_is_log_of_decayed_sum(self):
+        """Оценка — log2 суммы весов событий, приведённых к эпохе."""
+        post = self.publish(0)
+        self.comment(post, 6)
+        self.comment(post, 30)
+
+        # Сама сумма от эпохи не помещается во float: её считают
+        # от начала теста и прибавляют сдвиг в логарифмах.
+        shift = (self.start - ranking.RANKING_EPOCH).total_seconds()
+        expected = shift / HALF_LIFE + math.log2(
+            sum(2 ** (hours * 3600 / HALF_LIFE) for hours in (0, 6, 30))
+        )
+        self.assertAlmostEqual(post.score.rank, expected, places=9)
+        self.assertEqual(
+            post.score.updated, self.start + timedelta(hours=30)
+        )
+
+    def test_comments_lift_older_post(self):
+        """Обсуждаемый пост обгоняет более свежий без комментариев."""
+        older = self.publish(0)
+        newer = self.publish(1)
+        self.assertEqual(self.popular(), [newer, older])
+        self.comment(older, 2)
+        self.assertEqual(self.popular(), [older, newer])
+
+    def test_old_discussion_decays(self):
+        """Через несколько периодов полураспада свежий пост впереди."""
+        older = self.publish(0)
+        for _ in range(3):
+            self.comment(older, 0)
+        newer = self.publish(72)
+        self.assertEqual(self.popular(), [newer, older])
+
+    def test_author_followers_add_weight(self):
+        """Пост автора с подписчиками начинает выше."""
+        Follow.objects.create(user=self.reader, author=self.author)
+        followed = self.publish(0)
+        with at(self.start):
+            unknown = Post.objects.create(text='Пост', author=self.reader)
+        self.assertEqual(self.popular(), [followed, unknown])
+        self.assertAlmostEqual(
+            followed.score.rank - unknown.score.rank,
+            math.log2(1.5), places=9
+        )
+
+    def test_group_ranking_follows_post(self):
+        """Популярное группы — только её посты, и после переноса тоже."""
+        post = self.publish(0, group=self.group)
+        self.publish(1)
+        self.assertEqual(self.popular(self.group), [post])
+        post.group = self.other_group
+        post.save()
+        self.assertEqual(self.popular(self.group), [])
+        self.assertEqual(self.popular(self.other_group), [post])
+
+    def test_comment_restores_missing_score(self):
+        """Посту без оценки её заводит первый же комментарий."""
+        post = self.publish(0)
+        PostScore.objects.all().delete()
+        self.comment(post, 1)
+        expected = ranking.add_ranks(
+            ranking.event_rank(1.0, post.pub_date),
+            ranking.event_rank(1.0, self.start + timedelta(hours=1)),
+        )
+        self.assertAlmostEqual(
+            PostScore.objects.get(post=post).rank, expected, places=9
+        )
+
+    def test_rebuild_matches_incremental_scores(self):
+        """Пересчёт с нуля даёт те же оценки, что и события."""
+        first = self.publish(0, group=self.group)
+        second = self.publish(5)
+        self.comment(first, 7)
+        self.comment(second, 8)
+        self.comment(first, 20)
+        incremental = dict(PostScore.objects.values_list('post', 'rank'))
+        PostScore.objects.all().delete()
+        out = StringIO()
+        call_command('rank_posts', '--rebuild', stdout=out)
+        self.assertIn('Оценок пересчитано: 2', out.getvalue())
+        for post, rank in PostScore.objects.values_list('post', 'rank'):
+            with self.subTest(post=post):
+                self.assertAlmostEqual(rank, incremental[post], places=9)
+        self.assertEqual(
+            PostScore.objects.get(post=first).group_id, self.group.pk
+        )
+
+    @override_settings(RANKING_KEEP=3 * 24 * 3600)
+    def test_prune_drops_stale_scores(self):
+        stale = self.publish(0)
+        fresh = self.publish(0)
+        self.comment(fresh, 100)
+        out = StringIO()
+        call_command('rank_posts', stdout=out)
+        self.assertIn('Устаревших оценок удалено: 1', out.getvalue())
+        self.assertFalse(PostScore.objects.filter(post=stale).exists())
+        self.assertTrue(PostScore.objects.filter(post=fresh).exists())
+
+    @override_settings(RANKING_LIMIT=3)
+    def test_popular_pages(self):
+        """Страницы популярного показывают первые RANKING_LIMIT постов."""
+        posts = [self.publish(hours, group=self.group) for hours in range(4)]
+        client = Client()
+        response = client.get(reverse('posts:popular'))
+        self.assertTemplateUsed(response, 'posts/popular.html')
+        self.assertEqual(
+            list(response.context['page_obj']), posts[:0:-1]
+        )
+        response = client.get(
+            reverse('posts:group_popular', args=[self.group.slug])
+        )
+        self.assertEqual(response.context['group'], self.group)
+        self.assertEqual(
+            list(response.context['page_obj']), posts[:0:-1]
+        )
+        response = client.get(
+            reverse('posts:group_popular', args=['missing'])
+        )
+        self.assertEqual(response.status_code, 404)
@@ -0,0 +1,143 @@
+import re
+from html import unescape
+from io import StringIO
+from unittest import SkipTest
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import connection, transaction
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from posts import search
+from posts.models import Comment, Post
+from posts.utils import POST_PER_PAGE
+
+from .utils import run_commit_hooks
+
+User = get_user_model()
+
+
+class SearchTestsMixin:
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='auth')
+        cls.cats = Post.objects.create(
+            text='Кошки любят спать. Кошки, кошки, кошки!', author=cls.user
+        )
+        cls.dogs = Post.objects.create(
+            text='Собаки любят гулять, а кошки спать', author=cls.user
+        )
+        cls.birds = Post.objects.create(text='Птицы поют', author=cls.user)
+
+    def setUp(self):
+        search._memory_backend = search.MemoryBackend()
+
+    def find(self, query):
+        return search.search_posts(query)
+
+    def test_ranking(self):
+        """Пост, где слово встречается чаще, выше в выдаче."""
+        self.assertEqual(self.find('кошки'), [self.cats, self.dogs])
+
+    def test_all_words_and_prefix(self):
+        """Нужны все слова запроса, последние буквы можно не дописывать."""
+        self.assertEqual(self.find('соба гул'), [self.dogs])
+        self.assertEqual(self.find('птиц'), [self.birds])
+        self.assertEqual(self.find('птицы собаки'), [])
+
+    def test_incremental_updates(self):
+        """Правка, удаление и комментарии сразу видны в поиске."""
+        self.find('птицы')
+        self.birds.text = 'Рыбы молчат'
+        self.birds.save()
+        run_commit_hooks()
+        self.assertEqual(self.find('птицы'), [])
+        self.assertEqual(self.find('рыбы'), [self.birds])
+        comment = Comment.objects.create(
+            text='А у меня попугай', author=self.user, post=self.dogs
+        )
+        run_commit_hooks()
+        self.assertEqual(self.find('попугай'), [self.dogs])
+        comment.delete()
+        run_commit_hooks()
+        self.assertEqual(self.find('попугай'), [])
+        Post.objects.filter(pk=self.cats.pk).delete()
+        run_commit_hooks()
+        self.assertEqual(self.find('кошки'), [self.dogs])
+
+    def test_limit_counts_posts_not_rows(self):
+        """Комментарии одного поста не съедают место других в выдаче."""
+        Comment.objects.bulk_create(
+            Comment(text='Кошки кошки кошки', author=self.user,
+                    post=self.cats)
+            for _ in range(10)
+        )
+        call_command('rebuild_search_index', stdout=StringIO())
+        self.assertEqual(
+            search.search_posts('кошки', limit=2), [self.cats, self.dogs]
+        )
+        self.assertEqual(search.search_posts('кошки', limit=1), [self.cats])
+
+    def test_rebuild_command(self):
+        """rebuild_search_index восстанавливает индекс по базе."""
+        call_command('rebuild_search_index', stdout=StringIO())
+        self.assertEqual(self.find('кошки'), [self.cats, self.dogs])
+
+    def test_search_page(self):
+        """Страница /search/ выводит найденные посты."""
+        response = self.client.get(reverse('posts:search'), {'q': 'Птицы'})
+        self.assertEqual(list(response.context['page_obj']), [self.birds])
+        self.assertTemplateUsed(response, 'posts/search.html')
+
+    def test_search_pages_keep_query(self):
+        """Ссылка на вторую страницу выдачи сохраняет запрос."""
+        Post.objects.bulk_create(
+            Post(text=f'Кошки номер {number}', author=self.user)
+            for number in range(POST_PER_PAGE)
+        )
+        call_command('rebuild_search_index', stdout=StringIO())
+        response = self.client.get(reverse('posts:search'), {'q': 'кошки'})
+        link = re.search(
+            r'href="(\?[^"]*page=2)"', response.content.decode()
+        ).group(1)
+        response = self.client.get(reverse('posts:search') + unescape(link))
+        self.assertEqual(response.context['query'], 'кошки')
+        # На второй странице — два поста из setUpTestData.
+        self.assertEqual(len(response.context['page_obj']), 2)
+
+
+@override_settings(POSTS_SEARCH_BACKEND='memory', TASKS_WORKERS=0)
+class MemorySearchTests(SearchTestsMixin, TestCase):
+    def test_other_process_sees_changes(self):
+        """Индекс другого процесса перестраивается после чужой правки."""
+        self.find('птицы')
+        other = search.MemoryBackend()
+        self.assertEqual(other.search('птицы', 10), [self.birds.pk])
+        self.birds.text = 'Рыбы молчат'
+        self.birds.save()
+        run_commit_hooks()
+        self.assertEqual(other.search('рыбы', 10), [self.birds.pk])
+        self.assertEqual(self.find('рыбы'), [self.birds])
+
+    def test_rolled_back_post_is_not_indexed(self):
+        """Правка попадает в индекс только после коммита."""
+        self.find('птицы')
+        try:
+            with transaction.atomic():
+                Post.objects.create(text='Черновик про жирафов',
+                                    author=self.user)
+                raise ValueError
+        except ValueError:
+            pass
+        run_commit_hooks()
+        self.assertEqual(self.find('жирафов'), [])
+
+
+@override_settings(POSTS_SEARCH_BACKEND='fts5', TASKS_WORKERS=0)
+class FTS5SearchTests(SearchTestsMixin, TestCase):
+    @classmethod
+    def setUpClass(cls):
+        if connection.vendor != 'sqlite' or not search.has_fts5():
+            raise SkipTest('FTS5 недоступен')
+        super().setUpClass()
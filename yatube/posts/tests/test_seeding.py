@@ -0,0 +1,118 @@
+from io import StringIO
+
+from django.core.management import call_command
+from django.db.models import Count, F
+from django.test import TestCase
+
+from posts import ranking
+from posts.models import (Comment, Follow, Post, PostScore, TimelineEntry,
+                          UserStats)
+from posts.seeding import generate_posts, seed_dataset, seed_timelines
+
+
+def snapshot(prefix):
+    """Данные наполнения без id: (автор, группа, текст) постов и подписки."""
+    posts = list(Post.objects.filter(
+        author__username__startswith=prefix
+    ).order_by('pk').values_list('author__username', 'group__slug', 'text'))
+    follows = sorted(Follow.objects.filter(
+        user__username__startswith=prefix
+    ).values_list('user__username', 'author__username'))
+    strip = len(prefix)
+    return (
+        [(author[strip:], group and group[strip:], text)
+         for author, group, text in posts],
+        [(user[strip:], author[strip:]) for user, author in follows],
+    )
+
+
+class SeedingTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user_ids = seed_dataset(
+            users=30, groups=3, posts=200, comments=100, follows=3, seed=7,
+            workers=0
+        )
+
+    def test_seed_creates_rows_and_denormalized_data(self):
+        """Наполнение пересчитывает счётчики и раскладывает ленты."""
+        self.assertEqual(len(self.user_ids), 30)
+        self.assertEqual(Post.objects.count(), 200)
+        self.assertEqual(Comment.objects.count(), 100)
+        self.assertEqual(
+            sum(UserStats.objects.values_list('posts_count', flat=True)), 200
+        )
+        follow = Follow.objects.filter(author__posts__isnull=False).first()
+        self.assertEqual(
+            TimelineEntry.objects.filter(
+                user=follow.user, author=follow.author
+            ).count(),
+            Post.objects.filter(author=follow.author).count()
+        )
+
+    def test_seed_ranks_recent_posts(self):
+        """Свежие посты наполнения сразу есть в популярном."""
+        recent = Post.objects.filter(
+            pub_date__gte=ranking.get_stale_before()
+        )
+        self.assertTrue(recent.exists())
+        self.assertEqual(PostScore.objects.count(), recent.count())
+
+    def test_posts_are_skewed_and_spread_in_time(self):
+        """Первые авторы пишут больше остальных, даты растут с id."""
+        top = UserStats.objects.get(user_id=self.user_ids[0]).posts_count
+        last = UserStats.objects.get(user_id=self.user_ids[-1]).posts_count
+        self.assertGreater(top, last)
+        dates = list(
+            Post.objects.order_by('pk').values_list('pub_date', flat=True)
+        )
+        self.assertEqual(dates, sorted(dates))
+        self.assertGreater(len(set(dates)), 190)
+
+    def test_follows_are_unique_and_not_self(self):
+        self.assertFalse(Follow.objects.values('user', 'author').annotate(
+            total=Count('pk')
+        ).filter(total__gt=1).exists())
+        self.assertFalse(Follow.objects.filter(user=F('author')).exists())
+
+    def test_same_seed_same_data_with_any_workers(self):
+        """Одинаковый seed даёт одинаковые данные и с пулом процессов."""
+        seed_dataset(
+            users=30, groups=3, posts=200, comments=100, follows=3, seed=7,
+            prefix='pool', workers=2
+        )
+        self.assertEqual(snapshot('seed'), snapshot('pool'))
+
+    def test_chunks_do_not_depend_on_each_other(self):
+        """Часть генерируется одинаково, в каком бы порядке её ни звали."""
+        self.assertEqual(
+            generate_posts(1, 3, 30, 40, 100, 10, 2),
+            generate_posts(1, 3, 30, 40, 100, 10, 2),
+        )
+        self.assertNotEqual(
+            generate_posts(1, 3, 30, 40, 100, 10, 2),
+            generate_posts(2, 3, 30, 40, 100, 10, 2),
+        )
+
+    def test_timelines_skip_heavy_authors(self):
+        """Посты авторов выше порога подписчиков в ленты не попадают."""
+        heavy = UserStats.objects.order_by('-followers_count').first()
+        TimelineEntry.objects.all().delete()
+        with self.settings(TIMELINE_FANOUT_LIMIT=heavy.followers_count - 1):
+            seed_timelines()
+        self.assertFalse(
+            TimelineEntry.objects.filter(author_id=heavy.user_id).exists()
+        )
+        self.assertTrue(TimelineEntry.objects.exists())
+
+    def test_command(self):
+        out = StringIO()
+        call_command(
+            'seed_yatube', users=5, groups=1, posts=10, comments=5,
+            follows=1, prefix='cmd', workers=0, stdout=out
+        )
+        self.assertIn('timelines', out.getvalue())
+        self.assertEqual(
+            Post.objects.filter(author__username__startswith='cmd').count(),
+            10
+        )
@@ -0,0 +1,100 @@
+import os
+import shutil
+import tempfile
+from io import BytesIO
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase, override_settings
+from PIL import Image
+
+from core.metrics import REGISTRY, THUMBNAILS
+from posts.forms import PostForm
+from posts.models import Post
+from posts.thumbnails import (THUMBNAIL_SIZES, get_executor,
+                              make_thumbnails, queue_thumbnails,
+                              thumbnail_name)
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+User = get_user_model()
+
+
+def make_image(name='image.png', size=(40, 20)):
+    content = BytesIO()
+    Image.new('RGB', size, 'red').save(content, 'PNG')
+    return SimpleUploadedFile(name, content.getvalue(), 'image/png')
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT, THUMBNAIL_WORKERS=0)
+class ThumbnailsTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='auth')
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def test_pending_post_shows_original(self):
+        """Пока миниатюры нет, карточка показывает исходную картинку."""
+        post = Post.objects.create(
+            text='Пост', author=self.user, image=make_image()
+        )
+        self.assertEqual(post.card_image_url, post.image.url)
+
+    def test_thumbnail_stored_on_post(self):
+        """Готовая миниатюра нужного размера сохраняется в посте."""
+        post = Post.objects.create(
+            text='Пост', author=self.user, image=make_image()
+        )
+        made = THUMBNAILS.snapshot().get('["ok"]', 0)
+        queue_thumbnails(post)
+        post.refresh_from_db()
+        self.assertNotEqual(post.card_image_url, post.image.url)
+        self.assertEqual(
+            THUMBNAILS.snapshot()['["ok"]'], made + len(THUMBNAIL_SIZES)
+        )
+        self.assertIn(
+            'yatube_thumbnail_duration_seconds_count', REGISTRY.expose()
+        )
+        path = os.path.join(
+            TEMP_MEDIA_ROOT, post.card_image_url[len(settings.MEDIA_URL):]
+        )
+        with Image.open(path) as image:
+            self.assertEqual(image.size, THUMBNAIL_SIZES['card'])
+
+    def test_thumbnail_names_do_not_collide(self):
+        """Картинки с одним базовым именем получают разные миниатюры."""
+        names = {
+            thumbnail_name(image_name, 'card')
+            for image_name in ('posts/a.png', 'posts/a.jpg', 'other/a.png')
+        }
+        self.assertEqual(len(names), 3)
+
+    def test_new_image_resets_thumbnails(self):
+        """Смена картинки в форме сбрасывает старые миниатюры."""
+        post = Post.objects.create(
+            text='Пост', author=self.user, thumbnails='{"card": "old.jpg"}'
+        )
+        form = PostForm(
+            {'text': 'Пост'}, {'image': make_image()}, instance=post
+        )
+        self.assertTrue(form.is_valid())
+        post = form.save()
+        self.assertEqual(post.thumbnails, '')
+
+    @override_settings(THUMBNAIL_WORKERS=1)
+    def test_process_pool_makes_thumbnails(self):
+        """Нарезка работает в отдельном процессе пула."""
+        post = Post.objects.create(
+            text='Пост', author=self.user, image=make_image()
+        )
+        target = os.path.join(TEMP_MEDIA_ROOT, 'thumbnails', 'pool.jpg')
+        future = get_executor().submit(
+            make_thumbnails, post.image.path, {'card': target}
+        )
+        self.assertEqual(future.result(timeout=30), {'card': target})
+        self.assertTrue(os.path.exists(target))
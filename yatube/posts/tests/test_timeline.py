@@ -0,0 +1,116 @@
+from importlib import import_module
+from io import StringIO
+
+from django.apps import apps
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+
+from posts.models import Follow, Post, TimelineEntry, UserStats
+from posts.timeline import get_timeline
+
+from .utils import run_commit_hooks
+
+User = get_user_model()
+
+timeline_migration = import_module('posts.migrations.0008_timelineentry')
+
+
+@override_settings(TASKS_WORKERS=0)
+class TimelineTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='author')
+        cls.follower = User.objects.create_user(username='follower')
+        cls.old_post = Post.objects.create(
+            text='Пост до подписки', author=cls.author
+        )
+
+    def test_follow_backfills_timeline(self):
+        """Подписка добавляет в ленту уже опубликованные посты."""
+        Follow.objects.create(user=self.follower, author=self.author)
+        run_commit_hooks()
+        self.assertEqual(list(get_timeline(self.follower)), [self.old_post])
+
+    def test_new_post_fanned_out(self):
+        """Новый пост автора попадает в ленту подписчика."""
+        Follow.objects.create(user=self.follower, author=self.author)
+        post = Post.objects.create(text='Новый пост', author=self.author)
+        run_commit_hooks()
+        self.assertTrue(TimelineEntry.objects.filter(
+            user=self.follower, post=post
+        ).exists())
+        self.assertEqual(get_timeline(self.follower)[0], post)
+
+    def test_unfollow_drops_timeline(self):
+        """Отписка убирает посты автора из ленты."""
+        Follow.objects.create(user=self.follower, author=self.author)
+        run_commit_hooks()
+        Follow.objects.filter(
+            user=self.follower, author=self.author
+        ).delete()
+        self.assertFalse(TimelineEntry.objects.exists())
+        self.assertFalse(get_timeline(self.follower).exists())
+
+    @override_settings(TIMELINE_FANOUT_LIMIT=0)
+    def test_heavy_author_read_on_the_fly(self):
+        """Посты авторов выше порога не копируются, а читаются напрямую."""
+        Follow.objects.create(user=self.follower, author=self.author)
+        post = Post.objects.create(text='Новый пост', author=self.author)
+        run_commit_hooks()
+        self.assertFalse(TimelineEntry.objects.exists())
+        self.assertEqual(
+            list(get_timeline(self.follower)), [post, self.old_post]
+        )
+
+    @override_settings(TIMELINE_FANOUT_LIMIT=1)
+    def test_author_back_below_limit_is_refilled(self):
+        """Посты, вышедшие выше порога, остаются в ленте после отписок."""
+        other = User.objects.create_user(username='other')
+        Follow.objects.create(user=self.follower, author=self.author)
+        Follow.objects.create(user=other, author=self.author)
+        run_commit_hooks()
+        post = Post.objects.create(text='Новый пост', author=self.author)
+        run_commit_hooks()
+        self.assertFalse(TimelineEntry.objects.filter(post=post).exists())
+        Follow.objects.filter(user=other).delete()
+        run_commit_hooks()
+        self.assertEqual(
+            UserStats.objects.get(user=self.author).followers_count, 1
+        )
+        self.assertTrue(TimelineEntry.objects.filter(
+            user=self.follower, post=post
+        ).exists())
+        self.assertEqual(
+            list(get_timeline(self.follower)), [post, self.old_post]
+        )
+
+    def test_rebuild_drops_timelines_without_follows(self):
+        """Лента того, кто ни на кого не подписан, не переживает пересборку."""
+        TimelineEntry.objects.create(
+            user=self.follower, post=self.old_post, author=self.author,
+            pub_date=self.old_post.pub_date
+        )
+        call_command('rebuild_timelines', stdout=StringIO())
+        self.assertFalse(TimelineEntry.objects.exists())
+
+    def test_rebuild_command(self):
+        """Команда rebuild_timelines восстанавливает ленты."""
+        Follow.objects.create(user=self.follower, author=self.author)
+        TimelineEntry.objects.all().delete()
+        call_command('rebuild_timelines', stdout=StringIO())
+        self.assertEqual(list(get_timeline(self.follower)), [self.old_post])
+
+    def test_migration_fills_existing_timelines(self):
+        """Миграция заполняет ленты по уже существующим подпискам."""
+        Follow.objects.create(user=self.follower, author=self.author)
+        TimelineEntry.objects.all().delete()
+        timeline_migration.fill_timelines(apps, None)
+        self.assertEqual(list(get_timeline(self.follower)), [self.old_post])
+
+    @override_settings(TIMELINE_FANOUT_LIMIT=0)
+    def test_migration_skips_heavy_authors(self):
+        """Миграция не копирует посты авторов выше порога."""
+        Follow.objects.create(user=self.follower, author=self.author)
+        timeline_migration.fill_timelines(apps, None)
+        self.assertFalse(TimelineEntry.objects.exists())
@@ -0,0 +1,101 @@
+import shutil
+import tempfile
+from io import BytesIO
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+from PIL import Image
+
+from posts.models import Post
+from posts.thumbnails import shrink_image
+from posts.uploads import (ERROR_NOT_IMAGE, ERROR_TOO_BIG,
+                           ImageUploadHandler)
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+User = get_user_model()
+
+
+def image_file(size=(40, 20), image_format='PNG', name='image.png'):
+    content = BytesIO()
+    Image.new('RGB', size, 'red').save(content, image_format)
+    return SimpleUploadedFile(name, content.getvalue(), 'image/png')
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class ImageUploadTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='auth')
+        cls.POST_CREATE_URL = reverse('posts:post_create')
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.user)
+
+    def upload(self, image):
+        return self.authorized_client.post(
+            self.POST_CREATE_URL, {'text': 'Пост', 'image': image}
+        )
+
+    def test_valid_image_accepted(self):
+        """Обычная картинка проходит и сохраняется."""
+        self.upload(image_file())
+        self.assertTrue(Post.objects.get().image)
+
+    def test_not_image_rejected_by_magic(self):
+        """Файл с чужой сигнатурой отклоняется ещё при загрузке."""
+        response = self.upload(SimpleUploadedFile(
+            'fake.png', b'<?php echo 1; ?>' * 10, 'image/png'
+        ))
+        self.assertFormError(response, 'form', 'image', ERROR_NOT_IMAGE)
+        self.assertFalse(Post.objects.exists())
+
+    @override_settings(POST_IMAGE_MAX_BYTES=100)
+    def test_too_big_rejected(self):
+        """Файл больше лимита байт отклоняется."""
+        response = self.upload(image_file(size=(400, 400), name='a.bmp',
+                                          image_format='BMP'))
+        self.assertTrue(response.context['form'].errors['image'])
+        self.assertFalse(Post.objects.exists())
+
+    @override_settings(POST_IMAGE_MAX_BYTES=100)
+    def test_too_big_stops_reading(self):
+        """После превышения лимита остаток тела запроса не читается."""
+        with mock.patch.object(
+            ImageUploadHandler, 'receive_data_chunk', autospec=True,
+            side_effect=ImageUploadHandler.receive_data_chunk
+        ) as receive:
+            response = self.upload(image_file(
+                size=(400, 400), name='a.bmp', image_format='BMP'
+            ))
+        self.assertEqual(receive.call_count, 1)
+        self.assertFormError(
+            response, 'form', 'image', ERROR_TOO_BIG.format(0.0)
+        )
+        self.assertEqual(response.context['form'].data['text'], 'Пост')
+
+    @override_settings(POST_IMAGE_MAX_PIXELS=100)
+    def test_too_many_pixels_rejected(self):
+        """Размеры из заголовка больше лимита пикселей — отказ."""
+        response = self.upload(image_file(size=(20, 20)))
+        self.assertTrue(response.context['form'].errors['image'])
+        self.assertFalse(Post.objects.exists())
+
+    def test_shrink_oversized_original(self):
+        """Фоновый шаг ужимает слишком большой исходник."""
+        path = f'{TEMP_MEDIA_ROOT}/big.png'
+        Image.new('RGB', (300, 100), 'red').save(path)
+        self.assertTrue(shrink_image(path, 150))
+        with Image.open(path) as image:
+            self.assertEqual(image.size, (150, 50))
+        self.assertFalse(shrink_image(path, 150))
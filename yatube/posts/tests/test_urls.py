@@ -33,6 +33,8 @@ class StaticURLTests(TestCase):
         )
         cls.INDEX_URL = '/'
         cls.GROUP_LIST_URL = f'/group/{cls.group.slug}/'
+        cls.POPULAR_URL = '/popular/'
+        cls.GROUP_POPULAR_URL = f'/group/{cls.group.slug}/popular/'
         cls.PROFILE_URL = f'/profile/{cls.user.username}/'
         cls.POST_DETAIL_URL = f'/posts/{cls.post.id}/'
         cls.POST_COMMENT_URL = f'/posts/{cls.post.id}/comment/'
@@ -50,7 +52,7 @@ class StaticURLTests(TestCase):
         """
         allowed_to_all = [
             self.INDEX_URL, self.GROUP_LIST_URL, self.PROFILE_URL,
-            self.POST_DETAIL_URL
+            self.POST_DETAIL_URL, self.POPULAR_URL, self.GROUP_POPULAR_URL
         ]
         allowed_to_authorized_user = [
             self.POST_CREATE_URL
@@ -63,6 +65,8 @@ class StaticURLTests(TestCase):
             self.GROUP_LIST_URL: StaticURLTests.guest_client,
             self.PROFILE_URL: StaticURLTests.guest_client,
             self.POST_DETAIL_URL: StaticURLTests.guest_client,
+            self.POPULAR_URL: StaticURLTests.guest_client,
+            self.GROUP_POPULAR_URL: StaticURLTests.guest_client,
             unexisting_page: StaticURLTests.guest_client,
             self.POST_CREATE_URL: [
                 StaticURLTests.guest_client,
@@ -111,6 +115,8 @@ class StaticURLTests(TestCase):
             self.PROFILE_URL: 'posts/profile.html',
             self.POST_DETAIL_URL: 'posts/post_detail.html',
             self.GROUP_LIST_URL: 'posts/group_list.html',
+            self.POPULAR_URL: 'posts/popular.html',
+            self.GROUP_POPULAR_URL: 'posts/popular.html',
             self.POST_CREATE_URL: 'posts/create_or_update_post.html',
             self.POST_EDIT_URL: 'posts/create_or_update_post.html',
 
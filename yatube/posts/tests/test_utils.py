@@ -0,0 +1,73 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from posts.models import Post
+from posts.utils import (CursorPage, POST_PER_PAGE, decode_cursor,
+                         encode_cursor)
+
+User = get_user_model()
+
+POSTS_TOTAL: int = 25
+
+
+@override_settings(POSTS_PAGINATION='cursor')
+class CursorPaginatorTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='auth')
+        Post.objects.bulk_create(
+            Post(author=cls.user, text=f'Пост {i}')
+            for i in range(POSTS_TOTAL)
+        )
+        cls.posts = list(Post.objects.order_by('-pub_date', '-pk'))
+        cls.PROFILE_URL = reverse('posts:profile', args=[cls.user.username])
+
+    def setUp(self):
+        cache.clear()
+
+    def walk(self, url):
+        """Проходит все страницы по ссылкам «Следующая»."""
+        pages = []
+        page_obj = self.client.get(url).context['page_obj']
+        pages.append(page_obj)
+        while page_obj.has_next():
+            page_obj = self.client.get(
+                url, {'cursor': page_obj.next_cursor}
+            ).context['page_obj']
+            pages.append(page_obj)
+        return pages
+
+    def test_cursor_pages_cover_all_posts(self):
+        """Курсорные страницы отдают все посты по порядку без повторов."""
+        pages = self.walk(self.PROFILE_URL)
+        self.assertIsInstance(pages[0], CursorPage)
+        self.assertFalse(pages[0].has_previous())
+        self.assertEqual(len(pages[0]), POST_PER_PAGE)
+        posts = [post for page in pages for post in page]
+        self.assertEqual(posts, self.posts)
+
+    def test_previous_cursor_returns_previous_page(self):
+        """Курсор «Предыдущая» возвращает ту же страницу, что была."""
+        first, second = self.walk(self.PROFILE_URL)[:2]
+        response = self.client.get(
+            self.PROFILE_URL, {'cursor': second.previous_cursor}
+        )
+        page_obj = response.context['page_obj']
+        self.assertEqual(list(page_obj), list(first))
+        self.assertTrue(page_obj.has_next())
+
+    def test_broken_cursor_returns_first_page(self):
+        """Битый курсор не ломает страницу, а отдаёт первую."""
+        response = self.client.get(self.PROFILE_URL, {'cursor': '%%%'})
+        self.assertEqual(
+            list(response.context['page_obj']), self.posts[:POST_PER_PAGE]
+        )
+
+    def test_cursor_roundtrip(self):
+        """Токен курсора раскодируется обратно в (pub_date, id)."""
+        post = self.posts[0]
+        direction, pub_date, pk = decode_cursor(encode_cursor(post))
+        self.assertEqual((pub_date, pk), (post.pub_date, post.pk))
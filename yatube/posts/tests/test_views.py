@@ -13,6 +13,8 @@ from django import forms
 
 from posts.models import Post, Group, Follow
 
+from .utils import run_commit_hooks
+
 
 TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
 
@@ -233,20 +235,33 @@ class TaskPagesTests(TestCase):
                 self.assertEqual(response.status_code, status)
 
     def test_cache_index(self):
-        """Проверка хранения и очищения кэша для index."""
-        response = self.authorized_client.get(reverse('posts:index'))
-        posts = response.content
+        """Новые и отредактированные посты видны на index сразу."""
+        self.authorized_client.get(self.INDEX_URL)
         Post.objects.create(
             text='test_new_post',
             author=self.user,
         )
-        response_old = self.authorized_client.get(reverse('posts:index'))
-        old_posts = response_old.content
-        self.assertEqual(old_posts, posts)
-        cache.clear()
-        response_new = self.authorized_client.get(reverse('posts:index'))
-        new_posts = response_new.content
-        self.assertNotEqual(old_posts, new_posts)
+        response = self.authorized_client.get(self.INDEX_URL)
+        self.assertContains(response, 'test_new_post')
+        self.authorized_client.post(
+            self.POST_EDIT_URL, {'text': 'test_edited_post'}
+        )
+        response = self.authorized_client.get(
+            self.INDEX_URL, {'page': 2}
+        )
+        self.assertContains(response, 'test_edited_post')
+
+    def test_post_card_fragment_cached(self):
+        """Карточки постов берутся из кэша, кнопки зависят от зрителя."""
+        self.guest_client.get(self.INDEX_URL)
+        Post.objects.filter(pk=self.post_15.pk).update(text='Мимо кэша')
+        response = self.guest_client.get(self.INDEX_URL)
+        self.assertContains(response, self.post_15.text)
+        self.assertNotContains(response, self.POST_EDIT_URL)
+        response = self.authorized_client_2.get(self.INDEX_URL)
+        self.assertContains(
+            response, reverse('posts:post_edit', args=[self.post_15.id])
+        )
 
 
 class FollowTests(TestCase):
@@ -295,12 +310,14 @@ class FollowTests(TestCase):
         self.follower_client.get(self.UNFOLLOW_AUTH)
         self.assertEqual(Follow.objects.count(), count_follow - 1)
 
+    @override_settings(TASKS_WORKERS=0)
     def test_follow_post(self):
         """Проверка записей у тех кто подписан."""
         Follow.objects.create(
             user=self.post_follower,
             author=self.post_author
         )
+        run_commit_hooks()
         response = self.follower_client.get(self.FOLLOW_POSTS_LIST)
         self.assertIn(self.post, response.context['page_obj'].object_list)
 
@@ -0,0 +1,42 @@
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, connection, connections
+from django.test.utils import CaptureQueriesContext
+
+
+def run_commit_hooks(using=DEFAULT_DB_ALIAS):
+    """
+    Выполняет колбэки on_commit, накопленные внутри TestCase: его
+    транзакция не коммитится, и Django 2.2 сама их не вызовет.
+    Колбэки, добавленные по ходу, тоже выполняются.
+    """
+    hooks = connections[using].run_on_commit
+    while hooks:
+        _, callback = hooks.pop(0)
+        callback()
+
+
+class QueryBudgetMixin:
+    """Проверка, что страница укладывается в фиксированное число запросов."""
+
+    def count_page_queries(self, client, url):
+        cache.clear()
+        with CaptureQueriesContext(connection) as context:
+            client.get(url)
+        return len(context.captured_queries)
+
+    def assertPageQueryBudget(self, client, url, budget, grow=None):
+        """
+        Страница делает не больше budget запросов, и их число
+        не меняется после grow(), добавляющего на страницу новых постов.
+        """
+        queries = self.count_page_queries(client, url)
+        self.assertLessEqual(
+            queries, budget, f'{url}: {queries} запросов вместо {budget}'
+        )
+        if grow is None:
+            return
+        grow()
+        self.assertEqual(
+            self.count_page_queries(client, url), queries,
+            f'{url}: число запросов растёт вместе с числом постов'
+        )
@@ -0,0 +1,158 @@
+import json
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.db import close_old_connections, transaction
+from django.utils import timezone
+from PIL import Image, ImageOps
+
+from core.metrics import THUMBNAIL_SECONDS, THUMBNAILS
+
+from . import cards
+from .models import Post
+
+logger = logging.getLogger(__name__)
+
+# Имя размера: (ширина, высота). card — карточка поста и страница поста.
+THUMBNAIL_SIZES = {
+    'card': (960, 339),
+}
+THUMBNAIL_DIR: str = 'thumbnails'
+THUMBNAIL_QUALITY: int = 85
+THUMBNAIL_WORKERS: int = 2
+POST_IMAGE_MAX_SIDE: int = 2560
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def thumbnail_name(image_name, size_name):
+    """
+    Имя миниатюры повторяет полный путь исходника вместе с расширением:
+    у posts/a.png и posts/a.jpg или у одноимённых файлов из разных
+    каталогов миниатюры не совпадут.
+    """
+    return f'{THUMBNAIL_DIR}/{size_name}/{image_name}.jpg'
+
+
+def make_thumbnail(source, target, size):
+    """
+    Режет картинку по центру до size, увеличивая маленькие.
+    Выполняется в процессе пула, поэтому без Django.
+    """
+    os.makedirs(os.path.dirname(target), exist_ok=True)
+    with Image.open(source) as image:
+        image = ImageOps.exif_transpose(image).convert('RGB')
+        image = ImageOps.fit(image, size, Image.LANCZOS)
+        image.save(target, 'JPEG', quality=THUMBNAIL_QUALITY, optimize=True)
+    return target
+
+
+def shrink_image(source, max_side):
+    """
+    Уменьшает исходник до max_side по большей стороне и пересохраняет
+    без метаданных. Формат файла не меняется.
+    """
+    with Image.open(source) as image:
+        if max(image.size) <= max_side:
+            return False
+        image_format = image.format
+        image = ImageOps.exif_transpose(image)
+        image.thumbnail((max_side, max_side), Image.LANCZOS)
+        if image_format == 'JPEG':
+            image = image.convert('RGB')
+        image.save(source, image_format, quality=THUMBNAIL_QUALITY)
+    return True
+
+
+def make_thumbnails(source, targets, max_side=None):
+    """
+    Все размеры одной картинки: {имя размера: путь}.
+    С max_side сначала ужимает слишком большой исходник.
+    """
+    if max_side:
+        shrink_image(source, max_side)
+    return {
+        size_name: make_thumbnail(source, target, THUMBNAIL_SIZES[size_name])
+        for size_name, target in targets.items()
+    }
+
+
+def get_executor():
+    """Пул процессов создаётся при первой задаче."""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ProcessPoolExecutor(max_workers=getattr(
+                settings, 'THUMBNAIL_WORKERS', THUMBNAIL_WORKERS
+            ))
+        return _executor
+
+
+def store_thumbnails(post_id, image_name, names):
+    """Сохраняет готовые миниатюры, если картинку поста не успели сменить."""
+    updated = Post.objects.filter(pk=post_id, image=image_name).update(
+        thumbnails=json.dumps(names), modified=timezone.now()
+    )
+    if updated:
+        cards.bump_post(post_id)
+
+
+def queue_thumbnails(post):
+    """
+    Ставит нарезку миниатюр поста в пул процессов и возвращает
+    future. При THUMBNAIL_WORKERS = 0 режет сразу, в текущем процессе.
+    """
+    if not post.image:
+        return None
+    image_name = post.image.name
+    names = {
+        size_name: thumbnail_name(image_name, size_name)
+        for size_name in THUMBNAIL_SIZES
+    }
+    source = default_storage.path(image_name)
+    targets = {
+        size_name: default_storage.path(name)
+        for size_name, name in names.items()
+    }
+    max_side = getattr(settings, 'POST_IMAGE_MAX_SIDE', POST_IMAGE_MAX_SIDE)
+    started = time.perf_counter()
+    if not getattr(settings, 'THUMBNAIL_WORKERS', THUMBNAIL_WORKERS):
+        make_thumbnails(source, targets, max_side)
+        THUMBNAIL_SECONDS.observe(time.perf_counter() - started)
+        THUMBNAILS.inc(len(names), result='ok')
+        store_thumbnails(post.pk, image_name, names)
+        return None
+    future = get_executor().submit(
+        make_thumbnails, source, targets, max_side
+    )
+
+    def done(future):
+        """Колбэк идёт в служебном потоке пула со своим соединением."""
+        THUMBNAIL_SECONDS.observe(time.perf_counter() - started)
+        if future.exception() is not None:
+            THUMBNAILS.inc(len(names), result='error')
+            logger.error(
+                'Не удалось нарезать миниатюры поста %s', post.pk,
+                exc_info=future.exception()
+            )
+            return
+        THUMBNAILS.inc(len(names), result='ok')
+        close_old_connections()
+        try:
+            store_thumbnails(post.pk, image_name, names)
+        finally:
+            close_old_connections()
+
+    future.add_done_callback(done)
+    return future
+
+
+def schedule_thumbnails(post):
+    """Нарезка начнётся после коммита, когда файл и запись уже сохранены."""
+    transaction.on_commit(lambda: queue_thumbnails(post))
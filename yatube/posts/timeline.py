@@ -0,0 +1,140 @@
+from django.conf import settings
+from django.db.models import F, Q
+
+from .models import Follow, Post, TimelineEntry, UserStats
+
+TIMELINE_FANOUT_LIMIT: int = 1000
+TIMELINE_BATCH_SIZE: int = 1000
+# Лента сортируется по копиям (pub_date, post) в TimelineEntry:
+# так сортировку покрывает индекс (user, pub_date, post).
+TIMELINE_KEYSET = ('feed_date', 'feed_post')
+
+
+def get_fanout_limit():
+    """
+    Порог подписчиков, выше которого посты автора не раскладываются
+    по лентам при записи, а подмешиваются при чтении.
+    """
+    return getattr(settings, 'TIMELINE_FANOUT_LIMIT', TIMELINE_FANOUT_LIMIT)
+
+
+def is_fanout_author(author):
+    """Раскладываются ли посты автора по лентам подписчиков."""
+    return not UserStats.objects.filter(
+        user=author, followers_count__gt=get_fanout_limit()
+    ).exists()
+
+
+def fanout_post(post):
+    """Кладёт новый пост в ленты всех подписчиков автора."""
+    if not is_fanout_author(post.author_id):
+        return
+    followers = Follow.objects.filter(
+        author_id=post.author_id
+    ).values_list('user_id', flat=True)
+    TimelineEntry.objects.bulk_create(
+        (TimelineEntry(user_id=user_id, post_id=post.pk,
+                       author_id=post.author_id, pub_date=post.pub_date)
+         for user_id in followers.iterator()),
+        batch_size=TIMELINE_BATCH_SIZE,
+        ignore_conflicts=True,
+    )
+
+
+def backfill_timeline(user, author):
+    """Добавляет в ленту подписчика уже опубликованные посты автора."""
+    if is_fanout_author(author):
+        copy_posts(user, author)
+
+
+def copy_posts(user, author):
+    posts = Post.objects.filter(author=author).values_list('pk', 'pub_date')
+    user_id = getattr(user, 'pk', user)
+    author_id = getattr(author, 'pk', author)
+    TimelineEntry.objects.bulk_create(
+        (TimelineEntry(user_id=user_id, post_id=pk,
+                       author_id=author_id, pub_date=pub_date)
+         for pk, pub_date in posts.iterator()),
+        batch_size=TIMELINE_BATCH_SIZE,
+        ignore_conflicts=True,
+    )
+
+
+def is_back_to_fanout(author):
+    """
+    Автор только что опустился до порога: до этого его посты
+    подмешивались при чтении и в ленты не копировались.
+    """
+    return UserStats.objects.filter(
+        user=author, followers_count=get_fanout_limit()
+    ).exists()
+
+
+def refill_timelines(author):
+    """
+    Раскладывает посты автора, опустившегося до порога, по лентам
+    всех подписчиков: иначе посты, вышедшие, пока он был выше
+    порога, из лент пропадут.
+    """
+    if not is_fanout_author(author):
+        return
+    followers = Follow.objects.filter(author=author).values_list(
+        'user_id', flat=True
+    )
+    for user_id in followers.iterator():
+        copy_posts(user_id, author)
+
+
+def drop_timeline(user, author):
+    """Убирает из ленты подписчика посты автора после отписки."""
+    TimelineEntry.objects.filter(user=user, author=author).delete()
+
+
+def rebuild_timeline(user):
+    """
+    Пересобирает ленту подписчика с нуля, в том числе после смены
+    TIMELINE_FANOUT_LIMIT.
+    """
+    TimelineEntry.objects.filter(user=user).delete()
+    authors = Follow.objects.filter(user=user).values_list(
+        'author_id', flat=True
+    )
+    for author_id in authors:
+        backfill_timeline(user, author_id)
+
+
+def drop_orphan_timelines():
+    """Удаляет ленты пользователей, которые ни на кого не подписаны."""
+    deleted, _ = TimelineEntry.objects.exclude(
+        user__in=Follow.objects.values('user')
+    ).delete()
+    return deleted
+
+
+def get_heavy_authors(user):
+    """Авторы из подписок с числом подписчиков выше порога."""
+    return UserStats.objects.filter(
+        user__following__user=user,
+        followers_count__gt=get_fanout_limit()
+    ).values_list('user', flat=True)
+
+
+def get_timeline(user):
+    """
+    Посты ленты подписок: записи материализованной ленты плюс
+    посты «тяжёлых» авторов, которые читаются напрямую.
+    Отсортированы по полям TIMELINE_KEYSET.
+    """
+    heavy_authors = list(get_heavy_authors(user))
+    if not heavy_authors:
+        return Post.objects.filter(timeline_entries__user=user).annotate(
+            feed_date=F('timeline_entries__pub_date'),
+            feed_post=F('timeline_entries__post'),
+        ).order_by('-feed_date', '-feed_post')
+    return Post.objects.filter(
+        Q(pk__in=TimelineEntry.objects.filter(user=user).values('post'))
+        | Q(author__in=heavy_authors)
+    ).annotate(
+        feed_date=F('pub_date'),
+        feed_post=F('pk'),
+    ).order_by('-feed_date', '-feed_post')
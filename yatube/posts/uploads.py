@@ -0,0 +1,137 @@
+from django.conf import settings
+from django.core.files.uploadedfile import UploadedFile
+from django.core.files.uploadhandler import (StopUpload,
+                                             TemporaryFileUploadHandler)
+from PIL import ImageFile
+
+IMAGE_FIELDS = ('image',)
+POST_IMAGE_MAX_BYTES: int = 5 * 1024 * 1024
+POST_IMAGE_MAX_PIXELS: int = 40_000_000
+# Заголовок с размерами должен найтись в первых байтах файла.
+HEADER_LIMIT: int = 256 * 1024
+MAGIC_NUMBERS = (
+    b'\xff\xd8\xff',
+    b'\x89PNG\r\n\x1a\n',
+    b'GIF87a',
+    b'GIF89a',
+    b'RIFF',
+    b'BM',
+)
+MAGIC_LENGTH: int = max(len(magic) for magic in MAGIC_NUMBERS)
+
+ERROR_NOT_IMAGE = 'Файл не похож на картинку'
+ERROR_TOO_BIG = 'Файл больше {} МБ'
+ERROR_TOO_MANY_PIXELS = 'Картинка больше {} мегапикселей'
+ERROR_NO_HEADER = 'Не удалось прочитать размеры картинки'
+
+
+class RejectedUpload(UploadedFile):
+    """Отклонённая при загрузке картинка: без данных, с причиной."""
+
+    def __init__(self, name, content_type, error):
+        super().__init__(None, name, content_type, 0)
+        self.upload_error = error
+
+    def close(self):
+        pass
+
+
+class ImageUploadHandler(TemporaryFileUploadHandler):
+    """
+    Пишет картинки на диск кусками и проверяет их по ходу: сигнатура
+    по первым байтам, размеры из заголовка, лимиты байт и пикселей.
+    После отказа остаток файла не сохраняется, а после превышения
+    лимита байт тело запроса дальше не читается: причина отказа
+    достаётся форме через get_upload_files. Остальные поля
+    обрабатываются как у TemporaryFileUploadHandler.
+    """
+
+    def new_file(self, field_name, *args, **kwargs):
+        super().new_file(field_name, *args, **kwargs)
+        self.capped = field_name in IMAGE_FIELDS
+        self.checked = not self.capped
+        self.error = None
+        self.received = 0
+        self.head = b''
+        self.parser = ImageFile.Parser()
+
+    def receive_data_chunk(self, raw_data, start):
+        if self.error:
+            return None
+        if not self.capped:
+            return super().receive_data_chunk(raw_data, start)
+        self.received += len(raw_data)
+        max_bytes = getattr(
+            settings, 'POST_IMAGE_MAX_BYTES', POST_IMAGE_MAX_BYTES
+        )
+        if self.received > max_bytes:
+            self.reject(ERROR_TOO_BIG.format(
+                round(max_bytes / (1024 * 1024), 1)
+            ))
+            self.request.rejected_uploads = {self.field_name: RejectedUpload(
+                self.file_name, self.content_type, self.error
+            )}
+            raise StopUpload(connection_reset=True)
+        if not self.checked:
+            self.check_header(raw_data)
+            if self.error:
+                return None
+        return super().receive_data_chunk(raw_data, start)
+
+    def check_header(self, raw_data):
+        if len(self.head) < MAGIC_LENGTH:
+            self.head += raw_data[:MAGIC_LENGTH]
+            if len(self.head) >= MAGIC_LENGTH and not self.head.startswith(
+                    MAGIC_NUMBERS):
+                self.reject(ERROR_NOT_IMAGE)
+                return
+        try:
+            self.parser.feed(raw_data)
+        except Exception:
+            self.reject(ERROR_NOT_IMAGE)
+            return
+        image = self.parser.image
+        if image is not None:
+            self.checked = True
+            self.parser = None
+            max_pixels = getattr(
+                settings, 'POST_IMAGE_MAX_PIXELS', POST_IMAGE_MAX_PIXELS
+            )
+            if image.size[0] * image.size[1] > max_pixels:
+                self.reject(ERROR_TOO_MANY_PIXELS.format(
+                    round(max_pixels / 1_000_000, 1)
+                ))
+        elif self.received > HEADER_LIMIT:
+            self.reject(ERROR_NO_HEADER)
+
+    def reject(self, error):
+        """Запоминает причину и выбрасывает уже записанное."""
+        self.error = error
+        self.file.close()
+        return None
+
+    def file_complete(self, file_size):
+        if self.error:
+            return RejectedUpload(
+                self.file_name, self.content_type, self.error
+            )
+        if self.capped and not self.head.startswith(MAGIC_NUMBERS):
+            self.file.close()
+            return RejectedUpload(
+                self.file_name, self.content_type, ERROR_NOT_IMAGE
+            )
+        return super().file_complete(file_size)
+
+
+def get_upload_files(request):
+    """
+    request.FILES вместе с картинками, загрузку которых обработчик
+    оборвал: их нет в FILES, но форма должна показать причину.
+    """
+    files = request.FILES
+    rejected = getattr(request, 'rejected_uploads', None)
+    if rejected:
+        files = files.copy()
+        for field_name, upload in rejected.items():
+            files[field_name] = upload
+    return files
@@ -1,11 +1,205 @@
-from django.core.paginator import Paginator
+import base64
+import binascii
+
+from django.conf import settings
+from django.core.paginator import Page, Paginator
+from django.db.models import Q
+from django.template import engines
+from django.template.utils import InvalidTemplateEngineError
+from django.utils.dateparse import parse_datetime
+
+from .models import Comment
 
 POST_PER_PAGE: int = 10
+PAGINATION_OFFSET: str = 'offset'
+PAGINATION_CURSOR: str = 'cursor'
+CURSOR_NEXT: str = 'n'
+CURSOR_PREVIOUS: str = 'p'
+COMMENT_PER_PAGE: int = 20
+POST_KEYSET = ('pub_date', 'pk')
+COMMENT_KEYSET = ('created', 'pk')
+JINJA2_ENGINE: str = 'jinja2'
+
+
+def encode_cursor(obj, direction=CURSOR_NEXT, keyset=POST_KEYSET):
+    """
+    Упаковывает ключ объекта или строки .values() в непрозрачный токен.
+    keyset — поля дат и последним целочисленный id.
+    """
+    *dates, pk = (
+        obj[field] if isinstance(obj, dict) else getattr(obj, field)
+        for field in keyset
+    )
+    raw = '|'.join([direction, *(date.isoformat() for date in dates), str(pk)])
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(token, keyset=POST_KEYSET):
+    """
+    Распаковывает токен курсора в (direction, *даты, id) по keyset.
+    Для битого токена возвращает None.
+    """
+    if not token:
+        return None
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        raw = base64.urlsafe_b64decode(padded.encode()).decode()
+        direction, *dates, pk = raw.split('|')
+        dates = [parse_datetime(date) for date in dates]
+        pk = int(pk)
+    except (ValueError, binascii.Error, UnicodeDecodeError):
+        return None
+    if (
+        direction not in (CURSOR_NEXT, CURSOR_PREVIOUS)
+        or len(dates) != len(keyset) - 1 or None in dates
+        # Больше 64 бит SQLite не примет.
+        or pk.bit_length() > 63
+    ):
+        return None
+    return (direction, *dates, pk)
+
+
+class CursorPage(Page):
+    """
+    Страница keyset-пагинатора: вместо номеров страниц
+    хранит курсоры на соседние страницы.
+    """
+    is_cursor = True
+
+    def __init__(self, object_list, paginator, has_next, has_previous):
+        super().__init__(object_list, 1, paginator)
+        self._has_next = has_next
+        self._has_previous = has_previous
+
+    def has_next(self):
+        return self._has_next
+
+    def has_previous(self):
+        return self._has_previous
+
+    @property
+    def next_cursor(self):
+        if not self._has_next:
+            return None
+        return encode_cursor(
+            self.object_list[-1], CURSOR_NEXT, self.paginator.keyset
+        )
+
+    @property
+    def previous_cursor(self):
+        if not self._has_previous:
+            return None
+        return encode_cursor(
+            self.object_list[0], CURSOR_PREVIOUS, self.paginator.keyset
+        )
+
 
+class CursorPaginator(Paginator):
+    """
+    Keyset-пагинатор по (pub_date, id): без COUNT(*) и OFFSET,
+    поэтому любая страница стоит столько же, сколько первая.
+    keyset — имена полей даты и id в запросе, если сортировка идёт
+    не по самим полям поста (например, по аннотациям ленты).
+    """
 
-def get_page(request, object_with_posts, posts_number=POST_PER_PAGE):
+    def __init__(self, object_list, per_page, keyset=POST_KEYSET):
+        self.keyset = keyset
+        self.date_field, self.id_field = keyset
+        super().__init__(
+            object_list.order_by(
+                f'-{self.date_field}', f'-{self.id_field}'
+            ),
+            per_page
+        )
+
+    def _after(self, pub_date, pk):
+        return self.object_list.filter(
+            Q(**{f'{self.date_field}__lt': pub_date})
+            | Q(**{self.date_field: pub_date, f'{self.id_field}__lt': pk})
+        )
+
+    def _before(self, pub_date, pk):
+        return self.object_list.filter(
+            Q(**{f'{self.date_field}__gt': pub_date})
+            | Q(**{self.date_field: pub_date, f'{self.id_field}__gt': pk})
+        )
+
+    def get_page(self, cursor):
+        decoded = decode_cursor(cursor, self.keyset)
+        if decoded is None:
+            return self._first_page()
+        direction, pub_date, pk = decoded
+        if direction == CURSOR_NEXT:
+            posts = list(self._after(pub_date, pk)[:self.per_page + 1])
+            return CursorPage(
+                posts[:self.per_page], self,
+                has_next=len(posts) > self.per_page,
+                has_previous=True,
+            )
+        posts = list(
+            self._before(pub_date, pk).reverse()[:self.per_page + 1]
+        )
+        has_previous = len(posts) > self.per_page
+        posts = posts[:self.per_page][::-1]
+        return CursorPage(
+            posts, self, has_next=True, has_previous=has_previous
+        )
+
+    def _first_page(self):
+        posts = list(self.object_list[:self.per_page + 1])
+        return CursorPage(
+            posts[:self.per_page], self,
+            has_next=len(posts) > self.per_page,
+            has_previous=False,
+        )
+
+
+def get_pagination_mode(request):
+    """Режим пагинации: из настроек или по наличию ?cursor= в запросе."""
+    if PAGINATION_CURSOR in request.GET:
+        return PAGINATION_CURSOR
+    return getattr(settings, 'POSTS_PAGINATION', PAGINATION_OFFSET)
+
+
+def get_page(request, object_with_posts, posts_number=POST_PER_PAGE,
+             keyset=POST_KEYSET):
     """Функция-пагинатор"""
+    if get_pagination_mode(request) == PAGINATION_CURSOR:
+        paginator = CursorPaginator(object_with_posts, posts_number, keyset)
+        return paginator.get_page(request.GET.get(PAGINATION_CURSOR))
     paginator = Paginator(object_with_posts, posts_number)
     page_number = request.GET.get('page')
     page_obj = paginator.get_page(page_number)
     return page_obj
+
+
+def get_comment_page(request, post_id):
+    """
+    Порция комментариев поста от новых к старым по курсору
+    (created, id): страница поста стоит одинаково при любом
+    числе комментариев.
+    """
+    comments = Comment.objects.filter(post_id=post_id).for_listing()
+    paginator = CursorPaginator(comments, COMMENT_PER_PAGE, COMMENT_KEYSET)
+    return paginator.get_page(request.GET.get(PAGINATION_CURSOR))
+
+
+def has_jinja2():
+    """Подключён ли движок Jinja2 (пакет jinja2 необязателен)."""
+    try:
+        engines[JINJA2_ENGINE]
+    except InvalidTemplateEngineError:
+        return False
+    return True
+
+
+def get_list_engine(request):
+    """
+    Движок шаблонов страницы со списком постов: Jinja2, если имя
+    её URL есть в POSTS_JINJA2_VIEWS и движок подключён, иначе Django.
+    """
+    views = getattr(settings, 'POSTS_JINJA2_VIEWS', ())
+    match = request.resolver_match
+    if match is None or match.url_name not in views:
+        return None
+    return JINJA2_ENGINE if has_jinja2() else None
@@ -1,71 +1,167 @@
 from django.contrib.auth import get_user_model
 from django.contrib.auth.decorators import login_required
+from django.core.paginator import Paginator
+from django.db import transaction
+from django.http import Http404, JsonResponse
 from django.shortcuts import get_object_or_404, redirect, render
-from django.views.decorators.cache import cache_page
+from django.utils.http import urlencode
+from django.urls import reverse
+from django.views.decorators.cache import cache_control
+from django.views.decorators.http import condition
 
+from . import conditions
 from .forms import PostForm, CommentForm
 from .models import Group, Post, Follow
-from .utils import get_page
+from .ranking import get_popular_page
+from .search import search_posts
+from .timeline import TIMELINE_KEYSET, get_timeline
+from .uploads import get_upload_files
+from .utils import (PAGINATION_CURSOR, POST_PER_PAGE, get_comment_page,
+                    get_list_engine, get_page)
 
 User = get_user_model()
 
 
-@cache_page(20, key_prefix='index_page')
+@cache_control(private=True, no_cache=True)
 def index(request):
     """Главная страница."""
     template = 'posts/index.html'
-    page_obj = get_page(request, Post.objects.all())
+    page_obj = get_page(request, Post.objects.for_listing())
     context = {
         'page_obj': page_obj,
     }
+    return render(request, template, context,
+                  using=get_list_engine(request))
+
+
+def popular(request):
+    """Популярные посты: по оценке с затуханием, а не по дате."""
+    template = 'posts/popular.html'
+    context = {
+        'page_obj': get_popular_page(request),
+    }
     return render(request, template, context)
 
 
+def group_popular(request, slug):
+    """Популярные посты группы."""
+    template = 'posts/popular.html'
+    group = get_object_or_404(Group, slug=slug)
+    context = {
+        'page_obj': get_popular_page(request, group),
+        'group': group
+    }
+    return render(request, template, context)
+
+
+@cache_control(private=True, no_cache=True)
+@condition(etag_func=conditions.group_etag,
+           last_modified_func=conditions.group_last_modified)
 def group_posts(request, slug):
     """Страница определённой группы."""
     template = 'posts/group_list.html'
-    group = get_object_or_404(Group, slug=slug)
-    page_obj = get_page(request, group.posts.all())
+    group = conditions.group_state(request, slug)
+    if group is None:
+        raise Http404
+    page_obj = get_page(request, group.posts.for_listing())
     context = {
         'page_obj': page_obj,
         'group': group
     }
-    return render(request, template, context)
+    return render(request, template, context,
+                  using=get_list_engine(request))
 
 
+@cache_control(private=True, no_cache=True)
+@condition(etag_func=conditions.profile_etag,
+           last_modified_func=conditions.profile_last_modified)
 def profile(request, username):
     """Страница профиля юзера."""
     template = 'posts/profile.html'
-    author = get_object_or_404(User, username=username)
-    user = request.user
-    page_obj = get_page(request, author.posts.all())
-    following = (
-        user.is_authenticated
-        and Follow.objects.filter(user=user, author=author)
-    )
+    author = conditions.profile_state(request, username)
+    if author is None:
+        raise Http404
+    page_obj = get_page(request, author.posts.for_listing())
     context = {
         'page_obj': page_obj,
         'author': author,
-        'following': following
+        'following': getattr(author, 'is_followed', False)
+    }
+    return render(request, template, context,
+                  using=get_list_engine(request))
+
+
+def search(request):
+    """Полнотекстовый поиск по постам и комментариям."""
+    template = 'posts/search.html'
+    query = request.GET.get('q', '').strip()
+    posts = search_posts(query) if query else []
+    page_obj = Paginator(posts, POST_PER_PAGE).get_page(
+        request.GET.get('page')
+    )
+    context = {
+        'page_obj': page_obj,
+        'query': query,
+        'page_prefix': f'{urlencode({"q": query})}&',
     }
     return render(request, template, context)
 
 
+@cache_control(private=True, no_cache=True)
+@condition(etag_func=conditions.post_etag,
+           last_modified_func=conditions.post_last_modified)
 def post_detail(request, post_id):
     """Подробная информация о посте"""
     template = 'posts/post_detail.html'
-    post = get_object_or_404(Post, pk=post_id)
+    post = conditions.post_state(request, post_id)
+    if post is None:
+        raise Http404
     form = CommentForm()
-    comments = post.comments.all()
     context = {
         'form': form,
         'post': post,
-        'comments': comments
+        'post_id': post.pk,
+        'comments': get_comment_page(request, post.pk)
     }
     return render(request, template, context)
 
 
+def post_comments(request, post_id):
+    """
+    Следующая порция комментариев для «Показать ещё»: HTML-фрагмент
+    для HTMX-запроса, иначе JSON.
+    """
+    if not Post.objects.filter(pk=post_id).exists():
+        raise Http404
+    comments = get_comment_page(request, post_id)
+    if request.headers.get('HX-Request'):
+        return render(request, 'includes/comment_list.html', {
+            'post_id': post_id,
+            'comments': comments
+        })
+    next_url = None
+    if comments.has_next():
+        next_url = (
+            f'{reverse("posts:post_comments", args=[post_id])}'
+            f'?{PAGINATION_CURSOR}={comments.next_cursor}'
+        )
+    return JsonResponse({
+        'comments': [
+            {
+                'id': comment.pk,
+                'text': comment.text,
+                'created': comment.created.isoformat(),
+                'author': comment.author.username,
+            }
+            for comment in comments
+        ],
+        'next_cursor': comments.next_cursor,
+        'next': next_url,
+    }, json_dumps_params={'ensure_ascii': False})
+
+
 @login_required
+@transaction.atomic
 def add_comment(request, post_id):
     post = get_object_or_404(Post, id=post_id)
     form = CommentForm(request.POST or None)
@@ -78,6 +174,7 @@ def add_comment(request, post_id):
 
 
 @login_required
+@transaction.atomic
 def post_create(request):
     """Создание нового поста."""
     template = 'posts/create_or_update_post.html'
@@ -85,7 +182,7 @@ def post_create(request):
     title = 'Новый пост'
     form = PostForm(
         request.POST or None,
-        files=request.FILES or None
+        files=get_upload_files(request) or None
     )
     if form.is_valid():
         post = form.save(commit=False)
@@ -106,7 +203,7 @@ def post_edit(request, post_id):
         return redirect('posts:post_detail', post_id=post_id)
     form = PostForm(
         request.POST or None,
-        files=request.FILES or None,
+        files=get_upload_files(request) or None,
         instance=post
     )
     if form.is_valid():
@@ -121,14 +218,15 @@ def post_edit(request, post_id):
 @login_required
 def follow_index(request):
     template = 'posts/follow.html'
-    posts = Post.objects.filter(
-        author__following__user=request.user)
-    page_obj = get_page(request, posts)
+    posts = get_timeline(request.user).for_listing()
+    page_obj = get_page(request, posts, keyset=TIMELINE_KEYSET)
     context = {'page_obj': page_obj}
-    return render(request, template, context)
+    return render(request, template, context,
+                  using=get_list_engine(request))
 
 
 @login_required
+@transaction.atomic
 def profile_follow(request, username):
     author = get_object_or_404(User, username=username)
     user_followed = Follow.objects.filter(
@@ -140,6 +238,7 @@ def profile_follow(request, username):
 
 
 @login_required
+@transaction.atomic
 def profile_unfollow(request, username):
     author = get_object_or_404(User, username=username)
     follow_qs = Follow.objects.filter(author=author, user=request.user)
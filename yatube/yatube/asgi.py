@@ -0,0 +1,26 @@
+"""
+ASGI config for yatube project.
+
+It exposes the ASGI callable as a module-level variable named ``application``:
+pages are served by the WSGI application in a thread pool, /events/ streams
+new posts and comments as Server-Sent Events (see core/asgi.py), e.g.
+
+    uvicorn yatube.asgi:application
+"""
+
+import os
+
+from django.core.wsgi import get_wsgi_application
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'yatube.settings')
+
+wsgi_application = get_wsgi_application()
+
+from core.templating import warm_on_startup  # noqa: E402
+
+warm_on_startup()
+
+from core.asgi import ASGIApplication  # noqa: E402
+from posts.events import EVENT_ROUTES  # noqa: E402
+
+application = ASGIApplication(wsgi_application, EVENT_ROUTES)